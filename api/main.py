@@ -1,31 +1,71 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, Query, Path
+from fastapi.responses import PlainTextResponse
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 import logging
-import tempfile
 import os
-import shutil
+import tempfile
+
+import aiofiles
 
-from core.config import DB_NAME, MONGO_CONNECTION_STRING
+from core.config import (
+    UPLOAD_CHUNK_BYTES, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HISTORY_LIMIT, JOB_SPOOL_DIR,
+    API_PROCESS_WORKERS, IMPORT_WORKERS, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL_SECONDS, JOB_CHECKPOINTS, CHECKPOINT_DIR,
+    DUPLICATE_IMPORTS, AGGREGATE_CACHE_DIR, AGGREGATE_CACHE_MAX_MB
+)
+from core.aggregate_cache import AggregateCache
+from core.cache import TTLCache
+from core.checkpoint import CheckpointStore
 from core.data_processor import DataProcessor
-from core.exceptions import FileParsingError, DataImporterError
+from core.exceptions import FileParsingError, DataImporterError, JobQueueFullError, JobStateError, RepositoryError
 from core.file_parser import FileParser
-from core.repository import MongoRepository, AbstractRepository
-from core.services import DataImportService
+from core.jobs import ImportJobManager
+from core.metrics import REGISTRY
+from core.models import DebtorData, DebtorLookupRequest, DebtorLookupResponse, EntityData
+from core.repository import AbstractRepository, create_repository, describe_backend
+from core.services import DataImportService, LookupService
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-mongo_repo_instance = MongoRepository()
+repository_instance = create_repository()
 file_parser_instance = FileParser()
 data_processor_instance = DataProcessor(file_parser=file_parser_instance)
+lookup_cache_instance = TTLCache(max_size=LOOKUP_CACHE_SIZE, ttl_seconds=LOOKUP_CACHE_TTL_SECONDS)
+checkpoint_store_instance = CheckpointStore(CHECKPOINT_DIR) if JOB_CHECKPOINTS else None
+aggregate_cache_instance = (
+    AggregateCache(AGGREGATE_CACHE_DIR, AGGREGATE_CACHE_MAX_MB * 1024 * 1024) if DUPLICATE_IMPORTS != "allow" else None
+)
+# Se crea en el lifespan para que los procesos no se inicien al importar el módulo.
+process_pool_instance: Optional[ProcessPoolExecutor] = None
+job_manager_instance = ImportJobManager(
+    service_factory=lambda: get_data_import_service(
+        file_parser_instance, data_processor_instance, repository_instance, process_pool_instance,
+        lookup_cache_instance, checkpoint_store_instance, aggregate_cache_instance
+    ),
+    workers=JOB_WORKERS,
+    queue_size=JOB_QUEUE_SIZE,
+    history_limit=JOB_HISTORY_LIMIT,
+    checkpoint_store=checkpoint_store_instance,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info(f"Iniciando API. Conectando a MongoDB: {DB_NAME} en {MONGO_CONNECTION_STRING.split('@')[-1]}")
-    await mongo_repo_instance.connect()
+    global process_pool_instance
+    logger.info(f"Iniciando API. Conectando a {describe_backend()}")
+    await repository_instance.connect()
+    if API_PROCESS_WORKERS > 0:
+        process_pool_instance = ProcessPoolExecutor(max_workers=API_PROCESS_WORKERS)
+        logger.info(f"Pool de {API_PROCESS_WORKERS} procesos para parseo y agregación iniciado.")
+    await job_manager_instance.start()
     yield
-    logger.info("Cerrando API. Desconectando de MongoDB.")
-    await mongo_repo_instance.disconnect()
+    logger.info("Cerrando API. Desconectando del repositorio.")
+    await job_manager_instance.stop()
+    if process_pool_instance:
+        process_pool_instance.shutdown(wait=True, cancel_futures=True)
+        process_pool_instance = None
+    await repository_instance.disconnect()
 
 
 app = FastAPI(
@@ -36,7 +76,7 @@ app = FastAPI(
 )
 
 def get_repository() -> AbstractRepository:
-    return mongo_repo_instance
+    return repository_instance
 
 def get_file_parser() -> FileParser:
     return file_parser_instance
@@ -44,59 +84,240 @@ def get_file_parser() -> FileParser:
 def get_data_processor() -> DataProcessor:
     return data_processor_instance
 
+def get_job_manager() -> ImportJobManager:
+    return job_manager_instance
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    return process_pool_instance
+
+def get_lookup_cache() -> TTLCache:
+    return lookup_cache_instance
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    return checkpoint_store_instance
+
+def get_aggregate_cache() -> Optional[AggregateCache]:
+    return aggregate_cache_instance
+
 def get_data_import_service(
     parser: FileParser = Depends(get_file_parser),
     processor: DataProcessor = Depends(get_data_processor),
-    repository: AbstractRepository = Depends(get_repository)
+    repository: AbstractRepository = Depends(get_repository),
+    process_pool: Optional[ProcessPoolExecutor] = Depends(get_process_pool),
+    lookup_cache: TTLCache = Depends(get_lookup_cache),
+    checkpoint_store: Optional[CheckpointStore] = Depends(get_checkpoint_store),
+    aggregate_cache: Optional[AggregateCache] = Depends(get_aggregate_cache)
 ) -> DataImportService:
-    return DataImportService(parser=parser, processor=processor, repository=repository)
+    return DataImportService(
+        parser=parser,
+        processor=processor,
+        repository=repository,
+        workers=API_PROCESS_WORKERS if process_pool else IMPORT_WORKERS,
+        executor=process_pool,
+        lookup_cache=lookup_cache,
+        checkpoint_store=checkpoint_store,
+        aggregate_cache=aggregate_cache,
+    )
 
+def get_lookup_service(
+    repository: AbstractRepository = Depends(get_repository),
+    lookup_cache: TTLCache = Depends(get_lookup_cache)
+) -> LookupService:
+    return LookupService(repository=repository, cache=lookup_cache)
 
-@app.post("/v1/import-txt-file/", summary="Importar datos desde archivo TXT")
-async def import_txt_file_endpoint(
-        file: UploadFile = File(..., description="Archivo TXT a procesar."),
-        service: DataImportService = Depends(get_data_import_service)
-):
+
+async def _iter_upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        yield chunk
+
+
+async def _import_stream(service: DataImportService, chunks: AsyncIterator[bytes], filename: str) -> dict:
     """
-    Sube un archivo TXT, lo procesa y guarda los datos extraídos en la base de datos.
+    Ejecuta la importación de un flujo y traduce el resultado o los errores a respuestas HTTP.
     """
-    temp_file_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="wb") as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            temp_file_path = tmp_file.name
-        logger.info(f"Archivo '{file.filename}' subido y guardado temporalmente en '{temp_file_path}'.")
-
-        summary = await service.import_data_from_file(temp_file_path)
+        summary = await service.import_data_from_stream(chunks, filename)
 
         if summary.get("status") == "completed_successfully" or summary.get("status") == "completed_no_data":
             return {
-                "filename": file.filename,
+                "filename": filename,
                 "message": "Archivo procesado.",
                 "details": summary
             }
+        elif summary.get("status") == "duplicate":
+            return {
+                "filename": filename,
+                "message": "El contenido ya se había importado; no se escribió nada.",
+                "details": summary
+            }
         else:
-            logger.error(f"Error durante el procesamiento del archivo '{file.filename}': {summary.get('error_message')}")
+            logger.error(f"Error durante el procesamiento del archivo '{filename}': {summary.get('error_message')}")
             raise HTTPException(
                 status_code=500,
                 detail=summary.get("error_message", "Error desconocido durante el procesamiento del archivo.")
             )
 
     except FileParsingError as e:
-        logger.error(f"Error de parseo para el archivo '{file.filename}': {e}")
+        logger.error(f"Error de parseo para el archivo '{filename}': {e}")
         raise HTTPException(status_code=400, detail=f"Error al parsear el archivo: {e}")
     except DataImporterError as e:
-        logger.error(f"Error de importación para el archivo '{file.filename}': {e}")
+        logger.error(f"Error de importación para el archivo '{filename}': {e}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor al procesar el archivo: {e}")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.critical(f"Error crítico no manejado para el archivo '{file.filename}': {e}", exc_info=True)
+        logger.critical(f"Error crítico no manejado para el archivo '{filename}': {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno crítico del servidor.")
+
+
+@app.post("/v1/import-txt-file/", summary="Importar datos desde archivo TXT")
+async def import_txt_file_endpoint(
+        file: UploadFile = File(..., description="Archivo TXT a procesar (opcionalmente .gz o .zip)."),
+        service: DataImportService = Depends(get_data_import_service)
+):
+    """
+    Sube un archivo TXT, lo procesa y guarda los datos extraídos en la base de datos.
+    El archivo se parsea por bloques a medida que se lee, sin copiarlo a un archivo temporal.
+    También acepta el TXT comprimido en .gz o .zip, que se descomprime en streaming.
+    """
+    try:
+        return await _import_stream(service, _iter_upload_chunks(file), file.filename)
     finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-                logger.info(f"Archivo temporal '{temp_file_path}' eliminado.")
-            except Exception as e_rm:
-                logger.error(f"No se pudo eliminar el archivo temporal '{temp_file_path}': {e_rm}")
-        if file:
-            await file.close()
\ No newline at end of file
+        await file.close()
+
+
+@app.post("/v1/import-txt-stream/", summary="Importar datos desde el cuerpo de la solicitud")
+async def import_txt_stream_endpoint(
+        request: Request,
+        filename: str = Query("stream.txt", description="Nombre del archivo para el resumen."),
+        service: DataImportService = Depends(get_data_import_service)
+):
+    """
+    Recibe el archivo TXT como cuerpo crudo de la solicitud (no multipart) y lo procesa mientras se sube.
+    Si el cuerpo está comprimido en .gz o .zip se descomprime en streaming.
+    """
+    return await _import_stream(service, request.stream(), filename)
+
+
+@app.post("/v1/jobs/", status_code=202, summary="Encolar la importación de un archivo TXT")
+async def create_import_job_endpoint(
+        file: UploadFile = File(..., description="Archivo TXT a procesar (opcionalmente .gz o .zip)."),
+        manager: ImportJobManager = Depends(get_job_manager)
+):
+    """
+    Guarda el archivo y encola su importación. Devuelve el id del job sin esperar a que termine;
+    el estado se consulta en GET /v1/jobs/{job_id}.
+    """
+    if not manager.has_capacity():
+        raise HTTPException(status_code=503, detail="La cola de importaciones está llena. Reintenta más tarde.")
+
+    fd, spool_path = tempfile.mkstemp(suffix=".txt", prefix="import_job_", dir=JOB_SPOOL_DIR)
+    os.close(fd)
+    try:
+        async with aiofiles.open(spool_path, "wb") as spool_file:
+            async for chunk in _iter_upload_chunks(file):
+                await spool_file.write(chunk)
+        job = manager.submit(spool_path, file.filename)
+    except JobQueueFullError as e:
+        os.remove(spool_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"No se pudo encolar el archivo '{file.filename}': {e}")
+        os.remove(spool_path)
+        raise HTTPException(status_code=500, detail="No se pudo encolar el archivo.")
+    finally:
+        await file.close()
+    return job.model_dump()
+
+
+@app.get("/v1/jobs/{job_id}", summary="Consultar el estado de un job de importación")
+async def get_import_job_endpoint(job_id: str, manager: ImportJobManager = Depends(get_job_manager)):
+    """
+    Devuelve el estado, el progreso (bytes y registros procesados) y el resumen final de un job.
+    """
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' no encontrado.")
+    return job.model_dump()
+
+
+@app.post("/v1/jobs/{job_id}/resume", status_code=202, summary="Reanudar un job de importación fallido")
+async def resume_import_job_endpoint(job_id: str, manager: ImportJobManager = Depends(get_job_manager)):
+    """
+    Vuelve a encolar un job fallido, que continúa desde su último checkpoint. Requiere JOB_CHECKPOINTS=true.
+    """
+    if manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' no encontrado.")
+    try:
+        job = manager.resume(job_id)
+    except JobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.model_dump()
+
+
+@app.get(
+    "/v1/debtors/{cuit_cuil}", response_model=DebtorData, response_model_by_alias=False, summary="Consultar un deudor"
+)
+async def get_debtor_endpoint(
+        cuit_cuil: int = Path(..., ge=0, description="CUIT/CUIL del deudor."),
+        lookup: LookupService = Depends(get_lookup_service)
+):
+    """
+    Devuelve la situación máxima, el total de préstamos y la entidad de un deudor.
+    """
+    try:
+        debtor = await lookup.get_debtor(cuit_cuil)
+    except RepositoryError as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar el deudor: {e}")
+    if debtor is None:
+        raise HTTPException(status_code=404, detail="Deudor no encontrado.")
+    return debtor
+
+
+@app.post(
+    "/v1/debtors/lookup", response_model=DebtorLookupResponse, response_model_by_alias=False,
+    summary="Consultar varios deudores"
+)
+async def lookup_debtors_endpoint(
+        request: DebtorLookupRequest,
+        lookup: LookupService = Depends(get_lookup_service)
+):
+    """
+    Busca varios CUIT/CUIL en una sola consulta. Los que no existen se informan en `not_found`.
+    """
+    try:
+        debtors = await lookup.get_debtors(request.cuit_cuils)
+    except RepositoryError as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar los deudores: {e}")
+    return DebtorLookupResponse(
+        debtors=[debtor for debtor in debtors.values() if debtor is not None],
+        not_found=[cuit_cuil for cuit_cuil, debtor in debtors.items() if debtor is None],
+    )
+
+
+@app.get("/v1/entities/{entity_code}", response_model=EntityData, summary="Consultar una entidad")
+async def get_entity_endpoint(
+        entity_code: int = Path(..., ge=0, description="Código de la entidad."),
+        lookup: LookupService = Depends(get_lookup_service)
+):
+    """
+    Devuelve el total de préstamos de una entidad.
+    """
+    try:
+        entity = await lookup.get_entity(entity_code)
+    except RepositoryError as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar la entidad: {e}")
+    if entity is None:
+        raise HTTPException(status_code=404, detail="Entidad no encontrada.")
+    return entity
+
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="Métricas en formato Prometheus")
+async def metrics_endpoint():
+    """
+    Totales de las importaciones de este proceso: registros, documentos escritos, tiempo por etapa,
+    latencia de escritura por lote y memoria pico.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,181 @@
+"""
+Suite de benchmarks del importador.
+
+    python -m benchmarks generate datos.txt --rows 1000000
+    python -m benchmarks run --rows 1000000 --output resultados.json
+    python -m benchmarks compare base.json resultados.json
+"""
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import typer
+from typing_extensions import Annotated
+
+from benchmarks.generator import generate_file
+from benchmarks.stages import ENGINES, run_stages
+from benchmarks.startup import measure_startup
+from core.config import AGGREGATE_AS_DOCUMENTS, PARSE_BATCH_SIZE, PARSE_CHUNK_BYTES, WRITE_MODE
+
+app = typer.Typer(help="Benchmarks reproducibles de parseo, agregación, serialización y escritura.")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@app.command()
+def generate(
+    file_path: Annotated[str, typer.Argument(help="Ruta del archivo a generar.")],
+    rows: Annotated[int, typer.Option(min=1, help="Líneas totales.")] = 1_000_000,
+    cuits: Annotated[int, typer.Option(min=1, help="CUIT/CUIL distintos.")] = 300_000,
+    entities: Annotated[int, typer.Option(min=1, max=99_999, help="Códigos de entidad distintos.")] = 40,
+    bad_ratio: Annotated[float, typer.Option(min=0.0, max=1.0, help="Fracción de líneas inválidas.")] = 0.01,
+    seed: Annotated[int, typer.Option(help="Semilla del generador.")] = 42,
+):
+    """
+    Genera un archivo sintético de ancho fijo.
+    """
+    size = generate_file(file_path, rows, cuits, entities, bad_ratio, seed)
+    typer.echo(f"Generado {file_path}: {rows} líneas, {size} bytes.")
+
+
+@app.command()
+def run(
+    file_path: Annotated[Optional[str], typer.Option("--file", help="Archivo existente a medir; si no se indica se genera uno temporal.")] = None,
+    rows: Annotated[int, typer.Option(min=1, help="Líneas del archivo generado.")] = 1_000_000,
+    cuits: Annotated[int, typer.Option(min=1, help="CUIT/CUIL distintos del archivo generado.")] = 300_000,
+    entities: Annotated[int, typer.Option(min=1, max=99_999, help="Códigos de entidad distintos del archivo generado.")] = 40,
+    bad_ratio: Annotated[float, typer.Option(min=0.0, max=1.0, help="Fracción de líneas inválidas del archivo generado.")] = 0.01,
+    seed: Annotated[int, typer.Option(help="Semilla del generador.")] = 42,
+    engines: Annotated[List[str], typer.Option("--engine", "-e", help="Motores a medir (repetible).")] = ["stream", "mmap", "numpy"],
+    repeat: Annotated[int, typer.Option(min=1, help="Repeticiones por etapa; se informa la más rápida.")] = 1,
+    memory: Annotated[bool, typer.Option(help="Medir la memoria pico de cada etapa (pasada extra con tracemalloc).")] = True,
+    write_mode: Annotated[str, typer.Option(help="Modo de la etapa de escritura: insert o upsert.")] = WRITE_MODE,
+    startup: Annotated[bool, typer.Option(help="Medir el arranque en frío de la CLI y de los módulos principales.")] = True,
+    output: Annotated[Optional[str], typer.Option("--output", "-o", help="Archivo JSON de salida; por defecto, la salida estándar.")] = None,
+):
+    """
+    Mide records/seg, tiempo de CPU y memoria pico de cada etapa y emite los resultados en JSON.
+    """
+    for engine in engines:
+        if engine not in ENGINES:
+            raise typer.BadParameter(f"Motor desconocido: {engine}. Opciones: {', '.join(ENGINES)}.")
+    if "numpy" in engines:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            typer.secho("NumPy no está instalado; se omite el motor 'numpy'.", fg=typer.colors.YELLOW, err=True)
+            engines = [engine for engine in engines if engine != "numpy"]
+    # Los avisos por línea inválida no aportan a la medición y solo agregan ruido.
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as temp_dir:
+        dataset = {"file": file_path}
+        if file_path is None:
+            file_path = os.path.join(temp_dir, "synthetic.txt")
+            generate_file(file_path, rows, cuits, entities, bad_ratio, seed)
+            dataset = {"rows": rows, "cuits": cuits, "entities": entities, "bad_ratio": bad_ratio, "seed": seed}
+        dataset["bytes"] = os.path.getsize(file_path)
+        # Los avisos que el parser escribe por salida estándar no deben mezclarse con el JSON.
+        with contextlib.redirect_stdout(sys.stderr):
+            stages = run_stages(
+                file_path, engines, PARSE_BATCH_SIZE, PARSE_CHUNK_BYTES, AGGREGATE_AS_DOCUMENTS, write_mode,
+                repeat, memory
+            )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "dataset": dataset,
+        "config": {
+            "batch_size": PARSE_BATCH_SIZE, "chunk_bytes": PARSE_CHUNK_BYTES,
+            "as_documents": AGGREGATE_AS_DOCUMENTS, "write_mode": write_mode, "repeat": repeat,
+        },
+        "stages": stages,
+    }
+    if startup:
+        # Cada arranque varía más que las etapas, así que se toman al menos 5 muestras.
+        report["startup"] = measure_startup(max(repeat, 5))
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        typer.echo(f"Resultados guardados en {output}.", err=True)
+    else:
+        typer.echo(text)
+
+
+@app.command()
+def compare(
+    baseline: Annotated[str, typer.Argument(help="JSON de referencia.")],
+    current: Annotated[str, typer.Argument(help="JSON a comparar.")],
+    threshold: Annotated[float, typer.Option(min=0.0, help="Caída de records/seg (o aumento del arranque) tolerada (0.1 = 10%).")] = 0.1,
+):
+    """
+    Compara dos resultados etapa por etapa (y los tiempos de arranque, si ambos los tienen).
+    Termina con código 1 si alguna etapa o arranque empeora más que el umbral.
+    """
+    with open(baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(current, encoding="utf-8") as f:
+        current_report = json.load(f)
+    base_stages = {(s["stage"], s["engine"]): s for s in base["stages"]}
+    current_stages = current_report["stages"]
+
+    regressions = 0
+    for stage in current_stages:
+        key = (stage["stage"], stage["engine"])
+        label = f"{stage['stage']}/{stage['engine'] or '-'}"
+        previous = base_stages.get(key)
+        if not previous or not previous["records_per_sec"] or not stage["records_per_sec"]:
+            typer.echo(f"{label:<20} {stage['records_per_sec'] or 0:>14,.0f} rec/s  (sin referencia)")
+            continue
+        ratio = stage["records_per_sec"] / previous["records_per_sec"]
+        color = None
+        if ratio < 1 - threshold:
+            regressions += 1
+            color = typer.colors.RED
+        typer.secho(
+            f"{label:<20} {previous['records_per_sec']:>14,.0f} -> {stage['records_per_sec']:>14,.0f} rec/s  "
+            f"({ratio - 1:+.1%})",
+            fg=color,
+        )
+    base_startup = {entry["target"]: entry for entry in base.get("startup", [])}
+    for entry in current_report.get("startup", []):
+        label = f"arranque {entry['target']}"
+        previous = base_startup.get(entry["target"])
+        if not previous or not previous["seconds"] or not entry["seconds"]:
+            typer.echo(f"{label:<32} {entry['seconds'] or 0:>8.3f} s  (sin referencia)")
+            continue
+        ratio = entry["seconds"] / previous["seconds"]
+        color = None
+        if ratio > 1 + threshold:
+            regressions += 1
+            color = typer.colors.RED
+        typer.secho(
+            f"{label:<32} {previous['seconds']:>8.3f} -> {entry['seconds']:>8.3f} s  ({ratio - 1:+.1%})", fg=color
+        )
+    if regressions:
+        typer.secho(f"{regressions} etapa(s) más lentas que el umbral de {threshold:.0%}.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
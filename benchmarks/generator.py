@@ -0,0 +1,86 @@
+"""
+Generador de archivos sintéticos de ancho fijo con el mismo formato que los archivos de deudores.
+Las columnas se ubican según los slices de core/config.py.
+"""
+import random
+from typing import List
+
+from core.config import ENTITY_CODE_SLICE, CUIT_CUIL_SLICE, SITUATION_SLICE, TOTAL_SLICE
+
+# Columnas de relleno después del total (otros campos del archivo original que el importador no usa).
+_TRAILING_COLUMNS = 8
+_LINE_WIDTH = max(ENTITY_CODE_SLICE.stop, CUIT_CUIL_SLICE.stop, SITUATION_SLICE.stop, TOTAL_SLICE.stop) + _TRAILING_COLUMNS
+_FIRST_CUIT = 20_000_000_000
+_WRITE_LINES = 10_000
+
+
+def _put(line: bytearray, field: slice, value: str, align_right: bool = True):
+    width = field.stop - field.start
+    text = value.rjust(width) if align_right else value.ljust(width)
+    line[field] = text[:width].encode("ascii")
+
+
+def _valid_line(rng: random.Random, cuit: int, entity_code: int) -> bytearray:
+    line = bytearray(b" " * _LINE_WIDTH)
+    _put(line, ENTITY_CODE_SLICE, f"{entity_code:05d}")
+    _put(line, slice(ENTITY_CODE_SLICE.stop, CUIT_CUIL_SLICE.start), "202401  ", align_right=False)
+    _put(line, CUIT_CUIL_SLICE, str(cuit))
+    _put(line, SITUATION_SLICE, f"{rng.randint(1, 5):02d}")
+    _put(line, TOTAL_SLICE, f"{rng.randint(0, 9_999_999)},{rng.randint(0, 9)}")
+    _put(line, slice(TOTAL_SLICE.stop, _LINE_WIDTH), "0" * _TRAILING_COLUMNS)
+    return line
+
+
+def _bad_line(rng: random.Random, cuit: int, entity_code: int) -> bytearray:
+    """
+    Líneas que el importador debe omitir o sanear: vacías, con código o CUIT no numérico, o con un total inválido.
+    """
+    kind = rng.randrange(4)
+    if kind == 0:
+        return bytearray()
+    line = _valid_line(rng, cuit, entity_code)
+    if kind == 1:
+        _put(line, ENTITY_CODE_SLICE, "ABCDE")
+    elif kind == 2:
+        _put(line, CUIT_CUIL_SLICE, "20-1234567X")
+    else:
+        _put(line, TOTAL_SLICE, "12x,5")
+    return line
+
+
+def generate_file(
+        file_path: str,
+        rows: int,
+        distinct_cuits: int,
+        entities: int,
+        bad_line_ratio: float = 0.0,
+        seed: int = 42
+) -> int:
+    """
+    Escribe un archivo de ancho fijo con datos sintéticos reproducibles.
+    :param file_path: Ruta del archivo a generar.
+    :param rows: Cantidad total de líneas, incluidas las inválidas.
+    :param distinct_cuits: Cantidad de CUIT/CUIL distintos entre los que se reparten las líneas.
+    :param entities: Cantidad de códigos de entidad distintos.
+    :param bad_line_ratio: Fracción de líneas inválidas (0 a 1).
+    :param seed: Semilla del generador; la misma semilla produce el mismo archivo.
+    :return: Tamaño del archivo generado en bytes.
+    """
+    rng = random.Random(seed)
+    entity_codes = rng.sample(range(1, 100_000), entities)
+    size = 0
+    with open(file_path, "wb") as f:
+        pending: List[bytes] = []
+        for _ in range(rows):
+            cuit = _FIRST_CUIT + rng.randrange(distinct_cuits)
+            entity_code = rng.choice(entity_codes)
+            if bad_line_ratio and rng.random() < bad_line_ratio:
+                pending.append(bytes(_bad_line(rng, cuit, entity_code)))
+            else:
+                pending.append(bytes(_valid_line(rng, cuit, entity_code)))
+            if len(pending) >= _WRITE_LINES:
+                size += f.write(b"\n".join(pending) + b"\n")
+                pending = []
+        if pending:
+            size += f.write(b"\n".join(pending) + b"\n")
+    return size
@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, List, Optional
+
+from core.models import DebtorData, EntityData
+from core.repository import (
+    AbstractRepository, FINGERPRINT_FIELD, debtor_fingerprint, empty_upsert_counts, entity_fingerprint, to_document
+)
+
+
+class InMemoryRepository(AbstractRepository):
+    """
+    Repositorio en memoria que cumple el contrato de AbstractRepository sin base de datos,
+    para medir la etapa de escritura sin depender de MongoDB.
+    """
+
+    def __init__(self):
+        self.debtors: List[dict] = []
+        self.entities: List[dict] = []
+        self._debtors_by_key: Dict[int, dict] = {}
+        self._entities_by_key: Dict[int, dict] = {}
+        self.history: List[dict] = []
+
+    async def save_debtors(self, debtors: Iterable[DebtorData | dict]) -> int:
+        documents = [to_document(debtor) for debtor in debtors]
+        self.debtors.extend(documents)
+        return len(documents)
+
+    async def save_entities(self, entities: Iterable[EntityData | dict]) -> int:
+        documents = [to_document(entity) for entity in entities]
+        self.entities.extend(documents)
+        return len(documents)
+
+    @staticmethod
+    def _upsert(records: Iterable, stored: Dict[int, dict], key: str, fingerprint) -> Dict[str, int]:
+        counts = empty_upsert_counts()
+        for record in records:
+            document = dict(to_document(record))
+            document[FINGERPRINT_FIELD] = fingerprint(document)
+            previous = stored.get(document[key])
+            if previous is None:
+                counts["inserted"] += 1
+            elif previous[FINGERPRINT_FIELD] == document[FINGERPRINT_FIELD]:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            stored[document[key]] = document
+        return counts
+
+    async def upsert_debtors(self, debtors: Iterable[DebtorData | dict]) -> Dict[str, int]:
+        return self._upsert(debtors, self._debtors_by_key, "cuit_cuil", debtor_fingerprint)
+
+    async def upsert_entities(self, entities: Iterable[EntityData | dict]) -> Dict[str, int]:
+        return self._upsert(entities, self._entities_by_key, "entity_code", entity_fingerprint)
+
+    @staticmethod
+    def _find_latest(documents: List[dict], stored: Dict[int, dict], key: str, value: int) -> Optional[dict]:
+        # Igual que en MongoDB, gana el último documento escrito: primero los de upsert y luego los insertados.
+        for document in reversed(documents):
+            if document[key] == value:
+                return document
+        return stored.get(value)
+
+    @staticmethod
+    def _to_model(document: Optional[dict], model):
+        if document is None:
+            return None
+        return model(**{k: v for k, v in document.items() if k != FINGERPRINT_FIELD})
+
+    async def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        document = self._find_latest(self.debtors, self._debtors_by_key, "cuit_cuil", cuit_cuil)
+        return self._to_model(document, DebtorData)
+
+    async def get_debtors(self, cuit_cuils: Iterable[int]) -> Dict[int, DebtorData]:
+        debtors = {}
+        for cuit_cuil in cuit_cuils:
+            debtor = await self.get_debtor(cuit_cuil)
+            if debtor is not None:
+                debtors[cuit_cuil] = debtor
+        return debtors
+
+    async def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        document = self._find_latest(self.entities, self._entities_by_key, "entity_code", entity_code)
+        return self._to_model(document, EntityData)
+
+    async def find_import(self, content_hash: str) -> Optional[dict]:
+        for entry in reversed(self.history):
+            if entry["content_hash"] == content_hash and entry["status"] == "completed_successfully":
+                return entry
+        return None
+
+    async def record_import(self, entry: dict):
+        self.history.append(dict(entry))
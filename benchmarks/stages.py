@@ -0,0 +1,179 @@
+"""
+Medición por etapa (parseo, agregación, serialización y escritura) de throughput y memoria pico.
+"""
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+import bson
+
+from benchmarks.memory_repository import InMemoryRepository
+from core.data_processor import DataProcessor
+from core.file_parser import FileParser
+from core.repository import AbstractRepository, to_document
+from core.sqlite_repository import SQLiteRepository
+
+ENGINES = ("stream", "mmap", "numpy")
+
+
+def _measure(run: Callable[[], Any], count: Callable[[Any], int], repeat: int, memory: bool) -> Tuple[Any, Dict]:
+    """
+    Ejecuta `run` `repeat` veces y se queda con la más rápida. La memoria pico se mide en una pasada
+    aparte con tracemalloc, para que su costo no afecte los tiempos.
+    :param count: Devuelve la cantidad de registros procesados a partir del resultado de `run`.
+    """
+    best_wall = best_cpu = float("inf")
+    result = None
+    for _ in range(max(repeat, 1)):
+        result = None
+        gc.collect()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        result = run()
+        best_wall = min(best_wall, time.perf_counter() - start_wall)
+        best_cpu = min(best_cpu, time.process_time() - start_cpu)
+    records = count(result)
+    stats = {
+        "records": records,
+        "seconds": round(best_wall, 6),
+        "cpu_seconds": round(best_cpu, 6),
+        "records_per_sec": round(records / best_wall, 1) if best_wall > 0 else None,
+        "peak_memory_bytes": None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            stats["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+async def _iter_list(items: List) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def _collect(items: AsyncIterator) -> List:
+    return [item async for item in items]
+
+
+def _count_batches(batches: Iterable) -> int:
+    return sum(len(batch) for batch in batches)
+
+
+def _count_results(results: Tuple[List, List]) -> int:
+    return len(results[0]) + len(results[1])
+
+
+def _encode_documents(results: Tuple[List, List]) -> Tuple[List[bytes], List[bytes]]:
+    """
+    Serializa los documentos a BSON, igual que hace el driver antes de enviarlos a MongoDB.
+    """
+    debtors, entities = results
+    return [bson.encode(to_document(d)) for d in debtors], [bson.encode(to_document(e)) for e in entities]
+
+
+async def _write_to(repository: AbstractRepository, results: Tuple[List, List], write_mode: str):
+    debtors, entities = results
+    if write_mode == "upsert":
+        await repository.upsert_debtors(debtors)
+        await repository.upsert_entities(entities)
+    else:
+        await repository.save_debtors(debtors)
+        await repository.save_entities(entities)
+
+
+def _write_documents(results: Tuple[List, List], write_mode: str) -> Tuple[List, List]:
+    asyncio.run(_write_to(InMemoryRepository(), results, write_mode))
+    return results
+
+
+def _write_sqlite(results: Tuple[List, List], write_mode: str) -> Tuple[List, List]:
+    """
+    Escribe en una base SQLite temporal y vacía, con el mismo backend que REPOSITORY_BACKEND="sqlite".
+    """
+    async def write(path: str):
+        repository = SQLiteRepository(path)
+        await repository.connect()
+        try:
+            await _write_to(repository, results, write_mode)
+        finally:
+            await repository.disconnect()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_sqlite_") as temp_dir:
+        asyncio.run(write(os.path.join(temp_dir, "benchmark.db")))
+    return results
+
+
+def run_stages(
+        file_path: str,
+        engines: Iterable[str],
+        batch_size: int,
+        chunk_bytes: int,
+        as_documents: bool,
+        write_mode: str,
+        repeat: int = 1,
+        memory: bool = True
+) -> List[Dict]:
+    """
+    Mide cada etapa del importador sobre `file_path`. Cada etapa recibe la salida ya materializada de la anterior,
+    de modo que los tiempos no se mezclan. Las etapas de serialización y escritura son comunes a todos los motores
+    y se miden una sola vez sobre la salida del motor "mmap"; "write" usa un repositorio en memoria y
+    "write_sqlite" una base SQLite temporal.
+    :return: Una lista de resultados {"stage", "engine", "records", "seconds", ...}.
+    """
+    parser = FileParser()
+    processor = DataProcessor(file_parser=parser, as_documents=as_documents)
+    results: List[Dict] = []
+
+    def record(stage: str, engine: str | None, stats: Dict):
+        results.append({"stage": stage, "engine": engine, **stats})
+
+    for engine in engines:
+        if engine == "stream":
+            raw_records, stats = _measure(
+                lambda: asyncio.run(_collect(parser.stream_raw_records(file_path))), len, repeat, memory
+            )
+            record("parse", engine, stats)
+            _, stats = _measure(
+                lambda: asyncio.run(processor.aggregate_data(_iter_list(raw_records))),
+                lambda _: len(raw_records), repeat, memory
+            )
+            record("aggregate", engine, stats)
+        elif engine == "mmap":
+            batches, stats = _measure(
+                lambda: list(parser.iter_record_batches(file_path, batch_size)), _count_batches, repeat, memory
+            )
+            record("parse", engine, stats)
+            record_count = stats["records"]
+            partials, stats = _measure(
+                lambda: processor.accumulate_record_batches(batches), lambda _: record_count, repeat, memory
+            )
+            record("aggregate", engine, stats)
+            built, stats = _measure(lambda: processor.build_results(*partials), _count_results, repeat, memory)
+            record("build", engine, stats)
+            _, stats = _measure(lambda: _encode_documents(built), _count_results, repeat, memory)
+            record("serialize", None, stats)
+            _, stats = _measure(lambda: _write_documents(built, write_mode), _count_results, repeat, memory)
+            record("write", None, stats)
+            _, stats = _measure(lambda: _write_sqlite(built, write_mode), _count_results, repeat, memory)
+            record("write_sqlite", None, stats)
+        elif engine == "numpy":
+            from core.columnar import aggregate_chunks
+
+            chunks, stats = _measure(
+                lambda: list(parser.iter_columnar_chunks(file_path, chunk_bytes)), _count_batches, repeat, memory
+            )
+            record("parse", engine, stats)
+            record_count = stats["records"]
+            _, stats = _measure(lambda: aggregate_chunks(chunks), lambda _: record_count, repeat, memory)
+            record("aggregate", engine, stats)
+        else:
+            raise ValueError(f"Motor desconocido: {engine}")
+    return results
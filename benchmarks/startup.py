@@ -0,0 +1,39 @@
+"""
+Tiempo de arranque en frío de los puntos de entrada: cada medición lanza un intérprete nuevo.
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Objetivo -> argumentos del intérprete. "python" es la referencia del intérprete vacío.
+STARTUP_TARGETS = {
+    "python": ["-c", "pass"],
+    "cli --help": [os.path.join(_ROOT, "cli.py"), "--help"],
+    "import core.services": ["-c", "import core.services"],
+    "import api.main": ["-c", "import api.main"],
+}
+
+
+def measure_startup(repeat: int) -> List[Dict]:
+    """
+    Ejecuta cada objetivo `repeat` veces y se queda con la más rápida.
+    :return: Una entrada por objetivo con los segundos de reloj, o None y el error si el objetivo falló.
+    """
+    results = []
+    for target, args in STARTUP_TARGETS.items():
+        best = float("inf")
+        error = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, *args], cwd=_ROOT, capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+            if completed.returncode != 0:
+                error = (completed.stderr.strip().splitlines() or ["código de salida distinto de cero"])[-1]
+                break
+            best = min(best, elapsed)
+        results.append({"target": target, "seconds": None if error else round(best, 4), "error": error})
+    return results
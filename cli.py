@@ -1,28 +1,62 @@
-import asyncio
+import glob
+import itertools
+import os
 import typer
 import logging
+from typing import TYPE_CHECKING, List, Optional
 from typing_extensions import Annotated
 
-from core.config import MONGO_CONNECTION_STRING, DB_NAME
-from core.data_processor import DataProcessor
-from core.exceptions import DataImporterError
-from core.file_parser import FileParser
-from core.repository import MongoRepository
-from core.services import DataImportService
+from core.config import (
+    IMPORT_WORKERS, CHECKPOINT_DIR, DUPLICATE_IMPORTS, AGGREGATE_CACHE_DIR,
+    AGGREGATE_CACHE_MAX_MB, AGGREGATION_MEMORY_LIMIT_MB, INPUT_SORTED_BY
+)
+from core.exceptions import DataImporterError, SnapshotError
+
+# El servicio y sus dependencias (motor, pymongo, pydantic, asyncio) se cargan recién al ejecutar un comando,
+# para que `--help` y los errores de argumentos respondan sin pagar esas importaciones.
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from core.services import DataImportService
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 app = typer.Typer(help="Herramienta CLI para importar datos de deudores y entidades desde archivos TXT.")
 
-file_parser = FileParser()
-data_processor = DataProcessor(file_parser=file_parser)
-mongo_repo = MongoRepository()
 
-data_import_service = DataImportService(
-    parser=file_parser,
-    processor=data_processor,
-    repository=mongo_repo
-)
+def _build_service(workers: int = IMPORT_WORKERS, executor: Optional["Executor"] = None) -> "DataImportService":
+    """Arma el servicio con el parser, el procesador y el repositorio configurado (sin conectarlo)."""
+    from core.aggregate_cache import AggregateCache
+    from core.checkpoint import CheckpointStore
+    from core.data_processor import DataProcessor
+    from core.file_parser import FileParser
+    from core.repository import create_repository
+    from core.services import DataImportService
+
+    file_parser = FileParser()
+    aggregate_cache = (
+        AggregateCache(AGGREGATE_CACHE_DIR, AGGREGATE_CACHE_MAX_MB * 1024 * 1024) if DUPLICATE_IMPORTS != "allow" else None
+    )
+    return DataImportService(
+        parser=file_parser,
+        processor=DataProcessor(file_parser=file_parser),
+        repository=create_repository(),
+        workers=workers,
+        executor=executor,
+        checkpoint_store=CheckpointStore(CHECKPOINT_DIR),
+        aggregate_cache=aggregate_cache
+    )
+
+
+def _process_pool(workers: int) -> Optional["Executor"]:
+    if workers <= 1:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _run(coroutine):
+    import asyncio
+    return asyncio.run(coroutine)
 
 
 @app.callback()
@@ -30,38 +64,231 @@ def callback():
     """
     Se ejecuta antes de cualquier comando. Muestra la configuración de DB.
     """
-    typer.echo(f"Usando MongoDB: {DB_NAME} en {MONGO_CONNECTION_STRING.split('@')[-1]}")
+    from core.repository import describe_backend
+    typer.echo(f"Usando {describe_backend()}")
+
+
+def _print_profile(metrics: dict):
+    """Imprime el desglose por etapa de las métricas de la importación."""
+    typer.secho("Perfil de la importación:", fg=typer.colors.CYAN)
+    typer.echo(f"  {'Etapa':<16}{'Reloj (s)':>12}{'CPU (s)':>12}")
+    for name, stage in metrics["stages"].items():
+        typer.echo(f"  {name:<16}{stage['wall_seconds']:>12.3f}{stage['cpu_seconds']:>12.3f}")
+    typer.echo(f"  {'total':<16}{metrics['wall_seconds']:>12.3f}{metrics['cpu_seconds']:>12.3f}")
+    typer.echo(
+        f"  Registros: {metrics['records_read']} leídos, {metrics['records_skipped']} omitidos, "
+        f"{metrics['records_aggregated']} agregados ({metrics['records_per_sec'] or 0:,.0f} registros/s)"
+    )
+    for collection, histogram in metrics["write_batches"].items():
+        average = histogram["sum_seconds"] / histogram["count"] if histogram["count"] else 0.0
+        typer.echo(
+            f"  Escritura '{collection}': {histogram['count']} lotes, promedio {average * 1000:.1f} ms, "
+            f"máximo {histogram['max_seconds'] * 1000:.1f} ms"
+        )
+    if metrics["peak_rss_bytes"] is not None:
+        typer.echo(f"  Memoria pico (RSS): {metrics['peak_rss_bytes'] / (1024 * 1024):.1f} MB")
 
 
-async def _import_file_async(file_path: str):
+def _print_summary(summary: dict, profile: bool = False):
+    """Imprime los contadores del resumen de una importación."""
+    typer.secho(f"  Estado: {summary.get('status', 'desconocido')}", fg=typer.colors.GREEN)
+    typer.secho(f"  Deudores guardados: {summary.get('debtors_saved', 0)}", fg=typer.colors.GREEN)
+    typer.secho(f"  Entidades guardadas: {summary.get('entities_saved', 0)}", fg=typer.colors.GREEN)
+    if "debtors_unchanged" in summary:
+        for label, prefix in (("Deudores", "debtors"), ("Entidades", "entities")):
+            typer.secho(
+                f"  {label}: {summary[f'{prefix}_inserted']} nuevos, {summary[f'{prefix}_updated']} actualizados, "
+                f"{summary[f'{prefix}_unchanged']} sin cambios",
+                fg=typer.colors.GREEN,
+            )
+    if summary.get("records_rejected"):
+        rejected = ", ".join(f"{reason}: {count}" for reason, count in sorted(summary["records_rejected"].items()))
+        typer.secho(f"  Líneas rechazadas: {rejected}", fg=typer.colors.YELLOW)
+    if "rejects_path" in summary:
+        typer.secho(f"  Rechazos guardados en: {summary['rejects_path']}", fg=typer.colors.YELLOW)
+    if "error_message" in summary:
+        typer.secho(f"  Error: {summary['error_message']}", fg=typer.colors.RED, err=True)
+    if profile and "metrics" in summary:
+        _print_profile(summary["metrics"])
+
+
+async def _import_file_async(
+    file_path: str, workers: int, profile: bool = False, checkpoint: bool = False, resume: bool = False
+):
     """Función auxiliar asíncrona para manejar la lógica del comando."""
+    from core.checkpoint import checkpoint_key
+
+    service = _build_service()
     try:
-        await mongo_repo.connect()
-        summary = await data_import_service.import_data_from_file(file_path)
+        await service.repository.connect()
+        summary = await service.import_data_from_file(
+            file_path, workers=workers, checkpoint_key=checkpoint_key(file_path) if checkpoint or resume else None,
+            resume=resume
+        )
         typer.secho(f"Resumen de importación para '{file_path}':", fg=typer.colors.GREEN)
-        typer.secho(f"  Estado: {summary.get('status', 'desconocido')}", fg=typer.colors.GREEN)
-        typer.secho(f"  Deudores guardados: {summary.get('debtors_saved', 0)}", fg=typer.colors.GREEN)
-        typer.secho(f"  Entidades guardadas: {summary.get('entities_saved', 0)}", fg=typer.colors.GREEN)
-        if "error_message" in summary:
-            typer.secho(f"  Error: {summary['error_message']}", fg=typer.colors.RED, err=True)
+        if "resumed_from" in summary:
+            resumed = summary["resumed_from"]
+            typer.secho(
+                f"  Reanudada desde el byte {resumed['offset']} ({resumed['debtors_written']} deudores y "
+                f"{resumed['entities_written']} entidades ya escritos)",
+                fg=typer.colors.GREEN,
+            )
+        _print_summary(summary, profile)
 
     except DataImporterError as e:
         typer.secho(f"Error de importación: {e}", fg=typer.colors.RED, err=True)
     except Exception as e:
         typer.secho(f"Error inesperado en CLI: {e}", fg=typer.colors.RED, err=True)
     finally:
-        await mongo_repo.disconnect()
+        await service.repository.disconnect()
 
 
 @app.command()
 def import_file(
-    file_path: Annotated[str, typer.Argument(exists=True, file_okay=True, dir_okay=False, readable=True, help="Ruta al archivo TXT a importar.")]
+    file_path: Annotated[str, typer.Argument(exists=True, file_okay=True, dir_okay=False, readable=True, help="Ruta al archivo TXT a importar (puede estar comprimido en .gz o .zip).")],
+    workers: Annotated[int, typer.Option("--workers", "-w", min=1, help="Procesos para parsear y agregar el archivo en paralelo.")] = IMPORT_WORKERS,
+    profile: Annotated[bool, typer.Option("--profile", help="Muestra el tiempo por etapa, los contadores y la latencia de escritura.")] = False,
+    checkpoint: Annotated[bool, typer.Option("--checkpoint", help="Guarda checkpoints periódicos para poder reanudar la importación.")] = False,
+    resume: Annotated[bool, typer.Option("--resume", help="Continúa desde el último checkpoint del archivo (implica --checkpoint).")] = False
 ):
     """
     Importa datos desde el archivo TXT especificado.
     """
     typer.echo(f"Procesando archivo: {file_path}")
-    asyncio.run(_import_file_async(file_path))
+    _run(_import_file_async(file_path, workers, profile, checkpoint, resume))
+
+
+def _resolve_files(path: str, pattern: str) -> List[str]:
+    """Archivos de un directorio que coinciden con `pattern`, o los que coinciden con `path` si es un glob."""
+    matches = glob.glob(os.path.join(path, pattern)) if os.path.isdir(path) else glob.glob(path)
+    return sorted(match for match in matches if os.path.isfile(match))
+
+
+async def _import_dir_async(file_paths: List[str], concurrency: int, workers: int, merge: bool, profile: bool):
+    """Importa los archivos con un único repositorio (y su pool de conexiones) y, si corresponde, un pool de procesos."""
+    # En un solo proceso los archivos simultáneos solo superponen E/S (el parseo comparte el GIL): sin --workers,
+    # cada archivo se agrega en un proceso de un pool de hasta `concurrency` procesos, salvo que se pida la
+    # agregación ordenada o con memoria acotada, que corren en el proceso principal.
+    pool_size = workers
+    if workers == 1 and not INPUT_SORTED_BY and AGGREGATION_MEMORY_LIMIT_MB <= 0:
+        pool_size = min(concurrency, os.cpu_count() or 1)
+    executor = _process_pool(pool_size)
+    service = _build_service(workers, executor)
+    try:
+        await service.repository.connect()
+        summary = await service.import_data_from_files(file_paths, concurrency, merge=merge)
+        if merge:
+            typer.secho(f"Resumen de la importación combinada de {len(file_paths)} archivos:", fg=typer.colors.GREEN)
+            for file_summary in summary["files"]:
+                typer.echo(
+                    f"  {file_summary['file_path']}: {file_summary['records_processed']} registros, "
+                    f"{file_summary['records_skipped']} omitidos"
+                )
+            _print_summary(summary, profile)
+        else:
+            for file_summary in summary["files"]:
+                typer.secho(f"Resumen de importación para '{file_summary['file_path']}':", fg=typer.colors.GREEN)
+                _print_summary(file_summary, profile)
+            typer.secho(f"Total de {len(file_paths)} archivos:", fg=typer.colors.GREEN)
+            _print_summary(summary)
+
+    except DataImporterError as e:
+        typer.secho(f"Error de importación: {e}", fg=typer.colors.RED, err=True)
+    except Exception as e:
+        typer.secho(f"Error inesperado en CLI: {e}", fg=typer.colors.RED, err=True)
+    finally:
+        await service.repository.disconnect()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+@app.command()
+def import_dir(
+    path: Annotated[str, typer.Argument(help="Directorio con los archivos a importar, o un patrón glob (entre comillas).")],
+    pattern: Annotated[str, typer.Option("--pattern", "-p", help="Patrón de los archivos dentro del directorio.")] = "*.txt*",
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c", min=1, help="Archivos procesados en simultáneo; sin --workers, cada uno en su propio proceso.")] = 4,
+    workers: Annotated[int, typer.Option("--workers", "-w", min=1, help="Procesos del pool compartido por todos los archivos (cada archivo se divide en tantos fragmentos).")] = IMPORT_WORKERS,
+    merge: Annotated[bool, typer.Option("--merge", help="Combina los agregados de todos los archivos antes de guardarlos.")] = False,
+    profile: Annotated[bool, typer.Option("--profile", help="Muestra el tiempo por etapa, los contadores y la latencia de escritura.")] = False
+):
+    """
+    Importa todos los archivos de un directorio (o de un patrón glob) con una sola conexión a la base de datos.
+    """
+    file_paths = _resolve_files(path, pattern)
+    if not file_paths:
+        typer.secho(f"No se encontraron archivos en '{path}'.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Procesando {len(file_paths)} archivos.")
+    _run(_import_dir_async(file_paths, concurrency, workers, merge, profile))
+
+
+async def _export_snapshot_async(file_path: str, snapshot_path: str, workers: int, profile: bool):
+    """Agrega el archivo y escribe el snapshot; no usa la base de datos."""
+    executor = _process_pool(workers)
+    service = _build_service(workers, executor)
+    try:
+        summary = await service.export_snapshot(file_path, snapshot_path)
+        typer.secho(f"Snapshot escrito en '{snapshot_path}':", fg=typer.colors.GREEN)
+        typer.secho(f"  Deudores: {summary['debtors']}", fg=typer.colors.GREEN)
+        typer.secho(f"  Entidades: {summary['entities']}", fg=typer.colors.GREEN)
+        if profile:
+            _print_profile(summary["metrics"])
+    except DataImporterError as e:
+        typer.secho(f"Error exportando el snapshot: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+@app.command()
+def export_snapshot(
+    file_path: Annotated[str, typer.Argument(exists=True, file_okay=True, dir_okay=False, readable=True, help="Ruta al archivo TXT a agregar (puede estar comprimido en .gz o .zip).")],
+    snapshot_path: Annotated[str, typer.Argument(help="Ruta del snapshot a escribir.")],
+    workers: Annotated[int, typer.Option("--workers", "-w", min=1, help="Procesos para parsear y agregar el archivo en paralelo.")] = IMPORT_WORKERS,
+    profile: Annotated[bool, typer.Option("--profile", help="Muestra el tiempo por etapa y los contadores.")] = False
+):
+    """
+    Agrega el archivo y guarda los deudores y entidades en un snapshot columnar, sin escribir en la base de datos.
+    """
+    typer.echo(f"Procesando archivo: {file_path}")
+    _run(_export_snapshot_async(file_path, snapshot_path, workers, profile))
+
+
+@app.command()
+def query_snapshot(
+    snapshot_path: Annotated[str, typer.Argument(exists=True, file_okay=True, dir_okay=False, readable=True, help="Ruta del snapshot.")],
+    cuit_cuil: Annotated[Optional[int], typer.Option("--cuit", help="Busca un deudor por CUIT/CUIL.")] = None,
+    entity_code: Annotated[Optional[int], typer.Option("--entity", help="Busca una entidad por código.")] = None,
+    top: Annotated[Optional[int], typer.Option("--top", min=1, help="Los N deudores con mayor monto de préstamos.")] = None,
+    min_loans: Annotated[Optional[float], typer.Option("--min-loans", help="Monto mínimo de préstamos.")] = None,
+    max_loans: Annotated[Optional[float], typer.Option("--max-loans", help="Monto máximo de préstamos.")] = None,
+    limit: Annotated[int, typer.Option("--limit", min=1, help="Máximo de deudores a mostrar en un rango.")] = 100
+):
+    """
+    Consulta un snapshot escrito por export-snapshot sin usar la base de datos.
+    """
+    from core.snapshot import SnapshotReader
+
+    try:
+        with SnapshotReader(snapshot_path) as reader:
+            if cuit_cuil is not None:
+                debtor = reader.get_debtor(cuit_cuil)
+                typer.echo(debtor.model_dump_json() if debtor else f"Deudor {cuit_cuil} no encontrado.")
+            elif entity_code is not None:
+                entity = reader.get_entity(entity_code)
+                typer.echo(entity.model_dump_json() if entity else f"Entidad {entity_code} no encontrada.")
+            elif top is not None:
+                for debtor in reader.top_debtors(top):
+                    typer.echo(debtor.model_dump_json())
+            elif min_loans is not None or max_loans is not None:
+                for debtor in itertools.islice(reader.debtors_by_loans(min_loans, max_loans), limit):
+                    typer.echo(debtor.model_dump_json())
+            else:
+                typer.echo(f"{reader.header['debtors']} deudores y {reader.header['entities']} entidades.")
+    except SnapshotError as e:
+        typer.secho(f"Error leyendo el snapshot: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
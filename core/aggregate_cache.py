@@ -0,0 +1,83 @@
+import logging
+import os
+import struct
+from typing import Optional, Tuple
+
+from core.checkpoint import dump_partials, load_partials
+from core.data_processor import DebtorsPartial, EntitiesPartial
+
+logger = logging.getLogger(__name__)
+
+_EXTENSION = ".agg"
+
+
+class AggregateCache:
+    """
+    Cache local de los agregados de importaciones anteriores, indexado por el hash del contenido de la entrada.
+    Cada artefacto usa el formato binario compacto de los checkpoints; al superar `max_bytes` se eliminan
+    los usados hace más tiempo. Los errores de lectura o escritura se registran y se tratan como un fallo de cache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        :param directory: Directorio de los artefactos; se crea al guardar el primero.
+        :param max_bytes: Tamaño total máximo de los artefactos; 0 desactiva el cache.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}{_EXTENSION}")
+
+    def load(self, content_hash: str) -> Optional[Tuple[dict, DebtorsPartial, EntitiesPartial]]:
+        """
+        :return: (encabezado, agregado de deudores, agregado de entidades) o None si no está en el cache.
+        """
+        path = self._path(content_hash)
+        if self.max_bytes <= 0 or not os.path.exists(path):
+            return None
+        try:
+            cached = load_partials(path)
+            # La fecha de modificación marca el último uso para el desalojo.
+            os.utime(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Se descarta el artefacto de agregados '{content_hash}': {e}")
+            self._remove(path)
+            return None
+        logger.info(f"Agregados de '{content_hash}' recuperados del cache.")
+        return cached
+
+    def store(self, content_hash: str, header: dict, debtors_partial: DebtorsPartial, entities_partial: EntitiesPartial):
+        if self.max_bytes <= 0:
+            return
+        try:
+            dump_partials(self._path(content_hash), header, debtors_partial, entities_partial)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el artefacto de agregados '{content_hash}': {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        try:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(_EXTENSION):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"No se pudo revisar el cache de agregados en {self.directory}: {e}")
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache en memoria del proceso con vencimiento por tiempo (TTL) y desalojo por uso (LRU).
+    No es thread-safe: está pensado para usarse desde el event loop.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_size: Cantidad máxima de entradas; al superarla se desaloja la usada hace más tiempo.
+        :param ttl_seconds: Segundos que una entrada sigue siendo válida desde que se guardó.
+        :param clock: Reloj monótono; se puede reemplazar para controlar el tiempo.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        :return: El valor guardado (que puede ser None, por ejemplo para "no encontrado") o MISSING.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+from typing import List, Optional, Tuple
+
+from core.data_processor import DebtorsPartial, EntitiesPartial
+from core.exceptions import CheckpointError
+
+logger = logging.getLogger(__name__)
+
+_STATE_MAGIC = b"IMPCKPT1"
+_HEADER_LENGTH = struct.Struct("<I")
+_COUNT = struct.Struct("<Q")
+# cuit_cuil, max_situation, sum_loans, entity_code
+_DEBTOR_RECORD = struct.Struct("<qddq")
+# entity_code, sum_loans
+_ENTITY_RECORD = struct.Struct("<qd")
+
+
+def file_identity(file_path: str) -> dict:
+    """
+    Datos con los que se verifica que un checkpoint corresponde al mismo archivo sin modificar.
+    """
+    stat = os.stat(file_path)
+    return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def checkpoint_key(file_path: str) -> str:
+    """
+    Clave del checkpoint de un archivo importado desde la CLI: un hash de su ruta absoluta.
+    """
+    return hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, parts: List[bytes]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def dump_partials(path: str, header: dict, debtors_partial: DebtorsPartial, entities_partial: EntitiesPartial):
+    """
+    Guarda de forma atómica un encabezado JSON y los agregados parciales empaquetados en registros binarios
+    de tamaño fijo (32 bytes por deudor y 16 por entidad).
+    """
+    header_bytes = json.dumps(header).encode("utf-8")
+    debtor_pack, entity_pack = _DEBTOR_RECORD.pack, _ENTITY_RECORD.pack
+    debtors = b"".join(
+        debtor_pack(cuit, situation, loans, entity_code)
+        for cuit, (situation, loans, entity_code) in debtors_partial.items()
+    )
+    entities = b"".join(entity_pack(entity_code, loans) for entity_code, loans in entities_partial.items())
+    _write_atomic(path, [
+        _STATE_MAGIC, _HEADER_LENGTH.pack(len(header_bytes)), header_bytes,
+        _COUNT.pack(len(debtors_partial)), debtors, _COUNT.pack(len(entities_partial)), entities,
+    ])
+
+
+def load_partials(path: str) -> Tuple[dict, DebtorsPartial, EntitiesPartial]:
+    """
+    Lee un archivo escrito por dump_partials, respetando el orden original de los agregados.
+    :raises ValueError: si el archivo no tiene el formato esperado.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(_STATE_MAGIC):
+        raise ValueError("formato desconocido")
+    position = len(_STATE_MAGIC)
+    (header_length,) = _HEADER_LENGTH.unpack_from(data, position)
+    position += _HEADER_LENGTH.size
+    header = json.loads(data[position:position + header_length])
+    position += header_length
+
+    (count,) = _COUNT.unpack_from(data, position)
+    position += _COUNT.size
+    end = position + count * _DEBTOR_RECORD.size
+    debtors_partial: DebtorsPartial = {
+        cuit: [situation, loans, entity_code]
+        for cuit, situation, loans, entity_code in _DEBTOR_RECORD.iter_unpack(data[position:end])
+    }
+    position = end
+    (count,) = _COUNT.unpack_from(data, position)
+    position += _COUNT.size
+    end = position + count * _ENTITY_RECORD.size
+    entities_partial: EntitiesPartial = dict(_ENTITY_RECORD.iter_unpack(data[position:end]))
+    return header, debtors_partial, entities_partial
+
+
+class CheckpointStore:
+    """
+    Guarda en un directorio los checkpoints de importaciones en curso. Cada clave tiene dos archivos,
+    ambos reemplazados de forma atómica:
+
+    - `<clave>.state`: el offset de la entrada ya agregada, los contadores de registros y los agregados
+      parciales empaquetados en registros binarios de tamaño fijo.
+    - `<clave>.json`: los metadatos de la importación (archivo, registros ya escritos por colección,
+      carga con staging en curso y, para los jobs de la API, los datos del job).
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: Directorio de los checkpoints; se crea al guardar el primero.
+        """
+        self.directory = directory
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def save_state(self, key: str, state: dict, debtors_partial: DebtorsPartial, entities_partial: EntitiesPartial):
+        """
+        :param state: Metadatos del estado (offset, contadores); deben ser serializables a JSON.
+        """
+        try:
+            dump_partials(self._path(key, "state"), state, debtors_partial, entities_partial)
+        except OSError as e:
+            raise CheckpointError(f"No se pudo guardar el checkpoint '{key}' en {self.directory}: {e}")
+        logger.info(
+            f"Checkpoint '{key}' guardado en el offset {state.get('offset')}: "
+            f"{len(debtors_partial)} deudores, {len(entities_partial)} entidades."
+        )
+
+    def load_state(self, key: str) -> Optional[Tuple[dict, DebtorsPartial, EntitiesPartial]]:
+        """
+        :return: (estado, agregado de deudores, agregado de entidades) o None si no hay checkpoint.
+        """
+        path = self._path(key, "state")
+        if not os.path.exists(path):
+            return None
+        try:
+            return load_partials(path)
+        except (OSError, ValueError, struct.error) as e:
+            raise CheckpointError(f"No se pudo leer el checkpoint '{key}': {e}")
+
+    def save_meta(self, key: str, meta: dict):
+        try:
+            _write_atomic(self._path(key, "json"), [json.dumps(meta).encode("utf-8")])
+        except OSError as e:
+            raise CheckpointError(f"No se pudieron guardar los metadatos del checkpoint '{key}': {e}")
+
+    def load_meta(self, key: str) -> Optional[dict]:
+        path = self._path(key, "json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"No se pudieron leer los metadatos del checkpoint '{key}': {e}")
+
+    def keys(self) -> List[str]:
+        """
+        Claves con metadatos guardados.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def delete(self, key: str):
+        for extension in ("state", "json"):
+            try:
+                os.remove(self._path(key, extension))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar el checkpoint '{key}': {e}")
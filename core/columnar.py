@@ -0,0 +1,252 @@
+"""
+Kernels NumPy para el motor de importación columnar ("numpy").
+
+NumPy es una dependencia opcional (requirements-numpy.txt): solo se necesita si se usa IMPORT_ENGINE="numpy".
+"""
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from core.config import ENTITY_CODE_SLICE, CUIT_CUIL_SLICE, SITUATION_SLICE, TOTAL_SLICE
+from core.exceptions import DataProcessingError
+from core.file_parser import _parse_numeric_bytes
+from core.rejects import INVALID_NUMBER, RejectSink, line_reject_reason
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+logger = logging.getLogger(__name__)
+
+RECORD_DTYPE = None if np is None else np.dtype([
+    ("entity_code", "<i8"),
+    ("cuit_cuil", "<i8"),
+    ("situation", "<f8"),
+    ("loans", "<f8"),
+])
+
+_NEWLINE = 0x0A
+_SPACE = 0x20
+_COMMA = 0x2C
+_DOT = 0x2E
+_ZERO = 0x30
+_NINE = 0x39
+
+# Estados del autómata para campos decimales.
+_LEADING, _INTEGER, _FRACTION, _TRAILING = 0, 1, 2, 3
+
+
+def require_numpy():
+    if np is None:
+        raise DataProcessingError("El motor 'numpy' requiere NumPy instalado (pip install -r requirements-numpy.txt).")
+
+
+def _column(data, starts, lengths, col):
+    """
+    Devuelve el byte en la columna `col` de cada línea, o un espacio si la línea es más corta.
+    """
+    inside = lengths > col
+    return np.where(inside, data[np.where(inside, starts + col, 0)], _SPACE)
+
+
+def _is_space(b):
+    return (b == _SPACE) | ((b >= 0x09) & (b <= 0x0D))
+
+
+def _parse_int_field(data, starts, lengths, field: slice):
+    """
+    Parsea un campo entero como `str.strip().isdigit()` + `int()`.
+    :return: (valores, máscara de filas válidas)
+    """
+    n = len(starts)
+    value = np.zeros(n, dtype=np.int64)
+    runs = np.zeros(n, dtype=np.int8)
+    bad = np.zeros(n, dtype=bool)
+    prev_digit = np.zeros(n, dtype=bool)
+    for col in range(field.start, field.stop):
+        b = _column(data, starts, lengths, col)
+        is_digit = (b >= _ZERO) & (b <= _NINE)
+        bad |= ~(is_digit | _is_space(b))
+        runs += is_digit & ~prev_digit
+        value = np.where(is_digit, value * 10 + (b.astype(np.int64) - _ZERO), value)
+        prev_digit = is_digit
+    return value, ~bad & (runs == 1)
+
+
+def _parse_decimal_field(buf: bytes, data, starts, lengths, field: slice):
+    """
+    Parsea un campo decimal con coma o punto, igual que FileParser.parse_numeric_value.
+    Las filas que no siguen el formato simple se delegan al parser escalar.
+    :return: (valores, posiciones de las filas no numéricas, que quedan en 0.0)
+    """
+    n = len(starts)
+    value = np.zeros(n, dtype=np.int64)
+    fraction_digits = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    state = np.full(n, _LEADING, dtype=np.int8)
+    bad = np.zeros(n, dtype=bool)
+    blank = np.ones(n, dtype=bool)
+    for col in range(field.start, field.stop):
+        b = _column(data, starts, lengths, col)
+        is_digit = (b >= _ZERO) & (b <= _NINE)
+        is_sep = (b == _COMMA) | (b == _DOT)
+        is_space = _is_space(b)
+        blank &= is_space
+
+        bad |= ~(is_digit | is_sep | is_space)
+        bad |= is_digit & (state == _TRAILING)
+        bad |= is_sep & (state >= _FRACTION)
+
+        value = np.where(is_digit, value * 10 + (b.astype(np.int64) - _ZERO), value)
+        digits += is_digit
+        fraction_digits += is_digit & (state == _FRACTION)
+        state = np.where(is_digit & (state == _LEADING), _INTEGER, state)
+        state = np.where(is_sep, _FRACTION, state)
+        state = np.where(is_space & ((state == _INTEGER) | (state == _FRACTION)), _TRAILING, state)
+
+    result = value / np.power(10.0, fraction_digits)
+    result[blank] = 0.0
+
+    fallback = np.flatnonzero(~blank & (bad | (digits == 0)))
+    invalid = []
+    for i in fallback.tolist():
+        start = int(starts[i])
+        end = start + int(lengths[i])
+        value = _parse_numeric_bytes(buf[min(start + field.start, end):min(start + field.stop, end)])
+        if value is None:
+            invalid.append(i)
+            value = 0.0
+        result[i] = value
+    return result, invalid
+
+
+def _report_rejects(buf: bytes, starts, lengths, rejected, invalid, rejects: RejectSink, first_line: int):
+    """
+    Informa en orden de línea las filas omitidas (`rejected`) y las que tienen montos no numéricos (`invalid`).
+    """
+    reasons = {}
+    for i in rejected:
+        start = int(starts[i])
+        reasons[i] = line_reject_reason(buf[start:start + int(lengths[i])])
+    for i in invalid:
+        reasons.setdefault(i, INVALID_NUMBER)
+    for i in sorted(reasons):
+        start = int(starts[i])
+        rejects.reject(reasons[i], first_line + i, buf[start:start + int(lengths[i])])
+
+
+def parse_chunk(buf: bytes, rejects: Optional[RejectSink] = None, first_line: int = 1):
+    """
+    Convierte un bloque de líneas completas en un array estructurado RECORD_DTYPE.
+    Las líneas con código de entidad o CUIT/CUIL no numérico se omiten, igual que en FileParser.
+    :param rejects: Destino opcional de las líneas rechazadas; solo las filas rechazadas se recorren en Python.
+    :param first_line: Número de la primera línea del bloque.
+    """
+    require_numpy()
+    data = np.frombuffer(buf, dtype=np.uint8)
+    newlines = np.flatnonzero(data == _NEWLINE)
+    starts = np.concatenate(([0], newlines + 1)).astype(np.int64)
+    ends = np.concatenate((newlines, [len(data)])).astype(np.int64)
+    if len(data) and data[-1] == _NEWLINE:
+        starts, ends = starts[:-1], ends[:-1]
+    lengths = ends - starts
+
+    entity_code, entity_ok = _parse_int_field(data, starts, lengths, ENTITY_CODE_SLICE)
+    cuit_cuil, cuit_ok = _parse_int_field(data, starts, lengths, CUIT_CUIL_SLICE)
+    valid = entity_ok & cuit_ok
+    keep = np.flatnonzero(valid)
+    kept_starts, kept_lengths = starts[keep], lengths[keep]
+
+    records = np.empty(len(keep), dtype=RECORD_DTYPE)
+    records["entity_code"] = entity_code[keep]
+    records["cuit_cuil"] = cuit_cuil[keep]
+    records["situation"], invalid_situation = _parse_decimal_field(
+        buf, data, kept_starts, kept_lengths, SITUATION_SLICE
+    )
+    records["loans"], invalid_loans = _parse_decimal_field(buf, data, kept_starts, kept_lengths, TOTAL_SLICE)
+    if rejects is not None:
+        invalid = keep[invalid_situation + invalid_loans].tolist()
+        _report_rejects(buf, starts, lengths, np.flatnonzero(~valid).tolist(), invalid, rejects, first_line)
+    return records
+
+
+def _segments(keys):
+    """
+    Ordena de forma estable por clave y devuelve (orden, inicios de cada grupo, grupo de cada fila).
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_boundary = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+    group_of_row = np.empty(len(keys), dtype=np.int64)
+    group_of_row[order] = np.cumsum(is_boundary) - 1
+    return order, np.flatnonzero(is_boundary), group_of_row
+
+
+def _sum_by_group(group_of_row, values, n_groups):
+    # bincount acumula en el orden de entrada, igual que la suma secuencial de aggregate_data.
+    return np.bincount(group_of_row, weights=values, minlength=n_groups)
+
+
+def group_debtors(cuit_cuil, first_pos, entity_code, situation, loans):
+    """
+    Group-by por CUIT: máxima situación, suma de préstamos y la entidad de la primera aparición.
+    Acepta tanto registros crudos como agregados parciales (mismas columnas).
+    """
+    if len(cuit_cuil) == 0:
+        return cuit_cuil, first_pos, entity_code, situation, loans
+    order, boundaries, group_of_row = _segments(cuit_cuil)
+    return (
+        cuit_cuil[order][boundaries],
+        np.minimum.reduceat(first_pos[order], boundaries),
+        entity_code[order][boundaries],
+        np.maximum.reduceat(situation[order], boundaries),
+        _sum_by_group(group_of_row, loans, len(boundaries)),
+    )
+
+
+def group_entities(entity_code, first_pos, loans):
+    """
+    Group-by por código de entidad: suma de préstamos.
+    """
+    if len(entity_code) == 0:
+        return entity_code, first_pos, loans
+    order, boundaries, group_of_row = _segments(entity_code)
+    return (
+        entity_code[order][boundaries],
+        np.minimum.reduceat(first_pos[order], boundaries),
+        _sum_by_group(group_of_row, loans, len(boundaries)),
+    )
+
+
+def aggregate_chunks(chunks: Iterable) -> Tuple[Tuple, Tuple]:
+    """
+    Agrega bloques RECORD_DTYPE. Cada bloque se reduce por separado y los parciales se combinan al final,
+    ordenados por primera aparición como en DataProcessor.aggregate_data.
+    :return: ((cuit_cuil, entity_code, situation, loans), (entity_code, loans))
+    """
+    require_numpy()
+    debtor_parts: List[Tuple] = []
+    entity_parts: List[Tuple] = []
+    offset = 0
+    for records in chunks:
+        positions = np.arange(offset, offset + len(records), dtype=np.int64)
+        offset += len(records)
+        debtor_parts.append(group_debtors(
+            records["cuit_cuil"], positions, records["entity_code"], records["situation"], records["loans"]
+        ))
+        entity_parts.append(group_entities(records["entity_code"], positions, records["loans"]))
+
+    if not debtor_parts:
+        empty_int = np.empty(0, dtype=np.int64)
+        empty_float = np.empty(0, dtype=np.float64)
+        return (empty_int, empty_int, empty_float, empty_float), (empty_int, empty_float)
+
+    debtors = group_debtors(*(np.concatenate(columns) for columns in zip(*debtor_parts)))
+    entities = group_entities(*(np.concatenate(columns) for columns in zip(*entity_parts)))
+
+    debtor_order = np.argsort(debtors[1], kind="stable")
+    entity_order = np.argsort(entities[1], kind="stable")
+    return (
+        (debtors[0][debtor_order], debtors[2][debtor_order], debtors[3][debtor_order], debtors[4][debtor_order]),
+        (entities[0][entity_order], entities[2][entity_order]),
+    )
@@ -0,0 +1,273 @@
+"""
+Descompresión en streaming de archivos .gz y .zip, tanto desde disco como desde un flujo de bytes (subidas).
+"""
+import asyncio
+import gzip
+import logging
+import os
+import queue
+import struct
+import threading
+import zipfile
+import zlib
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional, Tuple
+
+from core.exceptions import FileParsingError
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+# Bloques descomprimidos que el hilo lector puede adelantar al parser.
+READER_QUEUE_SIZE = 4
+
+_ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_ZIP_LOCAL_SIGNATURE = 0x04034B50
+_ZIP_DESCRIPTOR_SIGNATURE = 0x08074B50
+_ZIP_CENTRAL_SIGNATURE = 0x02014B50
+_ZIP_END_SIGNATURE = 0x06054B50
+_ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+
+
+def detect_compression(header: bytes, name: str = "") -> Optional[str]:
+    """
+    Detecta el formato por los bytes mágicos y, si no alcanzan, por la extensión.
+    :return: "gzip", "zip" o None.
+    """
+    if header.startswith(GZIP_MAGIC):
+        return "gzip"
+    if header.startswith(ZIP_MAGIC):
+        return "zip"
+    lower_name = name.lower()
+    if lower_name.endswith(".gz"):
+        return "gzip"
+    if lower_name.endswith(".zip"):
+        return "zip"
+    return None
+
+
+def iter_decompressed_file(file_path: str, compression: str, chunk_bytes: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    Lee un archivo comprimido y devuelve bloques descomprimidos junto con los bytes comprimidos leídos hasta ahí.
+    En los .zip se concatenan todos los miembros en orden, separados por salto de línea si hace falta.
+    """
+    with open(file_path, "rb") as raw:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=raw) as f:
+                while chunk := f.read(chunk_bytes):
+                    yield chunk, raw.tell()
+            return
+        with zipfile.ZipFile(raw) as archive:
+            ends_with_newline = True
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                if not ends_with_newline:
+                    yield b"\n", raw.tell()
+                with archive.open(member) as f:
+                    while chunk := f.read(chunk_bytes):
+                        ends_with_newline = chunk.endswith(b"\n")
+                        yield chunk, raw.tell()
+            # El directorio central queda al final del archivo y no se lee al descomprimir los miembros.
+            yield b"", os.fstat(raw.fileno()).st_size
+
+
+_END = object()
+
+
+def iter_in_thread(iterator: Iterator, max_pending: int) -> Iterator:
+    """
+    Consume `iterator` en un hilo lector y entrega sus elementos a través de una cola acotada,
+    de modo que la descompresión se solapa con el parseo.
+    """
+    pending: queue.Queue = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        # Si el consumidor cerró el generador, la cola puede no vaciarse nunca: se deja de esperar al ver `stop`.
+        while not stop.is_set():
+            try:
+                pending.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((_END, None))
+        except BaseException as e:
+            put((_END, e))
+
+    thread = threading.Thread(target=reader, name="decompression-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = pending.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class _GzipStreamDecoder:
+    def __init__(self):
+        # 16 + MAX_WBITS: formato gzip; admite miembros concatenados.
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Hay un miembro empezado y todavía sin terminar.
+        self._in_member = False
+
+    def feed(self, data: bytes) -> bytes:
+        output = []
+        while data:
+            output.append(self._decompressor.decompress(data))
+            self._in_member = not self._decompressor.eof
+            if self._in_member:
+                break
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b"".join(output)
+
+    def close(self) -> bytes:
+        if self._in_member:
+            raise FileParsingError("Archivo .gz truncado.")
+        return self._decompressor.flush()
+
+
+class _ZipStreamDecoder:
+    """
+    Lee un .zip secuencialmente a partir de sus encabezados locales, sin necesitar el directorio central.
+    Admite miembros deflate (con o sin data descriptor) y stored con tamaño conocido.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._state = "header"
+        self._decompressor = None
+        self._remaining = 0
+        self._flags = 0
+        self._ends_with_newline = True
+        self._members = 0
+
+    def _emit(self, data: bytes, output: list):
+        if data:
+            output.append(data)
+            self._ends_with_newline = data.endswith(b"\n")
+
+    def feed(self, data: bytes) -> bytes:
+        self._buffer += data
+        output: list = []
+        while self._step(output):
+            pass
+        return b"".join(output)
+
+    def _step(self, output: list) -> bool:
+        if self._state == "header":
+            if len(self._buffer) < 4:
+                return False
+            signature = struct.unpack_from("<I", self._buffer)[0]
+            if signature in (_ZIP_CENTRAL_SIGNATURE, _ZIP_END_SIGNATURE):
+                self._state = "done"
+                return False
+            if signature != _ZIP_LOCAL_SIGNATURE:
+                raise FileParsingError("Archivo .zip inválido: encabezado local no encontrado.")
+            if len(self._buffer) < _ZIP_LOCAL_HEADER.size:
+                return False
+            (_, _, flags, method, _, _, _, compressed_size, _, name_length, extra_length) = \
+                _ZIP_LOCAL_HEADER.unpack_from(self._buffer)
+            header_size = _ZIP_LOCAL_HEADER.size + name_length + extra_length
+            if len(self._buffer) < header_size:
+                return False
+            name = self._buffer[_ZIP_LOCAL_HEADER.size:_ZIP_LOCAL_HEADER.size + name_length]
+            self._buffer = self._buffer[header_size:]
+            self._flags = flags
+            if name.endswith(b"/"):
+                self._state, self._remaining = "skip", compressed_size
+                return True
+            if self._members and not self._ends_with_newline:
+                self._emit(b"\n", output)
+            self._members += 1
+            if method == _ZIP_DEFLATED:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                self._state = "deflate"
+            elif method == _ZIP_STORED and not flags & _ZIP_FLAG_DATA_DESCRIPTOR:
+                self._state, self._remaining = "stored", compressed_size
+            else:
+                raise FileParsingError(f"Método de compresión .zip no soportado en streaming: {method}.")
+            return True
+        if self._state == "deflate":
+            if not self._buffer:
+                return False
+            self._emit(self._decompressor.decompress(self._buffer), output)
+            if not self._decompressor.eof:
+                self._buffer = b""
+                return False
+            self._buffer = self._decompressor.unused_data
+            self._state = "descriptor" if self._flags & _ZIP_FLAG_DATA_DESCRIPTOR else "header"
+            return True
+        if self._state in ("stored", "skip"):
+            taken = self._buffer[:self._remaining]
+            self._buffer = self._buffer[len(taken):]
+            self._remaining -= len(taken)
+            if self._state == "stored":
+                self._emit(taken, output)
+            if self._remaining:
+                return False
+            self._state = "header"
+            return True
+        if self._state == "descriptor":
+            if len(self._buffer) < 4:
+                return False
+            has_signature = struct.unpack_from("<I", self._buffer)[0] == _ZIP_DESCRIPTOR_SIGNATURE
+            size = 16 if has_signature else 12
+            if len(self._buffer) < size:
+                return False
+            self._buffer = self._buffer[size:]
+            self._state = "header"
+            return True
+        return False
+
+    def close(self) -> bytes:
+        if self._state not in ("header", "done"):
+            raise FileParsingError("Archivo .zip truncado.")
+        return b""
+
+
+async def decompress_stream(chunks: AsyncIterable[bytes], name: str = "") -> AsyncIterator[bytes]:
+    """
+    Detecta si un flujo está comprimido (por el primer bloque o el nombre) y lo descomprime bloque a bloque.
+    La descompresión corre en un hilo para no bloquear el event loop. Los flujos sin comprimir pasan sin cambios.
+    """
+    iterator = chunks.__aiter__()
+    first = b""
+    async for chunk in iterator:
+        first += chunk
+        if len(first) >= len(ZIP_MAGIC):
+            break
+    compression = detect_compression(first, name)
+    if compression is None:
+        if first:
+            yield first
+        async for chunk in iterator:
+            yield chunk
+        return
+
+    logger.info(f"Descomprimiendo flujo '{name}' ({compression}).")
+    decoder = _GzipStreamDecoder() if compression == "gzip" else _ZipStreamDecoder()
+    try:
+        if first:
+            yield await asyncio.to_thread(decoder.feed, first)
+        async for chunk in iterator:
+            yield await asyncio.to_thread(decoder.feed, chunk)
+        yield decoder.close()
+    except zlib.error as e:
+        raise FileParsingError(f"Error al descomprimir '{name}': {e}")
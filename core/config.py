@@ -5,6 +5,10 @@ load_dotenv()
 
 MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
 DB_NAME = os.getenv("DB_NAME")
+# Dónde se guardan los datos: "mongo" (MONGO_CONNECTION_STRING y DB_NAME) o "sqlite" (archivo embebido en SQLITE_PATH,
+# sin servidor; las tablas se llaman como las colecciones).
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "importer.db")
 
 ENTITY_CODE_SLICE = slice(0, 5)
 CUIT_CUIL_SLICE = slice(13, 24)
@@ -12,4 +16,79 @@ SITUATION_SLICE = slice(27, 29)
 TOTAL_SLICE = slice(30, 41)
 
 DEBTORS_COLLECTION= "debtors"
-ENTITIES_COLLECTION = "entities"
\ No newline at end of file
+ENTITIES_COLLECTION = "entities"
+IMPORT_HISTORY_COLLECTION = "import_history"
+
+# Escrituras en MongoDB: documentos por insert_many y lotes simultáneos por colección.
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "10000"))
+WRITE_MAX_IN_FLIGHT = int(os.getenv("WRITE_MAX_IN_FLIGHT", "4"))
+# Escribir lotes como RawBSONDocument ya codificados (solo en modo "insert").
+WRITE_RAW_BSON = os.getenv("WRITE_RAW_BSON", "false").lower() == "true"
+# "insert": agrega documentos nuevos en cada importación. "upsert": actualiza por cuit_cuil/entity_code
+# y solo escribe los documentos nuevos o cuyos agregados cambiaron.
+WRITE_MODE = os.getenv("WRITE_MODE", "insert")
+# "direct": escribe en las colecciones vigentes. "staging": escribe en colecciones nuevas sin índices, crea los
+# índices al terminar y las renombra sobre las vigentes; la importación reemplaza todo el contenido (solo en modo "insert").
+LOAD_MODE = os.getenv("LOAD_MODE", "direct")
+
+# "stream": aiofiles + RawRecord (original). "mmap": parser por bytes sobre mmap.
+# "numpy": parseo y agregación vectorizados por bloques (requiere NumPy).
+IMPORT_ENGINE = os.getenv("IMPORT_ENGINE", "stream")
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "65536"))
+PARSE_CHUNK_BYTES = int(os.getenv("PARSE_CHUNK_BYTES", str(16 * 1024 * 1024)))
+# Procesos para el parseo/agregación por fragmentos del archivo; 1 desactiva el modo paralelo.
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+# Los motores rápidos generan dicts en lugar de modelos pydantic; se valida solo una fracción de ellos.
+AGGREGATE_AS_DOCUMENTS = os.getenv("AGGREGATE_AS_DOCUMENTS", "false").lower() == "true"
+VALIDATION_SAMPLE_RATE = float(os.getenv("VALIDATION_SAMPLE_RATE", "0.001"))
+# Presupuesto de memoria (MB) del agregado de deudores en importaciones de un solo proceso; 0 = sin límite.
+# Al superarlo se vuelca a SPILL_PARTITIONS archivos temporales en SPILL_DIR (por defecto, el directorio temporal del sistema).
+AGGREGATION_MEMORY_LIMIT_MB = int(os.getenv("AGGREGATION_MEMORY_LIMIT_MB", "0"))
+SPILL_PARTITIONS = int(os.getenv("SPILL_PARTITIONS", "64"))
+SPILL_DIR = os.getenv("SPILL_DIR") or None
+# Tamaño de los bloques descomprimidos que el hilo lector entrega al parser (archivos .gz/.zip).
+DECOMPRESSION_CHUNK_BYTES = int(os.getenv("DECOMPRESSION_CHUNK_BYTES", str(1024 * 1024)))
+# Tamaño de los bloques leídos de las subidas a la API.
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# Procesos del pool de la API para parsear y agregar fuera del event loop; 0 lo desactiva.
+# Con el pool activo no se usan INPUT_SORTED_BY ni AGGREGATION_MEMORY_LIMIT_MB.
+API_PROCESS_WORKERS = int(os.getenv("API_PROCESS_WORKERS", "0"))
+# Tamaño de los bloques de una subida que se envían a cada proceso del pool.
+STREAM_BLOCK_BYTES = int(os.getenv("STREAM_BLOCK_BYTES", str(8 * 1024 * 1024)))
+# Jobs de importación asíncronos de la API: importaciones simultáneas, jobs en espera, jobs terminados
+# que se conservan y directorio donde se guardan las subidas hasta procesarlas.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "10"))
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "1000"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR") or None
+# Checkpoints de importaciones reanudables: directorio donde se guardan y bytes de entrada entre checkpoints.
+# Con JOB_CHECKPOINTS=true los jobs de la API guardan checkpoints y se reanudan al reiniciar la API
+# (JOB_SPOOL_DIR y CHECKPOINT_DIR deben estar en un volumen persistente).
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoints")
+CHECKPOINT_INTERVAL_BYTES = int(os.getenv("CHECKPOINT_INTERVAL_BYTES", str(256 * 1024 * 1024)))
+# Durante la escritura, los lotes confirmados se anotan cada tantos lotes o segundos (lo que ocurra primero).
+CHECKPOINT_META_INTERVAL_BATCHES = int(os.getenv("CHECKPOINT_META_INTERVAL_BATCHES", "50"))
+CHECKPOINT_META_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_META_INTERVAL_SECONDS", "5"))
+JOB_CHECKPOINTS = os.getenv("JOB_CHECKPOINTS", "false").lower() == "true"
+# Importaciones de un contenido repetido (mismo hash SHA-256 de la entrada): "allow" importa siempre sin calcular
+# el hash; "replay" reutiliza los agregados guardados en AGGREGATE_CACHE_DIR y solo repite la escritura;
+# "reject" además no importa un contenido que ya se importó con éxito según el historial de importaciones.
+DUPLICATE_IMPORTS = os.getenv("DUPLICATE_IMPORTS", "allow")
+AGGREGATE_CACHE_DIR = os.getenv("AGGREGATE_CACHE_DIR", ".aggregate_cache")
+AGGREGATE_CACHE_MAX_MB = int(os.getenv("AGGREGATE_CACHE_MAX_MB", "1024"))
+# Líneas rechazadas (código de entidad o CUIT/CUIL no numérico, línea vacía) o con montos no numéricos (se usa 0.0):
+# se loguean las primeras REJECTS_LOG_SAMPLE de cada motivo y después un resumen cada REJECTS_LOG_INTERVAL_SECONDS.
+# Con REJECTS_DIR cada importación guarda además sus líneas rechazadas en un archivo de ese directorio.
+REJECTS_LOG_SAMPLE = int(os.getenv("REJECTS_LOG_SAMPLE", "10"))
+REJECTS_LOG_INTERVAL_SECONDS = float(os.getenv("REJECTS_LOG_INTERVAL_SECONDS", "10"))
+REJECTS_DIR = os.getenv("REJECTS_DIR") or None
+REJECTS_BUFFER_BYTES = int(os.getenv("REJECTS_BUFFER_BYTES", str(1024 * 1024)))
+# Orden de la entrada para la agregación en streaming (un solo proceso): "entity" (agrupada por código de entidad),
+# "cuit" (ordenada por CUIT/CUIL), "auto" (se detecta con una pasada previa) o vacío para desactivarla.
+INPUT_SORTED_BY = os.getenv("INPUT_SORTED_BY", "")
+# Cache en memoria de las consultas de deudores y entidades de la API: entradas máximas y segundos de validez.
+# Se vacía al terminar cada importación del mismo proceso; LOOKUP_CACHE_SIZE=0 lo desactiva.
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", "100000"))
+LOOKUP_CACHE_TTL_SECONDS = float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "60"))
+# CUIT/CUIL admitidos por cada consulta en lote.
+LOOKUP_BATCH_LIMIT = int(os.getenv("LOOKUP_BATCH_LIMIT", "1000"))
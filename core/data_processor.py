@@ -1,19 +1,69 @@
-from typing import AsyncIterable, List, Dict, Tuple
+from typing import AsyncIterable, Iterable, Iterator, List, Dict, Tuple, Type
 import logging
 
+from pydantic import BaseModel, ValidationError
+
+from core.config import AGGREGATE_AS_DOCUMENTS, VALIDATION_SAMPLE_RATE
 from core.exceptions import DataProcessingError
-from core.file_parser import FileParser
+from core.file_parser import FileParser, RecordTuple
 from core.models import RawRecord, ProcessedRecordData, DebtorData, EntityData
+from core.spill import SpillStore
 
 logger = logging.getLogger(__name__)
 
+# Agregados parciales: cuit -> [max_situation, sum_loans, entity_code] y entity_code -> sum_loans.
+DebtorsPartial = Dict[int, list]
+EntitiesPartial = Dict[int, float]
+
 class DataProcessor:
     """
     Clase para procesar datos de entidades.
     """
 
-    def __init__(self, file_parser: FileParser):
+    def __init__(
+            self,
+            file_parser: FileParser,
+            as_documents: bool = AGGREGATE_AS_DOCUMENTS,
+            validation_sample_rate: float = VALIDATION_SAMPLE_RATE
+    ):
+        """
+        :param file_parser: Parser usado para convertir valores numéricos.
+        :param as_documents: Si es True, los motores rápidos devuelven dicts listos para MongoDB en lugar de
+            DebtorData/EntityData, y solo una muestra se valida con pydantic.
+        :param validation_sample_rate: Fracción de documentos a validar cuando `as_documents` es True.
+        """
         self.file_parser = file_parser
+        self.as_documents = as_documents
+        self._validation_stride = max(1, round(1 / validation_sample_rate)) if validation_sample_rate > 0 else 0
+
+
+    def _make_debtor(self, cuit: int, situation: float, loans: float, entity_code: int) -> DebtorData | dict:
+        if self.as_documents:
+            return {"entity_code": entity_code, "cuit_cuil": cuit, "situation": situation, "loans": loans}
+        return DebtorData(entity_code=entity_code, cuitCuil=cuit, situation=situation, loans=loans)
+
+
+    def _make_entity(self, entity_code: int, loans: float) -> EntityData | dict:
+        if self.as_documents:
+            return {"entity_code": entity_code, "loans": loans}
+        return EntityData(entity_code=entity_code, loans=loans)
+
+
+    def _validate_document(self, document: dict, model: Type[BaseModel]):
+        try:
+            model.model_validate(document)
+        except ValidationError as e:
+            raise DataProcessingError(f"Documento inválido {document}: {e}")
+
+
+    def _validate_sample(self, documents: list, model: Type[BaseModel]):
+        """
+        Valida con pydantic uno de cada `1 / validation_sample_rate` documentos.
+        """
+        if not self.as_documents or not self._validation_stride:
+            return
+        for document in documents[::self._validation_stride]:
+            self._validate_document(document, model)
 
 
     def _raw_to_processed_data(self, raw_record: RawRecord) -> ProcessedRecordData | None:
@@ -25,8 +75,12 @@ class DataProcessor:
         try:
             entity_code_value = int(raw_record.entity_code_str)
             cuit_cuil_value = int(raw_record.cuit_cuil_str)
-            situation_value = self.file_parser.parse_numeric_value(raw_record.situation_str)
-            total_value = self.file_parser.parse_numeric_value(raw_record.total_str)
+            situation_value = raw_record.situation
+            if situation_value is None:
+                situation_value = self.file_parser.parse_numeric_value(raw_record.situation_str)
+            total_value = raw_record.loans
+            if total_value is None:
+                total_value = self.file_parser.parse_numeric_value(raw_record.total_str)
 
             return ProcessedRecordData(
                 entity_code=entity_code_value,
@@ -35,7 +89,8 @@ class DataProcessor:
                 loans=total_value
             )
         except ValueError as e:
-            logger.warning(f"Error de conversión de tipos para el registro: {raw_record}, error: {e}. Se omite.")
+            # FileParser ya valida los campos y registra los rechazos; esto solo cubre casos que int() no admite.
+            logger.debug(f"Error de conversión de tipos para el registro: {raw_record}, error: {e}. Se omite.")
             return None
         except Exception as e:
             logger.error(f"Error inesperado procesando RawRecord {raw_record}: {e}")
@@ -97,3 +152,262 @@ class DataProcessor:
         logger.info(
             f"Agregación completada. {len(final_debtors)} registros de deudores, {len(final_entities)} registros de entidades.")
         return final_debtors, final_entities
+
+
+    def accumulate_record_batches(
+            self,
+            record_batches: Iterable[List[RecordTuple]],
+            debtors_partial: DebtorsPartial | None = None,
+            entities_partial: EntitiesPartial | None = None,
+    ) -> Tuple[DebtorsPartial, EntitiesPartial]:
+        """
+        Acumula lotes de tuplas en agregados parciales compactos, manteniendo máximos y sumas
+        en lugar de listas por CUIT.
+        :return: (cuit -> [max_situation, sum_loans, entity_code], entity_code -> sum_loans)
+        """
+        debtors_temp_aggregation = {} if debtors_partial is None else debtors_partial
+        entities_temp_aggregation = {} if entities_partial is None else entities_partial
+
+        for batch in record_batches:
+            for entity_code, cuit, situation, loans in batch:
+                debtor = debtors_temp_aggregation.get(cuit)
+                if debtor is None:
+                    debtors_temp_aggregation[cuit] = [situation, loans, entity_code]
+                else:
+                    if situation > debtor[0]:
+                        debtor[0] = situation
+                    debtor[1] += loans
+                entities_temp_aggregation[entity_code] = entities_temp_aggregation.get(entity_code, 0) + loans
+
+        return debtors_temp_aggregation, entities_temp_aggregation
+
+
+    def merge_partials(
+            self, partials: Iterable[Tuple[DebtorsPartial, EntitiesPartial]]
+    ) -> Tuple[DebtorsPartial, EntitiesPartial]:
+        """
+        Combina agregados parciales en orden: la entidad de cada deudor es la del primer parcial en que aparece.
+        """
+        debtors_merged: DebtorsPartial = {}
+        entities_merged: EntitiesPartial = {}
+        for index, (debtors_partial, entities_partial) in enumerate(partials):
+            if index == 0:
+                debtors_merged, entities_merged = debtors_partial, entities_partial
+                continue
+            for cuit, (situation, loans, entity_code) in debtors_partial.items():
+                debtor = debtors_merged.get(cuit)
+                if debtor is None:
+                    debtors_merged[cuit] = [situation, loans, entity_code]
+                else:
+                    if situation > debtor[0]:
+                        debtor[0] = situation
+                    debtor[1] += loans
+            for entity_code, loans in entities_partial.items():
+                entities_merged[entity_code] = entities_merged.get(entity_code, 0) + loans
+        return debtors_merged, entities_merged
+
+
+    def build_results(
+            self, debtors_partial: DebtorsPartial, entities_partial: EntitiesPartial
+    ) -> Tuple[List[DebtorData], List[EntityData]]:
+        """
+        Convierte agregados parciales en las listas finales de DebtorData y EntityData.
+        """
+        final_debtors = [
+            self._make_debtor(cuit, situation, loans, entity_code)
+            for cuit, (situation, loans, entity_code) in debtors_partial.items()
+        ]
+        final_entities = [
+            self._make_entity(entity, loans)
+            for entity, loans in entities_partial.items()
+        ]
+        self._validate_sample(final_debtors, DebtorData)
+        self._validate_sample(final_entities, EntityData)
+
+        logger.info(
+            f"Agregación completada. {len(final_debtors)} registros de deudores, {len(final_entities)} registros de entidades.")
+        return final_debtors, final_entities
+
+
+    def results_to_partials(
+            self, debtors: Iterable[DebtorData | dict], entities: Iterable[EntityData | dict]
+    ) -> Tuple[DebtorsPartial, EntitiesPartial]:
+        """
+        Inversa de build_results: vuelve a los agregados parciales compactos (por ejemplo, para guardarlos en cache).
+        """
+        debtors_partial: DebtorsPartial = {}
+        for debtor in debtors:
+            if isinstance(debtor, dict):
+                debtors_partial[debtor["cuit_cuil"]] = [debtor["situation"], debtor["loans"], debtor["entity_code"]]
+            else:
+                debtors_partial[debtor.cuit_cuil] = [debtor.situation, debtor.loans, debtor.entity_code]
+        entities_partial: EntitiesPartial = {}
+        for entity in entities:
+            if isinstance(entity, dict):
+                entities_partial[entity["entity_code"]] = entity["loans"]
+            else:
+                entities_partial[entity.entity_code] = entity.loans
+        return debtors_partial, entities_partial
+
+
+    def aggregate_record_batches(
+            self, record_batches: Iterable[List[RecordTuple]]
+    ) -> Tuple[List[DebtorData], List[EntityData]]:
+        """
+        Variante de aggregate_data para los lotes de tuplas de FileParser.iter_record_batches.
+        """
+        return self.build_results(*self.accumulate_record_batches(record_batches))
+
+
+    async def aggregate_record_batch_stream(
+            self, record_batches: AsyncIterable[List[RecordTuple]]
+    ) -> Tuple[List[DebtorData], List[EntityData]]:
+        """
+        Variante asíncrona de aggregate_record_batches para lotes que llegan de un flujo (FileParser.stream_record_batches).
+        """
+        debtors_partial: DebtorsPartial = {}
+        entities_partial: EntitiesPartial = {}
+        async for batch in record_batches:
+            self.accumulate_record_batches((batch,), debtors_partial, entities_partial)
+        return self.build_results(debtors_partial, entities_partial)
+
+
+    def aggregate_record_batches_bounded(
+            self, record_batches: Iterable[List[RecordTuple]], spill_store: SpillStore, max_debtor_entries: int
+    ) -> Tuple[Iterable[DebtorData], List[EntityData]]:
+        """
+        Agregación con memoria acotada: cuando el agregado de deudores supera `max_debtor_entries`
+        se vuelca a `spill_store` y se continúa con un dict vacío. Las entidades son pocas y se mantienen en memoria.
+        Los deudores se devuelven como un generador que combina las particiones del disco de a una;
+        debe consumirse antes de cerrar `spill_store`.
+        """
+        debtors_partial: DebtorsPartial = {}
+        entities_partial: EntitiesPartial = {}
+        for batch in record_batches:
+            self.accumulate_record_batches((batch,), debtors_partial, entities_partial)
+            if len(debtors_partial) > max_debtor_entries:
+                spill_store.spill(debtors_partial)
+                debtors_partial.clear()
+
+        if not spill_store.spilled:
+            return self.build_results(debtors_partial, entities_partial)
+
+        spill_store.spill(debtors_partial)
+        debtors_partial.clear()
+        final_entities = [self._make_entity(entity, loans) for entity, loans in entities_partial.items()]
+        self._validate_sample(final_entities, EntityData)
+        logger.info(
+            f"Agregación con volcado a disco completada ({spill_store.spill_count} volcados), "
+            f"{len(final_entities)} registros de entidades.")
+        return self.iter_debtors(spill_store.iter_merged()), final_entities
+
+
+    def iter_sorted_aggregates(
+            self, record_batches: Iterable[List[RecordTuple]], sorted_by: str
+    ) -> Iterator[Tuple[List[DebtorData], List[EntityData]]]:
+        """
+        Agregación en streaming para entradas ordenadas. Por cada lote de entrada devuelve los agregados
+        de las claves que ya terminaron, sin esperar al final del archivo.
+        :param sorted_by: "entity" si los registros están agrupados por código de entidad (las entidades se
+            emiten al cambiar el código) o "cuit" si están ordenados por CUIT/CUIL (se emiten los deudores).
+            La otra dimensión se agrega en memoria y se emite al final.
+        :raises DataProcessingError: si la entrada no respeta el orden indicado.
+        """
+        if sorted_by not in ("entity", "cuit"):
+            raise DataProcessingError(f"Orden de entrada desconocido: {sorted_by}")
+
+        debtors_partial: DebtorsPartial = {}
+        entities_partial: EntitiesPartial = {}
+        finished_entities = set()
+        current_entity = None
+        current_entity_loans = 0
+        current_cuit = None
+        current_debtor = None
+
+        for batch in record_batches:
+            done_debtors: List[DebtorData] = []
+            done_entities: List[EntityData] = []
+            if sorted_by == "entity":
+                for entity_code, cuit, situation, loans in batch:
+                    if entity_code != current_entity:
+                        if current_entity is not None:
+                            done_entities.append(self._make_entity(current_entity, current_entity_loans))
+                            finished_entities.add(current_entity)
+                        if entity_code in finished_entities:
+                            raise DataProcessingError(
+                                f"La entrada no está agrupada por entidad: el código {entity_code} reaparece.")
+                        current_entity = entity_code
+                        current_entity_loans = 0
+                    current_entity_loans += loans
+
+                    debtor = debtors_partial.get(cuit)
+                    if debtor is None:
+                        debtors_partial[cuit] = [situation, loans, entity_code]
+                    else:
+                        if situation > debtor[0]:
+                            debtor[0] = situation
+                        debtor[1] += loans
+            else:
+                for entity_code, cuit, situation, loans in batch:
+                    if cuit != current_cuit:
+                        if current_cuit is not None:
+                            if cuit < current_cuit:
+                                raise DataProcessingError(
+                                    f"La entrada no está ordenada por CUIT/CUIL: {cuit} aparece después de {current_cuit}.")
+                            done_debtors.append(self._make_debtor(current_cuit, *current_debtor))
+                        current_cuit = cuit
+                        current_debtor = [situation, loans, entity_code]
+                    else:
+                        if situation > current_debtor[0]:
+                            current_debtor[0] = situation
+                        current_debtor[1] += loans
+                    entities_partial[entity_code] = entities_partial.get(entity_code, 0) + loans
+            self._validate_sample(done_debtors, DebtorData)
+            self._validate_sample(done_entities, EntityData)
+            yield done_debtors, done_entities
+
+        if current_entity is not None:
+            entities_partial[current_entity] = current_entity_loans
+        if current_cuit is not None:
+            debtors_partial[current_cuit] = current_debtor
+        yield self.build_results(debtors_partial, entities_partial)
+
+
+    def iter_debtors(self, debtors_items: Iterable[Tuple[int, list]]) -> Iterator[DebtorData | dict]:
+        """
+        Construye deudores de forma perezosa a partir de pares (cuit, [max_situation, sum_loans, entity_code]).
+        """
+        stride = self._validation_stride if self.as_documents else 0
+        for index, (cuit, (situation, loans, entity_code)) in enumerate(debtors_items):
+            debtor = self._make_debtor(cuit, situation, loans, entity_code)
+            if stride and index % stride == 0:
+                self._validate_document(debtor, DebtorData)
+            yield debtor
+
+
+    def aggregate_columnar_chunks(self, chunks: Iterable) -> Tuple[List[DebtorData], List[EntityData]]:
+        """
+        Motor vectorizado: agrega los arrays de FileParser.iter_columnar_chunks con group-by de NumPy
+        (sort estable + reduceat) y produce los mismos DebtorData/EntityData que aggregate_data.
+        Las sumas se combinan por bloque, por lo que pueden diferir en el último dígito de redondeo.
+        """
+        from core.columnar import aggregate_chunks
+
+        (cuits, debtor_entities, situations, debtor_loans), (entities, entity_loans) = aggregate_chunks(chunks)
+
+        final_debtors = [
+            self._make_debtor(cuit, situation, loans, entity_code)
+            for cuit, entity_code, situation, loans in zip(
+                cuits.tolist(), debtor_entities.tolist(), situations.tolist(), debtor_loans.tolist()
+            )
+        ]
+        final_entities = [
+            self._make_entity(entity, loans)
+            for entity, loans in zip(entities.tolist(), entity_loans.tolist())
+        ]
+        self._validate_sample(final_debtors, DebtorData)
+        self._validate_sample(final_entities, EntityData)
+
+        logger.info(
+            f"Agregación completada. {len(final_debtors)} registros de deudores, {len(final_entities)} registros de entidades.")
+        return final_debtors, final_entities
@@ -12,4 +12,20 @@ class DataProcessingError(DataImporterError):
 
 class RepositoryError(DataImporterError):
     """Exception raised for errors in repository operations."""
-    pass
\ No newline at end of file
+    pass
+
+class JobQueueFullError(DataImporterError):
+    """Exception raised when the import job queue has no free slots."""
+    pass
+
+class CheckpointError(DataImporterError):
+    """Exception raised when an import checkpoint cannot be saved or read."""
+    pass
+
+class JobStateError(DataImporterError):
+    """Exception raised when an import job cannot perform an action in its current state."""
+    pass
+
+class SnapshotError(DataImporterError):
+    """Exception raised when a columnar snapshot cannot be written or read."""
+    pass
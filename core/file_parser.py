@@ -1,23 +1,139 @@
-import aiofiles
 import logging
+import mmap
+import os
 
-from typing import Optional
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
 
-from core.config import ENTITY_CODE_SLICE, CUIT_CUIL_SLICE, SITUATION_SLICE, TOTAL_SLICE
+from core import compression
+from core.config import ENTITY_CODE_SLICE, CUIT_CUIL_SLICE, SITUATION_SLICE, TOTAL_SLICE, DECOMPRESSION_CHUNK_BYTES
 from core.exceptions import FileParsingError
-from core.models import RawRecord
+from core.models import ImportProgress, RawRecord
+from core.rejects import BLANK_LINE, INVALID_NUMBER, NON_NUMERIC_ID, RejectSink, line_reject_reason
 
 
 logger = logging.getLogger(__name__)
 
+# (entity_code, cuit_cuil, situation, loans), mismo orden que ProcessedRecordData.
+RecordTuple = Tuple[int, int, float, float]
+# Líneas entre actualizaciones de ImportProgress en el motor "stream".
+_STREAM_PROGRESS_LINES = 10_000
+
+
+def _parse_numeric_bytes(value: bytes) -> Optional[float]:
+    """
+    Equivalente a FileParser.parse_numeric_value pero trabajando sobre bytes.
+    :return: El valor, 0.0 si el campo está vacío, o None si no es numérico (quien llama lo registra como rechazo).
+    """
+    cleaned_token = value.strip()
+    if not cleaned_token or cleaned_token == b",":
+        return 0.0
+    try:
+        return float(cleaned_token.replace(b",", b"."))
+    except ValueError:
+        return None
+
+
+def _parse_line_bytes(
+        line: bytes, rejects: Optional[RejectSink] = None, line_number: int = 0
+) -> Optional[RecordTuple]:
+    """
+    Parsea una línea en bytes y devuelve una tupla ya convertida, sin pasar por RawRecord.
+    :param line: La línea a parsear (sin decodificar).
+    :param rejects: Destino opcional de las líneas rechazadas.
+    :param line_number: Número de la línea, para el registro de rechazos.
+    :return: Una tupla (entity_code, cuit_cuil, situation, loans) o None si la línea se omite.
+    """
+    entity_code = line[ENTITY_CODE_SLICE].strip()
+    cuit_cuil = line[CUIT_CUIL_SLICE].strip()
+    if not entity_code.isdigit() or not cuit_cuil.isdigit():
+        if rejects is not None:
+            rejects.reject(line_reject_reason(line), line_number, line)
+        return None
+    situation = _parse_numeric_bytes(line[SITUATION_SLICE])
+    loans = _parse_numeric_bytes(line[TOTAL_SLICE])
+    if situation is None or loans is None:
+        # El registro se conserva con 0.0 en el campo inválido, como antes; se informa una vez por línea.
+        if rejects is not None:
+            rejects.reject(INVALID_NUMBER, line_number, line)
+        situation = situation or 0.0
+        loans = loans or 0.0
+    return int(entity_code), int(cuit_cuil), situation, loans
+
+
+def _parse_numeric_str(value: str) -> Tuple[float, bool]:
+    """
+    Convierte un monto con coma o punto decimal, una sola vez por campo.
+    :return: (valor, True), con 0.0 si el campo está vacío, o (0.0, False) si no es numérico.
+    """
+    cleaned_token = value.strip()
+    if not cleaned_token or cleaned_token == ",":
+        return 0.0, True
+    try:
+        return float(cleaned_token.replace(",", ".")), True
+    except ValueError:
+        return 0.0, False
+
+
+def _mmap_lines_until(mm: mmap.mmap, end: int) -> Iterator[bytes]:
+    while mm.tell() < end:
+        yield mm.readline()
+
+
+def _split_chunk_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Corta en líneas un iterable de bloques de bytes; las líneas pueden quedar partidas entre bloques.
+    """
+    remainder = b""
+    for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+
+def _batch_records(
+        lines: Iterable[bytes],
+        batch_size: int,
+        progress: Optional[ImportProgress] = None,
+        rejects: Optional[RejectSink] = None,
+        first_line: int = 1,
+) -> Iterator[List[RecordTuple]]:
+    """
+    Agrupa en lotes las tuplas obtenidas de un iterable de líneas en bytes.
+    :param progress: Si se indica, cuenta las líneas omitidas (los registros los cuenta quien consume los lotes).
+    :param rejects: Destino opcional de las líneas rechazadas.
+    :param first_line: Número de la primera línea del iterable.
+    """
+    batch: List[RecordTuple] = []
+    for line_number, line in enumerate(lines, first_line):
+        record = _parse_line_bytes(line, rejects, line_number)
+        if record is None:
+            if progress is not None:
+                progress.records_skipped += 1
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class FileParser:
-    def _parse_single_line(self, line: str) -> Optional[RawRecord]:
+    def _parse_single_line(
+            self, line: str, rejects: Optional[RejectSink] = None, line_number: int = 0
+    ) -> Optional[RawRecord]:
         """
         Parses a single line of the file and extracts the relevant fields.
         :param line: The line to parse.
+        :param rejects: Optional sink for rejected lines.
+        :param line_number: The line number, reported with rejected lines.
         :return: A RawRecord object containing the parsed data or None if the line is empty.
         """
         if not line.strip():
+            if rejects is not None:
+                rejects.reject(BLANK_LINE, line_number, line.encode("utf-8"))
             return None
 
         try:
@@ -27,32 +143,393 @@ class FileParser:
             total_str = line[TOTAL_SLICE].strip()
 
             if not codigo_entidad_str.isdigit() or not cuit_cuil_str.isdigit():
-                print("Advertencia: Código de entidad o CUIT/CUIL no numérico en ID block . Se omite línea.")
+                if rejects is not None:
+                    rejects.reject(NON_NUMERIC_ID, line_number, line.encode("utf-8"))
                 return None
 
+            # Amounts are converted once here; invalid ones are imported as 0.0 and reported once per line.
+            situation, situation_ok = _parse_numeric_str(situation_str)
+            loans, total_ok = _parse_numeric_str(total_str)
+            if not (situation_ok and total_ok) and rejects is not None:
+                rejects.reject(INVALID_NUMBER, line_number, line.encode("utf-8"))
+
             return RawRecord(
                 entity_code_str=codigo_entidad_str,
                 cuit_cuil_str=cuit_cuil_str,
                 situation_str=situation_str,
-                total_str=total_str
+                total_str=total_str,
+                situation=situation,
+                loans=loans
             )
         except IndexError:
-            print("Advertencia: Línea no válida. Se omite línea.")
+            if rejects is not None:
+                rejects.reject(NON_NUMERIC_ID, line_number, line.encode("utf-8"))
             return None
 
 
-    async def stream_raw_records(self, file_path: str):
+    async def stream_raw_records(
+            self, file_path: str, progress: Optional[ImportProgress] = None, rejects: Optional[RejectSink] = None
+    ):
         """
         Streams raw records from a file.
         :param file_path: The path to the file.
+        :param progress: Optional counters updated as lines are read.
+        :param rejects: Optional sink for rejected lines; by default they are only counted and sampled in the log.
         :return: A generator that yields RawRecord objects.
         """
+        # Only the "stream" engine reads through aiofiles.
+        import aiofiles
+
+        if rejects is None:
+            rejects = RejectSink(source=file_path)
+        try:
+            # Binary mode so that progress counts bytes; each line is decoded once, as text mode would.
+            async with aiofiles.open(file_path, "rb") as f:
+                line_number = 0
+                # Counters are accumulated locally and copied to `progress` every _STREAM_PROGRESS_LINES lines.
+                bytes_read = processed = skipped = 0
+                try:
+                    async for raw_line in f:
+                        line_number += 1
+                        bytes_read += len(raw_line)
+                        record = self._parse_single_line(raw_line.decode("utf-8"), rejects, line_number)
+                        if record:
+                            processed += 1
+                            yield record
+                        else:
+                            skipped += 1
+                        if progress and line_number % _STREAM_PROGRESS_LINES == 0:
+                            progress.bytes_processed += bytes_read
+                            progress.records_processed += processed
+                            progress.records_skipped += skipped
+                            bytes_read = processed = skipped = 0
+                finally:
+                    if progress:
+                        progress.bytes_processed += bytes_read
+                        progress.records_processed += processed
+                        progress.records_skipped += skipped
+        except FileNotFoundError:
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+        except Exception as e:
+            logger.error(f"Error inesperado al leer el archivo {file_path}: {e}")
+            raise FileParsingError(f"Error inesperado al leer el archivo {file_path}: {e}")
+
+    def iter_record_batches(
+            self,
+            file_path: str,
+            batch_size: int,
+            start: int = 0,
+            end: Optional[int] = None,
+            progress: Optional[ImportProgress] = None,
+            rejects: Optional[RejectSink] = None,
+    ) -> Iterator[List[RecordTuple]]:
+        """
+        Lee el archivo mediante mmap y devuelve lotes de tuplas (entity_code, cuit_cuil, situation, loans).
+        Los campos se recortan directamente de los bytes, sin decodificar la línea ni crear modelos pydantic.
+        :param file_path: The path to the file.
+        :param batch_size: Cantidad máxima de registros por lote.
+        :param start: Offset inicial en bytes (debe coincidir con un inicio de línea).
+        :param end: Offset final en bytes (exclusivo); None para leer hasta el final.
+        :param progress: Contadores opcionales que se actualizan después de cada lote.
+        :param rejects: Destino de las líneas rechazadas; los números de línea son relativos a `start`.
+            Por defecto solo se cuentan y se loguea una muestra.
+        :return: Un generador de listas de RecordTuple.
+        """
+        if rejects is None:
+            rejects = RejectSink(source=file_path)
+        if self.detect_compression(file_path) is not None:
+            if start > 0 or (end is not None and end < os.path.getsize(file_path)):
+                raise FileParsingError(f"Los archivos comprimidos no admiten lectura por rangos: {file_path}")
+            yield from self._iter_compressed_batches(file_path, batch_size, progress, rejects)
+            return
+        try:
+            with open(file_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                end = size if end is None else min(end, size)
+                if start >= end:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    mm.seek(start)
+                    lines = iter(mm.readline, b"") if end == size else _mmap_lines_until(mm, end)
+                    if progress is None:
+                        yield from _batch_records(lines, batch_size, rejects=rejects)
+                        return
+                    position = start
+                    for batch in _batch_records(lines, batch_size, progress, rejects):
+                        progress.bytes_processed += mm.tell() - position
+                        progress.records_processed += len(batch)
+                        position = mm.tell()
+                        yield batch
+                    progress.bytes_processed += mm.tell() - position
+        except FileNotFoundError:
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+        except Exception as e:
+            logger.error(f"Error inesperado al leer el archivo {file_path}: {e}")
+            raise FileParsingError(f"Error inesperado al leer el archivo {file_path}: {e}")
+
+    def detect_compression(self, file_path: str) -> Optional[str]:
+        """
+        Detecta si el archivo está comprimido, por sus bytes mágicos o por la extensión.
+        :param file_path: The path to the file.
+        :return: "gzip", "zip" o None.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                header = f.read(len(compression.ZIP_MAGIC))
+        except FileNotFoundError:
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+        return compression.detect_compression(header, file_path)
+
+    def _iter_file_chunks(self, file_path: str, chunk_bytes: int) -> Iterator[Tuple[bytes, int]]:
+        """
+        Lee el archivo en bloques de bytes ya descomprimidos. Si está comprimido, la descompresión
+        corre en un hilo lector y se solapa con el procesamiento de los bloques.
+        :return: Un generador de (bloque, bytes del archivo leídos hasta ahora).
+        """
+        kind = self.detect_compression(file_path)
+        if kind is not None:
+            logger.info(f"Descomprimiendo '{file_path}' ({kind}) en streaming.")
+            yield from compression.iter_in_thread(
+                compression.iter_decompressed_file(file_path, kind, chunk_bytes), compression.READER_QUEUE_SIZE
+            )
+            return
+        with open(file_path, "rb") as f:
+            while chunk := f.read(chunk_bytes):
+                yield chunk, f.tell()
+
+    def _iter_compressed_batches(
+            self, file_path: str, batch_size: int, progress: Optional[ImportProgress], rejects: RejectSink
+    ) -> Iterator[List[RecordTuple]]:
+        chunks = self._iter_file_chunks(file_path, DECOMPRESSION_CHUNK_BYTES)
+        try:
+            if progress is None:
+                yield from _batch_records(
+                    _split_chunk_lines(chunk for chunk, _ in chunks), batch_size, rejects=rejects
+                )
+                return
+            position = 0
+
+            def tracked_chunks():
+                nonlocal position
+                for chunk, position in chunks:
+                    yield chunk
+
+            reported = 0
+            for batch in _batch_records(_split_chunk_lines(tracked_chunks()), batch_size, progress, rejects):
+                progress.bytes_processed += position - reported
+                progress.records_processed += len(batch)
+                reported = position
+                yield batch
+            progress.bytes_processed += position - reported
+        except FileParsingError:
+            raise
+        except Exception as e:
+            logger.error(f"Error al descomprimir el archivo {file_path}: {e}")
+            raise FileParsingError(f"Error al descomprimir el archivo {file_path}: {e}")
+
+    def iter_block_batches(
+            self,
+            block: bytes,
+            batch_size: int,
+            progress: Optional[ImportProgress] = None,
+            rejects: Optional[RejectSink] = None,
+    ) -> Iterator[List[RecordTuple]]:
+        """
+        Parsea un bloque de bytes en memoria formado por líneas completas.
+        :param block: Bytes de una o más líneas.
+        :param batch_size: Cantidad máxima de registros por lote.
+        :param progress: Contadores opcionales de líneas omitidas.
+        :param rejects: Destino de las líneas rechazadas; los números de línea son relativos al bloque.
+        :return: Un generador de listas de RecordTuple.
+        """
+        return _batch_records(_split_chunk_lines((block,)), batch_size, progress, rejects or RejectSink())
+
+    async def stream_record_batches(
+            self,
+            chunks: AsyncIterable[bytes],
+            batch_size: int,
+            progress: Optional[ImportProgress] = None,
+            rejects: Optional[RejectSink] = None,
+    ) -> AsyncIterator[List[RecordTuple]]:
+        """
+        Parsea un flujo asíncrono de bloques de bytes (por ejemplo, el cuerpo de una subida) a medida que llega,
+        cortándolo en líneas sin pasar por un archivo temporal.
+        :param chunks: Bloques de bytes en orden; las líneas pueden quedar partidas entre bloques.
+        :param batch_size: Cantidad máxima de registros por lote.
+        :param progress: Contadores opcionales que se actualizan después de cada bloque.
+        :param rejects: Destino opcional de las líneas rechazadas.
+        :return: Un generador asíncrono de listas de RecordTuple.
+        """
+        if rejects is None:
+            rejects = RejectSink()
+        remainder = b""
+        batch: List[RecordTuple] = []
+        line_number = 0
+        async for chunk in chunks:
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line_number, line in enumerate(lines, line_number + 1):
+                record = _parse_line_bytes(line, rejects, line_number)
+                if record is None:
+                    if progress:
+                        progress.records_skipped += 1
+                    continue
+                batch.append(record)
+                if progress:
+                    progress.records_processed += 1
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if progress:
+                progress.bytes_processed += len(chunk)
+        if remainder:
+            record = _parse_line_bytes(remainder, rejects, line_number + 1)
+            if record is not None:
+                batch.append(record)
+                if progress:
+                    progress.records_processed += 1
+            elif progress:
+                progress.records_skipped += 1
+        if batch:
+            yield batch
+
+    def _iter_lines(self, file_path: str) -> Iterator[bytes]:
+        """
+        Recorre las líneas del archivo en bytes: con mmap si está sin comprimir, o descomprimiéndolo en streaming.
+        """
         try:
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                async for line in f:
-                    record = self._parse_single_line(line)
-                    if record:
-                        yield record
+            if self.detect_compression(file_path) is not None:
+                yield from _split_chunk_lines(
+                    chunk for chunk, _ in self._iter_file_chunks(file_path, DECOMPRESSION_CHUNK_BYTES)
+                )
+                return
+            with open(file_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield from iter(mm.readline, b"")
+        except FileNotFoundError:
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+
+    def detect_sort_order(self, file_path: str, candidates: Tuple[str, ...] = ("cuit", "entity")) -> Optional[str]:
+        """
+        Recorre solo las columnas clave del archivo para detectar su orden.
+        :param file_path: The path to the file.
+        :param candidates: Órdenes a verificar; con uno solo, la pasada termina apenas se incumple.
+        :return: "cuit" si está ordenado por CUIT/CUIL, "entity" si está agrupado por código de entidad, o None.
+        """
+        sorted_by_cuit = "cuit" in candidates
+        grouped_by_entity = "entity" in candidates
+        previous_cuit = -1
+        current_entity = None
+        finished_entities = set()
+        for line in self._iter_lines(file_path):
+            entity_code = line[ENTITY_CODE_SLICE].strip()
+            cuit_cuil = line[CUIT_CUIL_SLICE].strip()
+            if not entity_code.isdigit() or not cuit_cuil.isdigit():
+                continue
+            if sorted_by_cuit:
+                cuit = int(cuit_cuil)
+                sorted_by_cuit = cuit >= previous_cuit
+                previous_cuit = cuit
+            if grouped_by_entity:
+                entity = int(entity_code)
+                if entity != current_entity:
+                    grouped_by_entity = entity not in finished_entities
+                    finished_entities.add(current_entity)
+                    current_entity = entity
+            if not sorted_by_cuit and not grouped_by_entity:
+                return None
+        if sorted_by_cuit:
+            return "cuit"
+        return "entity" if grouped_by_entity else None
+
+    def compute_shards(self, file_path: str, shard_count: int) -> List[Tuple[int, int]]:
+        """
+        Divide el archivo en rangos de bytes [start, end) alineados a inicio de línea.
+        :param file_path: The path to the file.
+        :param shard_count: Cantidad de rangos deseada.
+        :return: Lista de rangos no vacíos que cubren todo el archivo. Un archivo comprimido no se puede
+            dividir y se devuelve como un único rango.
+        """
+        try:
+            size = os.path.getsize(file_path)
+            if size == 0:
+                return []
+            if self.detect_compression(file_path) is not None:
+                return [(0, size)]
+            shards: List[Tuple[int, int]] = []
+            with open(file_path, "rb") as f:
+                start = 0
+                for i in range(1, max(shard_count, 1)):
+                    target = max(size * i // shard_count, start)
+                    f.seek(target)
+                    if target > 0:
+                        f.readline()
+                    boundary = min(f.tell(), size)
+                    if boundary > start:
+                        shards.append((start, boundary))
+                        start = boundary
+                if start < size:
+                    shards.append((start, size))
+            return shards
+        except FileNotFoundError:
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+
+    def iter_columnar_chunks(
+            self,
+            file_path: str,
+            chunk_bytes: int,
+            progress: Optional[ImportProgress] = None,
+            rejects: Optional[RejectSink] = None,
+    ):
+        """
+        Lee el archivo (descomprimiéndolo si hace falta) en bloques grandes alineados a fin de línea
+        y los convierte en arrays estructurados de NumPy (core.columnar.RECORD_DTYPE).
+        :param file_path: The path to the file.
+        :param chunk_bytes: Tamaño aproximado de cada bloque en bytes.
+        :param progress: Contadores opcionales que se actualizan después de cada bloque.
+        :param rejects: Destino opcional de las líneas rechazadas.
+        :return: Un generador de arrays estructurados.
+        """
+        from core.columnar import parse_chunk, require_numpy
+
+        require_numpy()
+        if rejects is None:
+            rejects = RejectSink(source=file_path)
+        try:
+            remainder = b""
+            position = reported = 0
+            first_line = 1
+            for block, position in self._iter_file_chunks(file_path, chunk_bytes):
+                block = remainder + block
+                cut = block.rfind(b"\n") + 1
+                if cut == 0:
+                    remainder = block
+                    continue
+                remainder = block[cut:]
+                records = parse_chunk(block[:cut], rejects, first_line)
+                lines = block.count(b"\n", 0, cut)
+                first_line += lines
+                if progress:
+                    progress.bytes_processed += position - reported
+                    progress.records_processed += len(records)
+                    progress.records_skipped += lines - len(records)
+                    reported = position
+                yield records
+            if progress:
+                progress.bytes_processed += position - reported
+            if remainder:
+                records = parse_chunk(remainder, rejects, first_line)
+                if progress:
+                    progress.records_processed += len(records)
+                    progress.records_skipped += 1 - len(records)
+                yield records
         except FileNotFoundError:
             logger.error(f"Archivo no encontrado: {file_path}")
             raise FileParsingError(f"Archivo no encontrado: {file_path}")
@@ -63,16 +540,8 @@ class FileParser:
     def parse_numeric_value(self, value: str) -> float:
         """
         Convierte un string a float. Usado por DataProcessor.
+        Los valores no numéricos devuelven 0.0 sin loguear: el parser ya los informó como rechazos.
         """
         if not value:
             return 0.0
-        cleaned_token = value.strip()
-        if not cleaned_token or cleaned_token == ",":
-            return 0.0
-        try:
-            return float(cleaned_token.replace(",", "."))
-        except ValueError:
-            logger.warning(
-                f"No se pudo convertir '{value}' a float. Se usará 0.0."
-            )
-            return 0.0
+        return _parse_numeric_str(value)[0]
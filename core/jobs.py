@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from core.checkpoint import CheckpointStore
+from core.exceptions import DataImporterError, JobQueueFullError, JobStateError
+from core.models import ImportJob
+from core.services import DataImportService
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobManager:
+    """
+    Ejecuta importaciones en segundo plano con una cola acotada y un número fijo de workers.
+    Los archivos de los jobs se eliminan al terminar.
+
+    Con un checkpoint_store, cada job guarda checkpoints con su id como clave: los jobs interrumpidos por un
+    reinicio se vuelven a encolar al iniciar y continúan desde su último checkpoint, y los que fallan conservan
+    su archivo para poder reanudarlos con `resume` mientras sigan en el historial.
+    """
+
+    def __init__(
+            self,
+            service_factory: Callable[[], DataImportService],
+            workers: int,
+            queue_size: int,
+            history_limit: int,
+            checkpoint_store: Optional[CheckpointStore] = None
+    ):
+        """
+        :param service_factory: Crea el DataImportService que usa cada job.
+        :param workers: Cantidad de importaciones simultáneas.
+        :param queue_size: Jobs en espera admitidos antes de rechazar nuevos.
+        :param history_limit: Jobs terminados que se conservan para consultar su estado.
+        :param checkpoint_store: Si se indica, los jobs son reanudables (ver la descripción de la clase).
+        """
+        self.service_factory = service_factory
+        self.workers = workers
+        self.history_limit = history_limit
+        self.checkpoint_store = checkpoint_store
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self.checkpoint_store is not None:
+            # Los archivos se leen en un hilo, pero la cola (que no es thread-safe) solo se usa desde el loop.
+            for job in await asyncio.to_thread(self._recover):
+                try:
+                    self._queue.put_nowait(job)
+                except asyncio.QueueFull:
+                    logger.warning(f"Cola llena: el job {job.id} se recuperará en el próximo inicio.")
+                    continue
+                self._jobs[job.id] = job
+                logger.info(f"Job {job.id} recuperado para '{job.filename}'.")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Iniciados {self.workers} workers de importación.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Workers de importación detenidos.")
+
+    def has_capacity(self) -> bool:
+        return not self._queue.full()
+
+    def submit(self, file_path: str, filename: str) -> ImportJob:
+        """
+        Encola la importación de `file_path`. El manager pasa a ser dueño del archivo y lo elimina al terminar.
+        :raises JobQueueFullError: si la cola está llena.
+        """
+        job = ImportJob(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            file_path=file_path,
+            created_at=datetime.now(timezone.utc),
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("La cola de importaciones está llena. Reintenta más tarde.")
+        self._jobs[job.id] = job
+        self._prune_history()
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.save_meta(job.id, {"job": {
+                "filename": filename, "file_path": file_path, "created_at": job.created_at.isoformat(),
+            }})
+        logger.info(f"Job {job.id} encolado para '{filename}'.")
+        return job
+
+    def resume(self, job_id: str) -> ImportJob:
+        """
+        Vuelve a encolar un job fallido para que continúe desde su último checkpoint.
+        :raises JobStateError: si los jobs no son reanudables, el job no falló o ya no tiene su archivo.
+        :raises JobQueueFullError: si la cola está llena.
+        """
+        job = self._jobs[job_id]
+        if self.checkpoint_store is None:
+            raise JobStateError("Los jobs no guardan checkpoints (JOB_CHECKPOINTS=false).")
+        if job.status != "failed":
+            raise JobStateError(f"Solo se pueden reanudar jobs fallidos; el job está '{job.status}'.")
+        if not os.path.exists(job.file_path):
+            raise JobStateError("El archivo del job ya no está disponible.")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("La cola de importaciones está llena. Reintenta más tarde.")
+        meta = self.checkpoint_store.load_meta(job.id) or {}
+        meta.pop("failed", None)
+        self.checkpoint_store.save_meta(job.id, meta)
+        job.status = "queued"
+        job.error = None
+        job.summary = None
+        job.finished_at = None
+        job.resumed = True
+        logger.info(f"Job {job.id} encolado para reanudarse.")
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+    def _prune_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            job = self._jobs.pop(job_id)
+            if job.status == "failed" and self.checkpoint_store is not None:
+                self._discard(job.id, job.file_path)
+
+    def _discard(self, job_id: str, file_path: Optional[str]):
+        """
+        Elimina el checkpoint y el archivo de un job que ya no se puede reanudar.
+        """
+        self.checkpoint_store.delete(job_id)
+        if file_path:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"No se pudo eliminar el archivo del job '{file_path}': {e}")
+
+    def _recover(self) -> List[ImportJob]:
+        """
+        Busca los jobs que quedaron sin terminar en una ejecución anterior, para volver a encolarlos. Los que
+        habían fallado se descartan, porque su estado ya no se puede consultar.
+        :return: Los jobs a reanudar.
+        """
+        recovered = []
+        for job_id in self.checkpoint_store.keys():
+            try:
+                meta = self.checkpoint_store.load_meta(job_id) or {}
+            except DataImporterError as e:
+                logger.error(f"Se descarta el checkpoint '{job_id}': {e}")
+                self._discard(job_id, None)
+                continue
+            info = meta.get("job")
+            if info is None:
+                continue
+            if meta.get("failed") or not os.path.exists(info["file_path"]):
+                self._discard(job_id, info["file_path"])
+                continue
+            recovered.append(ImportJob(
+                id=job_id,
+                filename=info["filename"],
+                file_path=info["file_path"],
+                created_at=datetime.fromisoformat(info["created_at"]),
+                resumed=True,
+            ))
+        return recovered
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ImportJob):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        logger.info(f"Job {job.id} iniciado.")
+        checkpoints = self.checkpoint_store is not None
+        try:
+            job.summary = await self.service_factory().import_data_from_file(
+                job.file_path, progress=job.progress, checkpoint_key=job.id if checkpoints else None, resume=checkpoints
+            )
+            job.summary["file_path"] = job.filename
+            job.status = "completed"
+        except DataImporterError as e:
+            job.error = str(e)
+            job.status = "failed"
+        except Exception as e:
+            logger.critical(f"Error crítico no manejado en el job {job.id}: {e}", exc_info=True)
+            job.error = "Error interno crítico del servidor."
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            if checkpoints and job.status == "failed":
+                # Se conservan el archivo y el checkpoint para poder reanudarlo.
+                self._mark_failed(job.id)
+            else:
+                try:
+                    os.remove(job.file_path)
+                except OSError as e_rm:
+                    logger.error(f"No se pudo eliminar el archivo del job '{job.file_path}': {e_rm}")
+            logger.info(f"Job {job.id} terminado con estado '{job.status}'.")
+
+    def _mark_failed(self, job_id: str):
+        try:
+            meta = self.checkpoint_store.load_meta(job_id)
+            if meta is not None:
+                meta["failed"] = True
+                self.checkpoint_store.save_meta(job_id, meta)
+        except DataImporterError as e:
+            logger.error(f"No se pudo marcar como fallido el checkpoint del job {job_id}: {e}")
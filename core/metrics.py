@@ -0,0 +1,281 @@
+"""
+Instrumentación de las importaciones: tiempos por etapa, contadores, histogramas de latencia de escritura
+y memoria pico. Cada importación acumula sus métricas en un ImportMetrics que termina en el resumen;
+REGISTRY acumula los totales del proceso y los expone en formato de texto de Prometheus.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.models import ImportProgress
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Límites (en segundos) de los buckets del histograma de latencia de escritura por lote.
+WRITE_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_metrics: ContextVar[Optional["ImportMetrics"]] = ContextVar("current_import_metrics", default=None)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Memoria residente máxima del proceso desde que arrancó (no incluye procesos hijos).
+    """
+    if resource is None:
+        return None
+    # En Linux ru_maxrss está en KB.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = WRITE_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Conteos acumulados por límite superior, como los buckets "le" de Prometheus.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((f"{bound:g}", total))
+        result.append(("+Inf", self.count))
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "max_seconds": round(self.max, 6),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class ImportMetrics:
+    """
+    Métricas de una importación. Las etapas acumulan tiempo de reloj y tiempo de CPU del proceso
+    (que incluye el de otros hilos activos en ese momento, como escrituras concurrentes).
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.write_batches: Dict[str, Histogram] = {}
+        self._started = (time.perf_counter(), time.process_time())
+        self._finished: Optional[Tuple[float, float]] = None
+
+    def add(self, stage: str, wall: float, cpu: float):
+        totals = self.stages.setdefault(stage, [0.0, 0.0])
+        totals[0] += wall
+        totals[1] += cpu
+
+    @contextmanager
+    def stage(self, name: str, excluding: str | Tuple[str, ...] | None = None):
+        """
+        Mide el bloque como la etapa `name`. Si `excluding` se indica, descuenta el tiempo que esa otra etapa
+        (o esas otras etapas) acumuló mientras tanto (por ejemplo, el parseo que ocurre dentro de la agregación).
+        """
+        excluded = (excluding,) if isinstance(excluding, str) else (excluding or ())
+        nested = {other: tuple(self.stages.get(other, (0.0, 0.0))) for other in excluded}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            for other, before in nested.items():
+                after = self.stages.get(other, (0.0, 0.0))
+                wall -= after[0] - before[0]
+                cpu -= after[1] - before[1]
+            self.add(name, max(wall, 0.0), max(cpu, 0.0))
+
+    def timed(self, iterable: Iterable, stage: str) -> Iterator:
+        """
+        Envuelve un iterador y carga a `stage` el tiempo que se pasa produciendo cada elemento.
+        """
+        iterator = iter(iterable)
+        perf_counter, process_time = time.perf_counter, time.process_time
+        while True:
+            wall, cpu = perf_counter(), process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, perf_counter() - wall, process_time() - cpu)
+                return
+            self.add(stage, perf_counter() - wall, process_time() - cpu)
+            yield item
+
+    async def timed_async(self, iterable: AsyncIterable, stage: str) -> AsyncIterator:
+        """
+        Igual que `timed` para iteradores asíncronos. Incluye el tiempo de espera de la fuente (por ejemplo, la red).
+        """
+        iterator = iterable.__aiter__()
+        perf_counter, process_time = time.perf_counter, time.process_time
+        while True:
+            wall, cpu = perf_counter(), process_time()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                self.add(stage, perf_counter() - wall, process_time() - cpu)
+                return
+            self.add(stage, perf_counter() - wall, process_time() - cpu)
+            yield item
+
+    def observe_write_batch(self, collection: str, seconds: float):
+        self.write_batches.setdefault(collection, Histogram()).observe(seconds)
+
+    def finish(self):
+        if self._finished is None:
+            self._finished = (time.perf_counter() - self._started[0], time.process_time() - self._started[1])
+
+    def to_dict(self, progress: ImportProgress) -> dict:
+        self.finish()
+        wall, cpu = self._finished
+        records_read = progress.records_processed + progress.records_skipped
+        return {
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "stages": {
+                name: {"wall_seconds": round(stage_wall, 6), "cpu_seconds": round(stage_cpu, 6)}
+                for name, (stage_wall, stage_cpu) in self.stages.items()
+            },
+            "records_read": records_read,
+            "records_skipped": progress.records_skipped,
+            "records_aggregated": progress.records_processed,
+            "records_per_sec": round(records_read / wall, 1) if wall > 0 else None,
+            "write_batches": {name: histogram.to_dict() for name, histogram in self.write_batches.items()},
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+@contextmanager
+def track_import(metrics: ImportMetrics):
+    """
+    Hace que `metrics` sea la importación en curso para el código llamado desde este contexto
+    (incluidas las tareas y los hilos que se creen dentro), de modo que el repositorio pueda reportar sus lotes.
+    """
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+class MetricsRegistry:
+    """
+    Totales del proceso desde que arrancó, expuestos en formato de texto de Prometheus.
+    """
+
+    def __init__(self, prefix: str = "importer"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.imports: Dict[str, int] = {}
+        self.records: Dict[str, int] = {"read": 0, "skipped": 0, "aggregated": 0}
+        self.documents: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, List[float]] = {}
+        self.write_batches: Dict[str, Histogram] = {}
+        self.last_records_per_sec = 0.0
+
+    def observe_write_batch(self, collection: str, seconds: float):
+        with self._lock:
+            self.write_batches.setdefault(collection, Histogram()).observe(seconds)
+
+    def record_import(self, summary: dict, metrics: dict):
+        """
+        Acumula una importación terminada a partir de su resumen y del dict de ImportMetrics.to_dict.
+        """
+        with self._lock:
+            status = summary.get("status", "failed")
+            self.imports[status] = self.imports.get(status, 0) + 1
+            self.records["read"] += metrics["records_read"]
+            self.records["skipped"] += metrics["records_skipped"]
+            self.records["aggregated"] += metrics["records_aggregated"]
+            for kind in ("debtors", "entities"):
+                self.documents[kind] = self.documents.get(kind, 0) + summary.get(f"{kind}_saved", 0)
+            for reason, count in summary.get("records_rejected", {}).items():
+                self.rejected[reason] = self.rejected.get(reason, 0) + count
+            for name, stage in metrics["stages"].items():
+                totals = self.stage_seconds.setdefault(name, [0.0, 0.0])
+                totals[0] += stage["wall_seconds"]
+                totals[1] += stage["cpu_seconds"]
+            if metrics["records_per_sec"] is not None:
+                self.last_records_per_sec = metrics["records_per_sec"]
+
+    def render(self) -> str:
+        p = self.prefix
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        with self._lock:
+            family("imports_total", "counter", "Importaciones terminadas por estado.")
+            for status, count in sorted(self.imports.items()):
+                lines.append(f'{p}_imports_total{{status="{status}"}} {count}')
+            family("records_total", "counter", "Registros leídos, omitidos y agregados.")
+            for kind, count in self.records.items():
+                lines.append(f'{p}_records_total{{kind="{kind}"}} {count}')
+            family("records_rejected_total", "counter", "Líneas rechazadas por motivo.")
+            for reason, count in sorted(self.rejected.items()):
+                lines.append(f'{p}_records_rejected_total{{reason="{reason}"}} {count}')
+            family("documents_written_total", "counter", "Documentos escritos por colección.")
+            for kind, count in sorted(self.documents.items()):
+                lines.append(f'{p}_documents_written_total{{collection="{kind}"}} {count}')
+            family("stage_seconds_total", "counter", "Tiempo de reloj acumulado por etapa.")
+            for name, (wall, _) in sorted(self.stage_seconds.items()):
+                lines.append(f'{p}_stage_seconds_total{{stage="{name}"}} {wall:.6f}')
+            family("stage_cpu_seconds_total", "counter", "Tiempo de CPU del proceso acumulado por etapa.")
+            for name, (_, cpu) in sorted(self.stage_seconds.items()):
+                lines.append(f'{p}_stage_cpu_seconds_total{{stage="{name}"}} {cpu:.6f}')
+            family("write_batch_seconds", "histogram", "Latencia de escritura de cada lote.")
+            for collection, histogram in sorted(self.write_batches.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{p}_write_batch_seconds_bucket{{collection="{collection}",le="{bound}"}} {count}')
+                lines.append(f'{p}_write_batch_seconds_sum{{collection="{collection}"}} {histogram.sum:.6f}')
+                lines.append(f'{p}_write_batch_seconds_count{{collection="{collection}"}} {histogram.count}')
+            family("last_import_records_per_second", "gauge", "Throughput de la última importación.")
+            lines.append(f"{p}_last_import_records_per_second {self.last_records_per_sec}")
+        rss = peak_rss_bytes()
+        if rss is not None:
+            family("process_peak_rss_bytes", "gauge", "Memoria residente máxima del proceso.")
+            lines.append(f"{p}_process_peak_rss_bytes {rss}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def observe_write_batch(collection: str, seconds: float):
+    """
+    Registra la latencia de un lote escrito, en el registro del proceso y en la importación en curso si hay una.
+    """
+    REGISTRY.observe_write_batch(collection, seconds)
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.observe_write_batch(collection, seconds)
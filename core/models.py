@@ -1,5 +1,10 @@
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
+from core.config import LOOKUP_BATCH_LIMIT
+
 
 class RawRecord(BaseModel):
     """
@@ -10,6 +15,9 @@ class RawRecord(BaseModel):
     cuit_cuil_str: str
     situation_str: str
     total_str: str
+    # Amounts already converted by FileParser (invalid ones as 0.0); None when they still have to be converted.
+    situation: Optional[float] = None
+    loans: Optional[float] = None
 
 
 class ProcessedRecordData(BaseModel):
@@ -51,4 +59,50 @@ class EntityData(BaseModel):
         """
         Pydantic configuration to allow aliasing of fields.
         """
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+
+class ImportProgress(BaseModel):
+    """
+    Progress counters of a running import, updated by the parser after each batch.
+    """
+
+    bytes_processed: int = 0
+    records_processed: int = 0
+    records_skipped: int = 0
+    total_bytes: Optional[int] = None
+
+
+class ImportJob(BaseModel):
+    """
+    A class representing an asynchronous import job and its current state.
+    """
+
+    id: str
+    filename: str
+    file_path: str = Field(..., exclude=True)
+    status: str = "queued"
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: ImportProgress = Field(default_factory=ImportProgress)
+    summary: Optional[dict] = None
+    error: Optional[str] = None
+    resumed: bool = False
+
+
+class DebtorLookupRequest(BaseModel):
+    """
+    A batch of CUIT/CUILs to look up.
+    """
+
+    cuit_cuils: List[int] = Field(..., min_length=1, max_length=LOOKUP_BATCH_LIMIT)
+
+
+class DebtorLookupResponse(BaseModel):
+    """
+    The debtors found for a batch lookup and the CUIT/CUILs that do not exist.
+    """
+
+    debtors: List[DebtorData]
+    not_found: List[int]
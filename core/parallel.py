@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.data_processor import DataProcessor, DebtorsPartial, EntitiesPartial
+from core.file_parser import FileParser
+from core.models import ImportProgress
+from core.rejects import RejectSink
+
+logger = logging.getLogger(__name__)
+
+
+def _count_records(batches: Iterable[list], progress: ImportProgress) -> Iterator[list]:
+    for batch in batches:
+        progress.records_processed += len(batch)
+        yield batch
+
+
+def aggregate_shard(
+        file_path: str, start: int, end: int, batch_size: int, rejects_path: Optional[str] = None
+) -> Tuple[DebtorsPartial, EntitiesPartial, ImportProgress, Dict[str, int]]:
+    """
+    Parsea y agrega un rango de bytes del archivo. Se ejecuta dentro de un proceso del pool,
+    por lo que debe ser una función de módulo (serializable con pickle).
+    :param rejects_path: Archivo temporal para las líneas rechazadas del rango (con números de línea relativos al rango).
+    :return: Los agregados parciales, los contadores de registros leídos y omitidos del rango y los rechazos por motivo.
+    """
+    parser = FileParser()
+    processor = DataProcessor(file_parser=parser)
+    progress = ImportProgress()
+    with RejectSink(rejects_path, source=file_path) as rejects:
+        batches = parser.iter_record_batches(file_path, batch_size, start, end, progress=progress, rejects=rejects)
+        return *processor.accumulate_record_batches(batches), progress, rejects.counts
+
+
+def aggregate_block(
+        block: bytes, batch_size: int, rejects_path: Optional[str] = None
+) -> Tuple[DebtorsPartial, EntitiesPartial, ImportProgress, Dict[str, int]]:
+    """
+    Parsea y agrega un bloque de líneas completas recibido en memoria (por ejemplo, de una subida).
+    Se ejecuta dentro de un proceso del pool.
+    :param rejects_path: Archivo temporal para las líneas rechazadas del bloque (con números de línea relativos al bloque).
+    :return: Los agregados parciales, los contadores de registros leídos y omitidos del bloque y los rechazos por motivo.
+    """
+    parser = FileParser()
+    processor = DataProcessor(file_parser=parser)
+    progress = ImportProgress()
+    with RejectSink(rejects_path) as rejects:
+        batches = _count_records(parser.iter_block_batches(block, batch_size, progress, rejects), progress)
+        return *processor.accumulate_record_batches(batches), progress, rejects.counts
+
+
+def _add_counts(progress: Optional[ImportProgress], counts: ImportProgress):
+    if progress:
+        progress.records_processed += counts.records_processed
+        progress.records_skipped += counts.records_skipped
+
+
+def _merge_rejects(
+        rejects: Optional[RejectSink], counts: Dict[str, int], part_path: Optional[str], shard: ImportProgress, offset: int
+) -> int:
+    """
+    Combina los rechazos de un fragmento y devuelve la cantidad de líneas leídas hasta el final del fragmento,
+    que es el desplazamiento de los números de línea del siguiente.
+    """
+    if rejects is not None:
+        rejects.merge(counts, part_path, offset)
+    return offset + shard.records_processed + shard.records_skipped
+
+
+async def aggregate_stream_parallel(
+        processor: DataProcessor,
+        chunks: AsyncIterable[bytes],
+        executor: Executor,
+        block_bytes: int,
+        max_in_flight: int,
+        batch_size: int,
+        progress: Optional[ImportProgress] = None,
+        rejects: Optional[RejectSink] = None,
+) -> Tuple[DebtorsPartial, EntitiesPartial]:
+    """
+    Junta los bloques de un flujo en bloques de ~`block_bytes` alineados a fin de línea, los agrega en el pool
+    de procesos y combina los parciales en orden a medida que terminan. Mantiene a lo sumo `max_in_flight`
+    bloques en el pool, lo que aplica contrapresión sobre la lectura del flujo.
+    :param rejects: Destino opcional de las líneas rechazadas; los rechazos de cada bloque se combinan en orden.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight: Deque[Tuple[asyncio.Future, Optional[str]]] = deque()
+    merged: Tuple[DebtorsPartial, EntitiesPartial] = ({}, {})
+    submitted = 0
+    line_offset = 0
+
+    async def merge_oldest():
+        nonlocal merged, line_offset
+        future, part_path = in_flight.popleft()
+        debtors_partial, entities_partial, counts, reject_counts = await future
+        _add_counts(progress, counts)
+        line_offset = _merge_rejects(rejects, reject_counts, part_path, counts, line_offset)
+        merged = await asyncio.to_thread(processor.merge_partials, (merged, (debtors_partial, entities_partial)))
+
+    def submit(block: bytes):
+        nonlocal submitted
+        part_path = rejects.part_path(submitted) if rejects is not None else None
+        submitted += 1
+        in_flight.append((loop.run_in_executor(executor, aggregate_block, block, batch_size, part_path), part_path))
+
+    pending: List[bytes] = []
+    pending_size = 0
+    try:
+        async for chunk in chunks:
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if progress:
+                progress.bytes_processed += len(chunk)
+            if pending_size < block_bytes:
+                continue
+            data = b"".join(pending)
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                pending, pending_size = [data], len(data)
+                continue
+            pending, pending_size = [data[cut:]], len(data) - cut
+            if len(in_flight) >= max_in_flight:
+                await merge_oldest()
+            submit(data[:cut])
+        if pending_size:
+            submit(b"".join(pending))
+        while in_flight:
+            await merge_oldest()
+    finally:
+        for future, _ in in_flight:
+            future.cancel()
+    return merged
+
+
+async def aggregate_file_parallel(
+        parser: FileParser,
+        processor: DataProcessor,
+        file_path: str,
+        workers: int,
+        batch_size: int,
+        executor: Optional[Executor] = None,
+        progress: Optional[ImportProgress] = None,
+        rejects: Optional[RejectSink] = None,
+) -> Tuple[DebtorsPartial, EntitiesPartial]:
+    """
+    Divide el archivo en rangos alineados a líneas, los agrega en paralelo en un pool de procesos
+    y combina los parciales en orden de archivo.
+    :param executor: Pool a reutilizar; si es None se crea uno temporal con `workers` procesos.
+    :param progress: Contadores opcionales; se completan cuando terminan todos los rangos.
+    :param rejects: Destino opcional de las líneas rechazadas; los rechazos de cada rango se combinan en orden de archivo.
+    """
+    shards = parser.compute_shards(file_path, workers)
+    part_paths = [rejects.part_path(i) if rejects is not None else None for i in range(len(shards))]
+    logger.info(f"Procesando {file_path} en {len(shards)} fragmentos con {workers} procesos.")
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, aggregate_shard, file_path, start, end, batch_size, part_path)
+            for (start, end), part_path in zip(shards, part_paths)
+        ))
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+    partials: List[Tuple[DebtorsPartial, EntitiesPartial]] = []
+    line_offset = 0
+    for (debtors_partial, entities_partial, counts, reject_counts), part_path in zip(results, part_paths):
+        partials.append((debtors_partial, entities_partial))
+        _add_counts(progress, counts)
+        line_offset = _merge_rejects(rejects, reject_counts, part_path, counts, line_offset)
+    return await asyncio.to_thread(processor.merge_partials, partials)
@@ -0,0 +1,155 @@
+"""
+Registro de líneas rechazadas durante una importación.
+
+Cada rechazo se cuenta por motivo; solo las primeras líneas de cada motivo se loguean y, después, un resumen
+periódico con los rechazos suprimidos. Opcionalmente las líneas se guardan en un archivo de rechazos
+con escritura en buffer, una por línea: `<número de línea>\\t<motivo>\\t<bytes originales>`.
+"""
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from core.config import REJECTS_BUFFER_BYTES, REJECTS_LOG_INTERVAL_SECONDS, REJECTS_LOG_SAMPLE
+
+logger = logging.getLogger(__name__)
+
+# Motivos de rechazo. Las dos primeras omiten la línea; con un monto no numérico el registro se importa con 0.0.
+BLANK_LINE = "blank_line"
+NON_NUMERIC_ID = "non_numeric_id"
+INVALID_NUMBER = "invalid_number"
+
+_DESCRIPTIONS = {
+    BLANK_LINE: "Línea vacía. Se omite línea.",
+    NON_NUMERIC_ID: "Código de entidad o CUIT/CUIL no numérico. Se omite línea.",
+    INVALID_NUMBER: "Situación o monto no numérico. Se usará 0.0.",
+}
+
+
+def line_reject_reason(line: bytes) -> str:
+    """
+    Motivo por el que se omite una línea cuyo código de entidad o CUIT/CUIL no es numérico.
+    """
+    if not line.strip():
+        return BLANK_LINE
+    return NON_NUMERIC_ID
+
+
+class RejectSink:
+    """
+    Cuenta los rechazos por motivo, loguea una muestra limitada y opcionalmente los escribe en un archivo.
+    No es seguro entre procesos: cada proceso del pool usa su propio RejectSink y el padre combina los resultados con merge.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            source: str = "",
+            log_sample: int = REJECTS_LOG_SAMPLE,
+            log_interval: float = REJECTS_LOG_INTERVAL_SECONDS,
+            buffer_bytes: int = REJECTS_BUFFER_BYTES,
+    ):
+        """
+        :param path: Archivo de rechazos; None para solo contarlos.
+        :param source: Nombre del archivo importado, para los mensajes de log.
+        :param log_sample: Cantidad de rechazos de cada motivo que se loguean uno por uno.
+        :param log_interval: Segundos mínimos entre resúmenes de los rechazos no logueados.
+        :param buffer_bytes: Tamaño del buffer de escritura del archivo de rechazos.
+        """
+        self.path = path
+        self.source = source
+        self.log_sample = log_sample
+        self.log_interval = log_interval
+        self.buffer_bytes = buffer_bytes
+        self.counts: Dict[str, int] = {}
+        self.written = 0
+        self._file = None
+        self._suppressed = 0
+        self._last_summary = time.monotonic()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab", buffering=self.buffer_bytes)
+        return self._file
+
+    def reject(self, reason: str, line_number: int, line: bytes):
+        """
+        Registra una línea rechazada.
+        :param reason: Uno de los motivos del módulo (BLANK_LINE, NON_NUMERIC_ID, INVALID_NUMBER).
+        :param line_number: Número de línea (desde 1) dentro del archivo o flujo importado.
+        :param line: Bytes originales de la línea.
+        """
+        count = self.counts.get(reason, 0) + 1
+        self.counts[reason] = count
+        if self.path is not None:
+            (self._file or self._open()).write(b"%d\t%b\t%b\n" % (line_number, reason.encode(), line.rstrip(b"\r\n")))
+            self.written += 1
+        if count <= self.log_sample:
+            logger.warning(f"{self.source or 'Importación'}, línea {line_number}: {_DESCRIPTIONS.get(reason, reason)}")
+            return
+        self._suppressed += 1
+        now = time.monotonic()
+        if now - self._last_summary >= self.log_interval:
+            self._log_suppressed()
+            self._last_summary = now
+
+    def _log_suppressed(self):
+        if self._suppressed:
+            logger.warning(
+                f"{self.source or 'Importación'}: {self._suppressed} líneas rechazadas más sin loguear "
+                f"(total por motivo: {self.counts})."
+            )
+            self._suppressed = 0
+
+    def part_path(self, index: int) -> Optional[str]:
+        """
+        Archivo de rechazos temporal para el fragmento `index` procesado en otro proceso, o None si no se guardan.
+        """
+        return None if self.path is None else f"{self.path}.part{index}"
+
+    def merge(self, counts: Dict[str, int], part_path: Optional[str] = None, line_offset: int = 0):
+        """
+        Suma los contadores de un fragmento y, si se indica, agrega su archivo de rechazos desplazando
+        los números de línea en `line_offset`. El archivo del fragmento se borra.
+        """
+        for reason, count in counts.items():
+            self.counts[reason] = self.counts.get(reason, 0) + count
+        if part_path is None or not os.path.exists(part_path):
+            return
+        try:
+            if self.path is not None:
+                output = self._file or self._open()
+                with open(part_path, "rb") as part:
+                    for entry in part:
+                        line_number, rest = entry.split(b"\t", 1)
+                        output.write(b"%d\t%b" % (int(line_number) + line_offset, rest))
+                        self.written += 1
+        finally:
+            os.remove(part_path)
+
+    def log_summary(self):
+        """
+        Loguea el total de rechazos por motivo, si hubo alguno.
+        """
+        if not self.counts:
+            return
+        self._suppressed = 0
+        destination = f" Guardados en '{self.path}'." if self.written else ""
+        logger.warning(f"{self.source or 'Importación'}: líneas rechazadas por motivo: {self.counts}.{destination}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "RejectSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,46 +1,230 @@
 from abc import ABC, abstractmethod
-from typing import List
+from itertools import islice
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+import asyncio
+import hashlib
 import logging
+import struct
+import time
+import uuid
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pydantic import BaseModel
 
-from core.config import MONGO_CONNECTION_STRING, DB_NAME, DEBTORS_COLLECTION, ENTITIES_COLLECTION
+from core.config import (
+    MONGO_CONNECTION_STRING, DB_NAME, DEBTORS_COLLECTION, ENTITIES_COLLECTION, IMPORT_HISTORY_COLLECTION,
+    REPOSITORY_BACKEND, SQLITE_PATH, WRITE_BATCH_SIZE, WRITE_MAX_IN_FLIGHT, WRITE_RAW_BSON
+)
 from core.exceptions import RepositoryError
+from core.metrics import observe_write_batch
 from core.models import DebtorData, EntityData
 
+# motor y pymongo se importan al conectar o al escribir: importar este módulo (por ejemplo, para la CLI
+# o para AbstractRepository) no debe pagar su carga.
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+
 logger = logging.getLogger(__name__)
 
+# Mismos valores que pymongo.ASCENDING y pymongo.DESCENDING.
+ASCENDING = 1
+DESCENDING = -1
+
+
+FINGERPRINT_FIELD = "fingerprint"
+# Sufijo de las colecciones temporales de una carga con staging.
+STAGING_SUFFIX = "_staging_"
+# Campos que no forman parte de los modelos y se excluyen al leer.
+_READ_PROJECTION = {"_id": 0, FINGERPRINT_FIELD: 0}
+
+
+def _batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def to_document(record: BaseModel | dict) -> dict:
+    """
+    Devuelve el documento a escribir: los dicts del camino rápido se usan tal cual y los modelos se serializan.
+    """
+    return record if isinstance(record, dict) else record.model_dump()
+
+
+def compute_fingerprint(*values: float) -> int:
+    """
+    Huella compacta (entero de 64 bits) de los valores agregados de un documento.
+    """
+    packed = struct.pack(f"<{len(values)}d", *values)
+    return int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little", signed=True)
+
+
+def debtor_fingerprint(document: dict) -> int:
+    return compute_fingerprint(document["situation"], document["loans"], document["entity_code"])
+
+
+def entity_fingerprint(document: dict) -> int:
+    return compute_fingerprint(document["loans"])
+
+
+def empty_upsert_counts() -> Dict[str, int]:
+    return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+
 class AbstractRepository(ABC):
+    # Identificador de la carga en curso cuando el repositorio es el de una carga con staging.
+    load_id: Optional[str] = None
+
     @abstractmethod
-    async def save_debtors(self, debtors: List[DebtorData]) -> int:
+    async def save_debtors(self, debtors: Iterable[DebtorData | dict]) -> int:
         """
         Save debtor records to the database.
-        :param debtors: List of debtor records to save.
+        :param debtors: Debtor records to save.
         """
         pass
 
     @abstractmethod
-    async def save_entities(self, entities: List[EntityData]) -> int:
+    async def save_entities(self, entities: Iterable[EntityData | dict]) -> int:
         """
         Save entity records to the database.
-        :param entities: List of entity records to save.
+        :param entities: Entity records to save.
+        """
+        pass
+
+    @abstractmethod
+    async def upsert_debtors(self, debtors: Iterable[DebtorData | dict]) -> Dict[str, int]:
+        """
+        Insert or update debtors keyed by cuit_cuil, skipping those whose aggregates did not change.
+        :param debtors: Debtor records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        pass
+
+    @abstractmethod
+    async def upsert_entities(self, entities: Iterable[EntityData | dict]) -> Dict[str, int]:
+        """
+        Insert or update entities keyed by entity_code, skipping those whose aggregates did not change.
+        :param entities: Entity records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        pass
+
+    @abstractmethod
+    async def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        """
+        Get the most recently written debtor with the given CUIT/CUIL.
+        :param cuit_cuil: The debtor's CUIT/CUIL.
+        :return: The debtor, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    async def get_debtors(self, cuit_cuils: Iterable[int]) -> Dict[int, DebtorData]:
+        """
+        Get many debtors in a single query.
+        :param cuit_cuils: The CUIT/CUILs to look up.
+        :return: The debtors found, keyed by CUIT/CUIL; missing ones are omitted.
+        """
+        pass
+
+    @abstractmethod
+    async def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        """
+        Get the most recently written entity with the given code.
+        :param entity_code: The entity code.
+        :return: The entity, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    async def find_import(self, content_hash: str) -> Optional[dict]:
+        """
+        Get the most recent successful import of the content with the given hash from the import history.
+        :param content_hash: The SHA-256 hex digest of the imported input.
+        :return: The history entry, or None if that content was never imported successfully.
+        """
+        pass
+
+    @abstractmethod
+    async def record_import(self, entry: dict):
+        """
+        Append an entry (hash, status, counts and timings of an import) to the import history.
+        :param entry: The history entry.
+        """
+        pass
+
+    async def begin_load(self, load_id: Optional[str] = None) -> "AbstractRepository":
+        """
+        Start an all-or-nothing load that replaces the stored debtors and entities.
+        By default writes go directly to the stored data and commit/abort do nothing.
+        :param load_id: The `load_id` of an unfinished load to continue instead of starting a new one.
+        :return: The repository to write the load into; call commit_load or abort_load on it when done.
+            Its `load_id` attribute identifies the load, or is None when writes go directly to the stored data.
+        """
+        return self
+
+    async def commit_load(self):
+        """
+        Make the data written since begin_load visible, replacing the previous data.
+        """
+        pass
+
+    async def abort_load(self):
+        """
+        Discard the data written since begin_load.
         """
         pass
 
 
 class MongoRepository(AbstractRepository):
-    _client: AsyncIOMotorClient = None
-    _db: AsyncIOMotorDatabase = None
+    _client: "AsyncIOMotorClient" = None
+    _db: "AsyncIOMotorDatabase" = None
+
+    def __init__(
+            self,
+            batch_size: int = WRITE_BATCH_SIZE,
+            max_in_flight: int = WRITE_MAX_IN_FLIGHT,
+            raw_bson: bool = WRITE_RAW_BSON,
+            debtors_collection: str = DEBTORS_COLLECTION,
+            entities_collection: str = ENTITIES_COLLECTION
+    ):
+        """
+        :param batch_size: Documentos por cada insert_many.
+        :param max_in_flight: Máximo de lotes enviados en simultáneo por colección.
+        :param raw_bson: Codificar cada lote a RawBSONDocument antes de insertarlo.
+        :param debtors_collection: Colección de deudores.
+        :param entities_collection: Colección de entidades.
+        """
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.raw_bson = raw_bson
+        self.debtors_collection = debtors_collection
+        self.entities_collection = entities_collection
+        # En una carga con staging: colección temporal -> colección vigente que reemplaza.
+        self._staged: Dict[str, str] = {}
 
     async def connect(self):
         if not self._client:
             try:
+                from motor.motor_asyncio import AsyncIOMotorClient
                 self._client = AsyncIOMotorClient(MONGO_CONNECTION_STRING)
                 self._db = self._client.get_database(DB_NAME)
                 logger.info(f"Conectado a MongoDB: {DB_NAME} en {MONGO_CONNECTION_STRING.split('@')[-1]}")
             except Exception as e:
                 logger.error(f"No se pudo conectar a MongoDB: {e}")
                 raise RepositoryError(f"Error de conexión a MongoDB: {e}")
+            await self.ensure_indexes()
+
+    async def ensure_indexes(self):
+        """
+        Crea (si no existen) los índices de búsqueda por cuit_cuil y entity_code. Un fallo no impide usar
+        el repositorio: las lecturas siguen funcionando, aunque más lentas.
+        """
+        try:
+            await self._get_debtors_collection().create_index([("cuit_cuil", ASCENDING)])
+            await self._get_entities_collection().create_index([("entity_code", ASCENDING)])
+            await self._get_history_collection().create_index([("content_hash", ASCENDING)])
+        except Exception as e:
+            logger.warning(f"No se pudieron crear los índices de búsqueda: {e}")
 
 
     async def disconnect(self):
@@ -50,54 +234,392 @@ class MongoRepository(AbstractRepository):
             self._db = None
             logger.info("Desconectado de MongoDB.")
 
-    def _get_debtors_collection(self) -> AsyncIOMotorCollection:
+    def _get_debtors_collection(self) -> "AsyncIOMotorCollection":
         if self._db is None:
             raise RepositoryError("La base de datos no está inicializada. Llama a 'connect' primero.")
-        return self._db.get_collection(DEBTORS_COLLECTION)
+        return self._db.get_collection(self.debtors_collection)
 
 
-    def _get_entities_collection(self) -> AsyncIOMotorCollection:
+    def _get_entities_collection(self) -> "AsyncIOMotorCollection":
         if self._db is None:
             raise RepositoryError("La base de datos no está inicializada. Llama a 'connect' primero.")
-        return self._db.get_collection(ENTITIES_COLLECTION)
+        return self._db.get_collection(self.entities_collection)
+
+
+    def _get_history_collection(self) -> "AsyncIOMotorCollection":
+        if self._db is None:
+            raise RepositoryError("La base de datos no está inicializada. Llama a 'connect' primero.")
+        return self._db.get_collection(IMPORT_HISTORY_COLLECTION)
+
+
+    async def _insert_batch(self, collection: "AsyncIOMotorCollection", batch: List[BaseModel | dict]) -> int:
+        """
+        Serializa un lote justo antes de enviarlo y lo inserta sin orden.
+        """
+        from pymongo.errors import BulkWriteError
+
+        documents = [to_document(record) for record in batch]
+        if self.raw_bson:
+            import bson
+            from bson.raw_bson import RawBSONDocument
+            documents = [RawBSONDocument(bson.encode(document)) for document in documents]
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            raise RepositoryError(
+                f"Se insertaron {inserted} de {len(documents)} documentos en '{collection.name}': "
+                f"{len(e.details.get('writeErrors', []))} errores de escritura."
+            )
+        # No se usa result.inserted_ids: pymongo no incluye los RawBSONDocument sin _id, aunque se inserten.
+        return len(documents)
 
 
-    async def save_debtors(self, debtors: List[DebtorData]) -> int:
+    async def _upsert_batch(
+            self, collection: "AsyncIOMotorCollection", key: str, fingerprint: Callable[[dict], int],
+            batch: List[BaseModel | dict]
+    ) -> Dict[str, int]:
+        """
+        Compara la huella de cada documento con la almacenada y envía solo los nuevos o modificados.
+        """
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        # Documentos nuevos: los dicts del camino rápido son de quien llama (cache de agregados, snapshots).
+        documents = [
+            {**document, FINGERPRINT_FIELD: fingerprint(document)} for document in map(to_document, batch)
+        ]
+        stored = {
+            document[key]: document.get(FINGERPRINT_FIELD)
+            async for document in collection.find(
+                {key: {"$in": [d[key] for d in documents]}}, {key: 1, FINGERPRINT_FIELD: 1, "_id": 0}
+            )
+        }
+        operations = [
+            UpdateOne({key: document[key]}, {"$set": document}, upsert=True)
+            for document in documents
+            if stored.get(document[key]) != document[FINGERPRINT_FIELD]
+        ]
+        counts = empty_upsert_counts()
+        counts["unchanged"] = len(documents) - len(operations)
+        if operations:
+            try:
+                result = await collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                raise RepositoryError(
+                    f"Falló el upsert en '{collection.name}': "
+                    f"{len(e.details.get('writeErrors', []))} errores de escritura."
+                )
+            counts["inserted"] = result.upserted_count
+            counts["updated"] = result.modified_count
+        return counts
+
+
+    async def _run_in_batches(
+            self, collection_name: str, records: Iterable[BaseModel | dict], send_batch: Callable[[list], Awaitable]
+    ) -> list:
+        """
+        Envía los registros en lotes de `batch_size`, con a lo sumo `max_in_flight` lotes en vuelo,
+        y registra la latencia de cada lote.
+        :return: Resultados de cada lote.
+        """
+        async def timed_send(batch: list):
+            started = time.perf_counter()
+            result = await send_batch(batch)
+            observe_write_batch(collection_name, time.perf_counter() - started)
+            return result
+
+        results = []
+        in_flight = set()
+        batches = _batched(records, self.batch_size)
+        # Un generador (por ejemplo, los deudores de la agregación con volcado a disco) lee y combina particiones
+        # al pedirle cada lote: se consume en un hilo para no bloquear el event loop.
+        lazy = not isinstance(records, (list, tuple))
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None) if lazy else next(batches, None)
+                if batch is None:
+                    break
+                if len(in_flight) >= self.max_in_flight:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    results.extend(task.result() for task in done)
+                in_flight.add(asyncio.create_task(timed_send(batch)))
+            if in_flight:
+                results.extend(await asyncio.gather(*in_flight))
+                in_flight = set()
+        finally:
+            for task in in_flight:
+                task.cancel()
+        return results
+
+
+    async def _insert_in_batches(self, collection: "AsyncIOMotorCollection", records: Iterable[BaseModel | dict]) -> int:
+        """
+        Inserta los registros en lotes.
+        :return: Cantidad total de documentos insertados.
+        """
+        return sum(await self._run_in_batches(
+            self._staged.get(collection.name, collection.name), records, lambda batch: self._insert_batch(collection, batch)
+        ))
+
+
+    async def _upsert_in_batches(
+            self, collection: "AsyncIOMotorCollection", key: str, fingerprint: Callable[[dict], int],
+            records: Iterable[BaseModel | dict]
+    ) -> Dict[str, int]:
+        """
+        Hace upsert de los registros en lotes; el índice sobre la clave lo crea connect (ensure_indexes).
+        :return: Conteos acumulados de insertados, actualizados y sin cambios.
+        """
+        totals = empty_upsert_counts()
+        batch_counts = await self._run_in_batches(
+            self._staged.get(collection.name, collection.name), records, lambda batch: self._upsert_batch(collection, key, fingerprint, batch)
+        )
+        for counts in batch_counts:
+            for name, value in counts.items():
+                totals[name] += value
+        return totals
+
+
+    async def save_debtors(self, debtors: Iterable[DebtorData | dict]) -> int:
         """
         Save debtor records to the database.
-        :param debtors: List of debtor records to save.
+        :param debtors: Debtor records to save.
         :return: Number of records saved.
         """
         if not debtors:
             logger.info("No hay registros de deudores para guardar.")
             return 0
         try:
-            debtors_dicts = [d.model_dump() for d in debtors]
-            collection = self._get_debtors_collection()
-            result = await collection.insert_many(debtors_dicts)
-            count = len(result.inserted_ids)
+            count = await self._insert_in_batches(self._get_debtors_collection(), debtors)
             logger.info(f"Se insertaron {count} registros de deudores.")
             return count
         except Exception as e:
             logger.error(f"Error al insertar registros de deudores: {e}")
             raise RepositoryError(f"Error al insertar deudores: {e}")
 
-    async def save_entities(self, entities: List[EntityData]) -> int:
+    async def save_entities(self, entities: Iterable[EntityData | dict]) -> int:
         """
         Save entity records to the database.
-        :param entities: List of entity records to save.
+        :param entities: Entity records to save.
         :return: Number of records saved.
         """
         if not entities:
             logger.info("No hay registros de entidades para guardar.")
             return 0
         try:
-            collection = self._get_entities_collection()
-            entities_dicts = [e.model_dump() for e in entities]
-            result = await collection.insert_many(entities_dicts)
-            count = len(result.inserted_ids)
+            count = await self._insert_in_batches(self._get_entities_collection(), entities)
             logger.info(f"Se insertaron {count} registros de entidades.")
             return count
         except Exception as e:
             logger.error(f"Error al insertar registros de entidades: {e}")
             raise RepositoryError(f"Error al insertar entidades: {e}")
+
+    async def upsert_debtors(self, debtors: Iterable[DebtorData | dict]) -> Dict[str, int]:
+        """
+        Insert or update debtor records keyed by cuit_cuil.
+        :param debtors: Debtor records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        if not debtors:
+            logger.info("No hay registros de deudores para guardar.")
+            return empty_upsert_counts()
+        try:
+            counts = await self._upsert_in_batches(
+                self._get_debtors_collection(), "cuit_cuil", debtor_fingerprint, debtors
+            )
+            logger.info(
+                f"Deudores: {counts['inserted']} insertados, {counts['updated']} actualizados, "
+                f"{counts['unchanged']} sin cambios.")
+            return counts
+        except Exception as e:
+            logger.error(f"Error al actualizar registros de deudores: {e}")
+            raise RepositoryError(f"Error al actualizar deudores: {e}")
+
+    async def upsert_entities(self, entities: Iterable[EntityData | dict]) -> Dict[str, int]:
+        """
+        Insert or update entity records keyed by entity_code.
+        :param entities: Entity records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        if not entities:
+            logger.info("No hay registros de entidades para guardar.")
+            return empty_upsert_counts()
+        try:
+            counts = await self._upsert_in_batches(
+                self._get_entities_collection(), "entity_code", entity_fingerprint, entities
+            )
+            logger.info(
+                f"Entidades: {counts['inserted']} insertadas, {counts['updated']} actualizadas, "
+                f"{counts['unchanged']} sin cambios.")
+            return counts
+        except Exception as e:
+            logger.error(f"Error al actualizar registros de entidades: {e}")
+            raise RepositoryError(f"Error al actualizar entidades: {e}")
+
+    async def _find_latest(self, collection: "AsyncIOMotorCollection", key: str, value: int) -> Optional[dict]:
+        # En modo "insert" puede haber varios documentos por clave: se toma el último escrito.
+        return await collection.find_one({key: value}, _READ_PROJECTION, sort=[("_id", DESCENDING)])
+
+    async def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        """
+        Get the most recently written debtor with the given CUIT/CUIL.
+        :param cuit_cuil: The debtor's CUIT/CUIL.
+        :return: The debtor, or None if it does not exist.
+        """
+        try:
+            document = await self._find_latest(self._get_debtors_collection(), "cuit_cuil", cuit_cuil)
+        except Exception as e:
+            logger.error(f"Error al buscar el deudor {cuit_cuil}: {e}")
+            raise RepositoryError(f"Error al buscar el deudor: {e}")
+        return DebtorData(**document) if document else None
+
+    async def get_debtors(self, cuit_cuils: Iterable[int]) -> Dict[int, DebtorData]:
+        """
+        Get many debtors in a single query.
+        :param cuit_cuils: The CUIT/CUILs to look up.
+        :return: The debtors found, keyed by CUIT/CUIL; missing ones are omitted.
+        """
+        keys = list(set(cuit_cuils))
+        if not keys:
+            return {}
+        debtors: Dict[int, DebtorData] = {}
+        try:
+            cursor = self._get_debtors_collection().find(
+                {"cuit_cuil": {"$in": keys}}, _READ_PROJECTION, sort=[("_id", ASCENDING)]
+            )
+            async for document in cursor:
+                debtors[document["cuit_cuil"]] = DebtorData(**document)
+        except Exception as e:
+            logger.error(f"Error al buscar {len(keys)} deudores: {e}")
+            raise RepositoryError(f"Error al buscar deudores: {e}")
+        return debtors
+
+    async def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        """
+        Get the most recently written entity with the given code.
+        :param entity_code: The entity code.
+        :return: The entity, or None if it does not exist.
+        """
+        try:
+            document = await self._find_latest(self._get_entities_collection(), "entity_code", entity_code)
+        except Exception as e:
+            logger.error(f"Error al buscar la entidad {entity_code}: {e}")
+            raise RepositoryError(f"Error al buscar la entidad: {e}")
+        return EntityData(**document) if document else None
+
+    async def find_import(self, content_hash: str) -> Optional[dict]:
+        """
+        Get the most recent successful import of the content with the given hash from the import history.
+        :param content_hash: The SHA-256 hex digest of the imported input.
+        :return: The history entry, or None if that content was never imported successfully.
+        """
+        try:
+            return await self._get_history_collection().find_one(
+                {"content_hash": content_hash, "status": "completed_successfully"}, {"_id": 0},
+                sort=[("_id", DESCENDING)]
+            )
+        except Exception as e:
+            logger.error(f"Error al consultar el historial de importaciones: {e}")
+            raise RepositoryError(f"Error al consultar el historial de importaciones: {e}")
+
+    async def record_import(self, entry: dict):
+        """
+        Append an entry (hash, status, counts and timings of an import) to the import history.
+        :param entry: The history entry.
+        """
+        try:
+            await self._get_history_collection().insert_one(dict(entry))
+        except Exception as e:
+            logger.error(f"Error al registrar la importación en el historial: {e}")
+            raise RepositoryError(f"Error al registrar la importación en el historial: {e}")
+
+    async def begin_load(self, load_id: Optional[str] = None) -> "MongoRepository":
+        """
+        Crea colecciones de staging vacías y sin índices secundarios para una carga completa.
+        Las lecturas siguen viendo las colecciones vigentes hasta commit_load.
+        :param load_id: Identificador de una carga sin terminar cuyas colecciones de staging se retoman.
+        :return: Un repositorio que escribe en las colecciones de staging (comparte la conexión).
+        """
+        if self._db is None:
+            raise RepositoryError("La base de datos no está inicializada. Llama a 'connect' primero.")
+        token = load_id or uuid.uuid4().hex[:12]
+        staging = MongoRepository(
+            self.batch_size, self.max_in_flight, self.raw_bson,
+            debtors_collection=f"{self.debtors_collection}{STAGING_SUFFIX}{token}",
+            entities_collection=f"{self.entities_collection}{STAGING_SUFFIX}{token}",
+        )
+        staging._client = self._client
+        staging._db = self._db
+        staging.load_id = token
+        staging._staged = {
+            staging.debtors_collection: self.debtors_collection,
+            staging.entities_collection: self.entities_collection,
+        }
+        if load_id:
+            existing = await self._db.list_collection_names(filter={"name": {"$in": list(staging._staged)}})
+            if len(existing) != len(staging._staged):
+                raise RepositoryError(f"No existen las colecciones de staging de la carga '{load_id}'.")
+            logger.info(f"Carga con staging retomada en {', '.join(staging._staged)}.")
+            return staging
+        try:
+            # Se crean explícitamente para que el renombrado no falle si alguna queda vacía.
+            for name in staging._staged:
+                await self._db.create_collection(name)
+        except Exception as e:
+            await staging.abort_load()
+            logger.error(f"No se pudieron crear las colecciones de staging: {e}")
+            raise RepositoryError(f"Error al iniciar la carga: {e}")
+        logger.info(f"Carga con staging iniciada en {', '.join(staging._staged)}.")
+        return staging
+
+    async def commit_load(self):
+        """
+        Crea los índices sobre las colecciones de staging y las renombra sobre las vigentes (dropTarget).
+        Cada renombrado es atómico; las dos colecciones se reemplazan una después de la otra.
+        """
+        if not self._staged:
+            return
+        try:
+            await self.ensure_indexes()
+            for staging_name, live_name in self._staged.items():
+                await self._db.get_collection(staging_name).rename(live_name, dropTarget=True)
+        except Exception as e:
+            logger.error(f"Error al reemplazar las colecciones vigentes: {e}")
+            await self.abort_load()
+            raise RepositoryError(f"Error al confirmar la carga: {e}")
+        logger.info(f"Carga confirmada en {', '.join(self._staged.values())}.")
+        self._staged = {}
+
+    async def abort_load(self):
+        """
+        Elimina las colecciones de staging que queden; las vigentes no se modifican.
+        """
+        for staging_name in self._staged:
+            try:
+                await self._db.drop_collection(staging_name)
+            except Exception as e:
+                logger.warning(f"No se pudo eliminar la colección de staging '{staging_name}': {e}")
+        self._staged = {}
+
+
+def create_repository(backend: str = REPOSITORY_BACKEND) -> AbstractRepository:
+    """
+    Crea (sin conectarlo) el repositorio del backend configurado.
+    :param backend: "mongo" o "sqlite" (ver REPOSITORY_BACKEND en core/config.py).
+    """
+    if backend == "mongo":
+        return MongoRepository()
+    if backend == "sqlite":
+        from core.sqlite_repository import SQLiteRepository
+        return SQLiteRepository()
+    raise RepositoryError(f"Backend de repositorio desconocido: {backend}")
+
+
+def describe_backend(backend: str = REPOSITORY_BACKEND) -> str:
+    """
+    Descripción del backend configurado para los mensajes de inicio, sin credenciales.
+    """
+    if backend == "sqlite":
+        return f"SQLite en {SQLITE_PATH}"
+    return f"MongoDB: {DB_NAME} en {(MONGO_CONNECTION_STRING or '').split('@')[-1]}"
@@ -1,49 +1,1002 @@
+import asyncio
+import hashlib
 import logging
+import os
+import time
+from concurrent.futures import Executor
+from contextlib import ExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
 
-from core.data_processor import DataProcessor
-from core.exceptions import DataImporterError
+from core.aggregate_cache import AggregateCache
+from core.cache import MISSING, TTLCache
+from core.compression import decompress_stream
+from core.checkpoint import CheckpointStore, file_identity
+from core.config import (
+    AGGREGATION_MEMORY_LIMIT_MB, CHECKPOINT_INTERVAL_BYTES, CHECKPOINT_META_INTERVAL_BATCHES,
+    CHECKPOINT_META_INTERVAL_SECONDS, DUPLICATE_IMPORTS, IMPORT_ENGINE, IMPORT_WORKERS, INPUT_SORTED_BY, LOAD_MODE,
+    PARSE_BATCH_SIZE, PARSE_CHUNK_BYTES, REJECTS_DIR, SPILL_DIR, SPILL_PARTITIONS, STREAM_BLOCK_BYTES, WRITE_BATCH_SIZE, WRITE_MAX_IN_FLIGHT, WRITE_MODE
+)
+from core.data_processor import DataProcessor, DebtorsPartial, EntitiesPartial
+from core.exceptions import DataImporterError, DataProcessingError, FileParsingError, RepositoryError
 from core.file_parser import FileParser
+from core.metrics import REGISTRY, ImportMetrics, track_import
+from core.models import DebtorData, EntityData, ImportProgress
+from core.parallel import aggregate_file_parallel, aggregate_stream_parallel
+from core.rejects import RejectSink
 from core.repository import AbstractRepository
+from core.snapshot import write_snapshot
+from core.spill import BYTES_PER_DEBTOR_ENTRY, SpillStore
 
 logger = logging.getLogger(__name__)
 
 
+async def _hashing_stream(chunks: AsyncIterable[bytes], digest) -> AsyncIterator[bytes]:
+    """
+    Reenvía los bloques sin cambios, acumulando su hash en `digest` (los bytes tal como llegan, antes de descomprimir).
+    """
+    async for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
 class DataImportService:
-    def __init__(self, parser: FileParser, processor: DataProcessor, repository: AbstractRepository):
+    def __init__(
+            self,
+            parser: FileParser,
+            processor: DataProcessor,
+            repository: AbstractRepository,
+            engine: str = IMPORT_ENGINE,
+            workers: int = IMPORT_WORKERS,
+            write_mode: str = WRITE_MODE,
+            memory_limit_mb: int = AGGREGATION_MEMORY_LIMIT_MB,
+            sorted_by: str = INPUT_SORTED_BY,
+            executor: Executor | None = None,
+            lookup_cache: TTLCache | None = None,
+            load_mode: str = LOAD_MODE,
+            checkpoint_store: CheckpointStore | None = None,
+            checkpoint_interval_bytes: int = CHECKPOINT_INTERVAL_BYTES,
+            duplicate_imports: str = DUPLICATE_IMPORTS,
+            aggregate_cache: AggregateCache | None = None,
+            rejects_dir: str | None = REJECTS_DIR
+    ):
+        """
+        :param executor: Pool de procesos compartido para el parseo y la agregación. Si se indica, ese trabajo
+            nunca corre en el event loop; `workers` define en cuántos fragmentos se reparte cada archivo.
+        :param lookup_cache: Cache de consultas que se vacía al terminar cada importación.
+        :param load_mode: "direct" o "staging" (ver LOAD_MODE en core/config.py).
+        :param checkpoint_store: Dónde guardar los checkpoints de las importaciones reanudables.
+        :param checkpoint_interval_bytes: Bytes de entrada agregados entre un checkpoint y el siguiente.
+        :param duplicate_imports: "allow", "replay" o "reject" (ver DUPLICATE_IMPORTS en core/config.py).
+        :param aggregate_cache: Cache de agregados por hash de contenido; solo se usa si `duplicate_imports`
+            no es "allow".
+        :param rejects_dir: Directorio donde cada importación guarda sus líneas rechazadas; None para solo contarlas.
+        """
         self.parser = parser
         self.processor = processor
         self.repository = repository
+        self.engine = engine
+        self.workers = workers
+        self.write_mode = write_mode
+        self.memory_limit_mb = memory_limit_mb
+        self.sorted_by = sorted_by
+        self.executor = executor
+        self.lookup_cache = lookup_cache
+        if load_mode not in ("direct", "staging"):
+            raise DataImporterError(f"Modo de carga desconocido: {load_mode}")
+        if load_mode == "staging" and write_mode != "insert":
+            logger.warning("LOAD_MODE='staging' reemplaza las colecciones completas y no admite upsert; se escribe directo.")
+            load_mode = "direct"
+        self.load_mode = load_mode
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint_interval_bytes = checkpoint_interval_bytes
+        if duplicate_imports not in ("allow", "replay", "reject"):
+            raise DataImporterError(f"Política de importaciones repetidas desconocida: {duplicate_imports}")
+        self.duplicate_imports = duplicate_imports
+        self.aggregate_cache = aggregate_cache
+        self.rejects_dir = rejects_dir
+
+
+    async def _aggregate_file(
+            self, file_path: str, workers: int, resources: ExitStack, progress: ImportProgress, metrics: ImportMetrics,
+            rejects: RejectSink
+    ):
+        """
+        Parsea y agrega el archivo con el motor configurado. Con más de un worker el archivo
+        se divide en fragmentos que se procesan en paralelo con el parser mmap; con un límite
+        de memoria se usa el parser mmap con volcado a disco.
+        :param resources: Recursos que deben vivir hasta terminar de guardar (archivos de volcado).
+        :param progress: Contadores de bytes y registros procesados.
+        :param metrics: Métricas de la importación; el parseo y la agregación se miden como etapas separadas.
+        :param rejects: Destino de las líneas rechazadas.
+        """
+        if workers > 1 or self.executor is not None:
+            # En el pool cada proceso parsea y agrega su fragmento, por lo que ambas etapas se miden juntas.
+            with metrics.stage("parse_aggregate"):
+                partials = await aggregate_file_parallel(
+                    self.parser, self.processor, file_path, workers, PARSE_BATCH_SIZE, self.executor, progress, rejects
+                )
+            progress.bytes_processed = progress.total_bytes or 0
+            with metrics.stage("aggregate"):
+                return await asyncio.to_thread(self.processor.build_results, *partials)
+        if self.memory_limit_mb > 0:
+            spill_store = resources.enter_context(SpillStore(SPILL_PARTITIONS, SPILL_DIR))
+            max_debtor_entries = self.memory_limit_mb * 1024 * 1024 // BYTES_PER_DEBTOR_ENTRY
+            record_batches = self._timed_record_batches(file_path, progress, metrics, rejects)
+            with metrics.stage("aggregate", excluding="parse"):
+                return await asyncio.to_thread(
+                    self.processor.aggregate_record_batches_bounded, record_batches, spill_store, max_debtor_entries
+                )
+        if self.engine == "numpy":
+            chunks = metrics.timed(
+                self.parser.iter_columnar_chunks(file_path, PARSE_CHUNK_BYTES, progress, rejects), "parse"
+            )
+            with metrics.stage("aggregate", excluding="parse"):
+                return await asyncio.to_thread(self.processor.aggregate_columnar_chunks, chunks)
+        if self.engine not in ("mmap", "stream"):
+            raise DataImporterError(f"Motor de importación desconocido: {self.engine}")
+        # El motor "stream" lee texto con aiofiles; los archivos comprimidos se descomprimen con el parser por bytes.
+        if self.engine == "mmap" or self.parser.detect_compression(file_path) is not None:
+            record_batches = self._timed_record_batches(file_path, progress, metrics, rejects)
+            with metrics.stage("aggregate", excluding="parse"):
+                return await asyncio.to_thread(self.processor.aggregate_record_batches, record_batches)
+        raw_records_stream = metrics.timed_async(self.parser.stream_raw_records(file_path, progress, rejects), "parse")
+        with metrics.stage("aggregate", excluding="parse"):
+            return await self.processor.aggregate_data(raw_records_stream)
+
+
+    def _timed_record_batches(
+            self, file_path: str, progress: ImportProgress, metrics: ImportMetrics, rejects: RejectSink
+    ):
+        return metrics.timed(
+            self.parser.iter_record_batches(file_path, PARSE_BATCH_SIZE, progress=progress, rejects=rejects), "parse"
+        )
+
+
+    async def _write(self, repository: AbstractRepository, kind: str, records, summary: dict):
+        """
+        Escribe deudores o entidades según el modo de escritura y acumula los conteos en el resumen.
+        :param kind: "debtors" o "entities".
+        """
+        if self.write_mode == "upsert":
+            upsert = repository.upsert_debtors if kind == "debtors" else repository.upsert_entities
+            counts = await upsert(records)
+            summary[f"{kind}_saved"] += counts["inserted"] + counts["updated"]
+            for name, value in counts.items():
+                summary[f"{kind}_{name}"] = summary.get(f"{kind}_{name}", 0) + value
+            return
+        if self.write_mode != "insert":
+            raise DataImporterError(f"Modo de escritura desconocido: {self.write_mode}")
+        save = repository.save_debtors if kind == "debtors" else repository.save_entities
+        # Se espera antes de leer el contador: varios lotes de la misma colección pueden escribirse a la vez.
+        saved = await save(records)
+        summary[f"{kind}_saved"] += saved
+
+
+    async def _save(
+            self, repository: AbstractRepository, debtors_data, entities_data, summary: dict, metrics: ImportMetrics
+    ):
+        """
+        Escribe deudores y entidades en paralelo y completa el resumen.
+        """
+        with metrics.stage("write"):
+            await asyncio.gather(
+                self._write(repository, "debtors", debtors_data, summary),
+                self._write(repository, "entities", entities_data, summary),
+            )
+
+
+    @asynccontextmanager
+    async def _load(
+            self, summary: dict, metrics: ImportMetrics, load_id: str | None = None, keep_on_error: bool = False
+    ):
+        """
+        Entrega el repositorio donde escribir la importación. En modo "staging" los datos se escriben aparte y
+        reemplazan a los vigentes solo si la importación termina sin errores y escribió algo.
+        :param load_id: Carga con staging sin terminar a retomar.
+        :param keep_on_error: Conservar la carga si hay un error, para poder reanudarla.
+        """
+        if self.load_mode != "staging":
+            yield self.repository
+            return
+        target = await self.repository.begin_load(load_id)
+        try:
+            yield target
+        except BaseException:
+            if not keep_on_error:
+                await target.abort_load()
+            raise
+        if summary["debtors_saved"] == 0 and summary["entities_saved"] == 0:
+            await target.abort_load()
+            return
+        with metrics.stage("commit"):
+            await target.commit_load()
+
+
+    async def _discard_load(self, load_id: str):
+        """
+        Elimina la carga con staging que dejó sin terminar una importación anterior que no se va a reanudar.
+        """
+        try:
+            previous = await self.repository.begin_load(load_id)
+        except RepositoryError as e:
+            logger.warning(f"No se pudo retomar la carga anterior '{load_id}' para eliminarla: {e}")
+            return
+        await previous.abort_load()
+        logger.info(f"Eliminada la carga sin terminar '{load_id}' de una importación anterior.")
+
+
+    def _reject_sink(self, source: str) -> RejectSink:
+        """
+        Crea el destino de las líneas rechazadas de una importación, con su propio archivo si hay `rejects_dir`.
+        """
+        path = None
+        if self.rejects_dir is not None:
+            name = os.path.basename(source) or "import"
+            path = os.path.join(self.rejects_dir, f"{name}.{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.rejects")
+        return RejectSink(path, source=source)
+
+
+    def _report_rejects(self, summary: dict, rejects: RejectSink):
+        """
+        Cierra el archivo de rechazos, loguea el total por motivo y lo agrega al resumen.
+        """
+        rejects.close()
+        rejects.log_summary()
+        summary["records_rejected"] = dict(rejects.counts)
+        if rejects.written:
+            summary["rejects_path"] = rejects.path
+
+
+    def _record_metrics(self, summary: dict, metrics: ImportMetrics, progress: ImportProgress):
+        """
+        Agrega las métricas de la importación al resumen, las acumula en el registro del proceso
+        e invalida el cache de consultas.
+        """
+        summary["metrics"] = metrics.to_dict(progress)
+        REGISTRY.record_import(summary, summary["metrics"])
+        if self.lookup_cache is not None:
+            # Aun si falló, la importación pudo haber escrito parte de los datos.
+            self.lookup_cache.clear()
+
+
+    async def _hash_file(self, file_path: str, metrics: ImportMetrics) -> str:
+        """
+        Calcula el SHA-256 del contenido del archivo tal como está en disco (comprimido o no), leyéndolo en bloques.
+        """
+        def digest() -> str:
+            with open(file_path, "rb") as f:
+                return hashlib.file_digest(f, "sha256").hexdigest()
+
+        with metrics.stage("hash"):
+            try:
+                return await asyncio.to_thread(digest)
+            except FileNotFoundError:
+                logger.error(f"Archivo no encontrado: {file_path}")
+                raise FileParsingError(f"Archivo no encontrado: {file_path}")
+
+
+    async def _is_duplicate(self, content_hash: str, summary: dict) -> bool:
+        """
+        Con la política "reject", indica si el contenido ya se importó con éxito y lo anota en el resumen.
+        """
+        if self.duplicate_imports != "reject":
+            return False
+        previous = await self.repository.find_import(content_hash)
+        if previous is None:
+            return False
+        logger.info(f"El contenido {content_hash} ya se importó desde '{previous.get('file_path')}'; se omite.")
+        summary["status"] = "duplicate"
+        summary["duplicate_of"] = {
+            key: previous.get(key) for key in ("file_path", "finished_at", "debtors_saved", "entities_saved")
+        }
+        return True
+
+
+    async def _load_cached(
+            self, content_hash: str | None, progress: ImportProgress, summary: dict, metrics: ImportMetrics,
+            rejects: RejectSink
+    ):
+        """
+        Busca los agregados del contenido en el cache y, si están, construye los documentos a partir de ellos.
+        :return: (deudores, entidades) o None si no hay cache para ese contenido.
+        """
+        if content_hash is None or self.aggregate_cache is None:
+            return None
+        cached = await asyncio.to_thread(self.aggregate_cache.load, content_hash)
+        if cached is None:
+            return None
+        header, debtors_partial, entities_partial = cached
+        progress.bytes_processed = progress.total_bytes or 0
+        progress.records_processed = header.get("records_processed", 0)
+        progress.records_skipped = header.get("records_skipped", 0)
+        rejects.counts.update(header.get("records_rejected", {}))
+        summary["from_cache"] = True
+        with metrics.stage("aggregate"):
+            return await asyncio.to_thread(self.processor.build_results, debtors_partial, entities_partial)
+
+
+    async def _cache_results(
+            self, content_hash: str | None, debtors_data, entities_data, progress: ImportProgress, metrics: ImportMetrics,
+            rejects: RejectSink
+    ):
+        """
+        Guarda los agregados en el cache para que una importación repetida del mismo contenido solo repita
+        la escritura. Los deudores de la agregación con volcado a disco (un generador) no se guardan.
+        """
+        if content_hash is None or self.aggregate_cache is None or not isinstance(debtors_data, list):
+            return
+        header = {
+            "records_processed": progress.records_processed,
+            "records_skipped": progress.records_skipped,
+            "records_rejected": dict(rejects.counts),
+        }
+
+        def store():
+            self.aggregate_cache.store(
+                content_hash, header, *self.processor.results_to_partials(debtors_data, entities_data)
+            )
+
+        with metrics.stage("cache"):
+            await asyncio.to_thread(store)
+
+
+    async def _record_history(self, summary: dict, content_hash: str | None):
+        """
+        Agrega la importación al historial. Un fallo se registra pero no cambia el resultado de la importación.
+        """
+        if content_hash is None:
+            return
+        metrics = summary.get("metrics", {})
+        entry = {
+            "content_hash": content_hash,
+            "file_path": summary["file_path"],
+            "status": summary["status"],
+            "debtors_saved": summary["debtors_saved"],
+            "entities_saved": summary["entities_saved"],
+            "records_read": metrics.get("records_read"),
+            "records_skipped": metrics.get("records_skipped"),
+            "wall_seconds": metrics.get("wall_seconds"),
+            "from_cache": summary.get("from_cache", False),
+            "write_mode": self.write_mode,
+            "finished_at": datetime.now(timezone.utc),
+        }
+        try:
+            await self.repository.record_import(entry)
+        except DataImporterError as e:
+            logger.warning(f"No se pudo registrar la importación en el historial: {e}")
+
+
+    async def _resolve_sorted_by(self, file_path: str) -> str | None:
+        """
+        Orden con el que agregar el archivo en streaming. Un orden configurado explícitamente también se verifica
+        con una pasada previa sobre las columnas clave: si la entrada no lo cumple la importación falla antes de
+        escribir, en lugar de dejar escritas las claves ya emitidas.
+        """
+        if self.sorted_by == "auto":
+            sorted_by = await asyncio.to_thread(self.parser.detect_sort_order, file_path)
+            logger.info(f"Orden detectado en {file_path}: {sorted_by or 'sin orden'}.")
+            return sorted_by
+        if self.sorted_by in ("cuit", "entity"):
+            if await asyncio.to_thread(self.parser.detect_sort_order, file_path, (self.sorted_by,)) is None:
+                order = "ordenada por CUIT/CUIL" if self.sorted_by == "cuit" else "agrupada por código de entidad"
+                raise DataProcessingError(
+                    f"La entrada {file_path} no está {order} (INPUT_SORTED_BY={self.sorted_by}); no se escribió nada."
+                )
+        return self.sorted_by or None
+
+
+    async def _import_sorted(
+            self, repository: AbstractRepository, file_path: str, sorted_by: str, summary: dict,
+            progress: ImportProgress, metrics: ImportMetrics, rejects: RejectSink
+    ) -> bool:
+        """
+        Importa un archivo ordenado: los agregados de cada clave se escriben apenas cambia la clave,
+        mientras se sigue parseando el resto del archivo.
+        :return: True si se generaron datos.
+        """
+        record_batches = self._timed_record_batches(file_path, progress, metrics, rejects)
+        aggregates = self.processor.iter_sorted_aggregates(record_batches, sorted_by)
+        pending_write = None
+        has_data = False
+        try:
+            while True:
+                with metrics.stage("aggregate", excluding="parse"):
+                    finished = await asyncio.to_thread(next, aggregates, None)
+                if finished is None:
+                    break
+                debtors_data, entities_data = finished
+                if not debtors_data and not entities_data:
+                    continue
+                has_data = True
+                if pending_write:
+                    await pending_write
+                pending_write = asyncio.create_task(
+                    self._save(repository, debtors_data, entities_data, summary, metrics)
+                )
+            if pending_write:
+                await pending_write
+                pending_write = None
+        finally:
+            if pending_write:
+                pending_write.cancel()
+            aggregates.close()
+        return has_data
+
+
+    def _checkpointed_batches(
+            self, record_batches: Iterable[list], key: str, state: dict, debtors_partial: DebtorsPartial,
+            entities_partial: EntitiesPartial, progress: ImportProgress, metrics: ImportMetrics
+    ):
+        """
+        Deja pasar los lotes y, cada `checkpoint_interval_bytes` de entrada, guarda el offset y los agregados.
+        Corre en el mismo hilo que la agregación: cuando se pide el lote siguiente, el anterior ya está agregado
+        y el offset informado por el parser es el inicio de la línea siguiente.
+        """
+        last_offset = progress.bytes_processed
+        for batch in record_batches:
+            yield batch
+            if progress.bytes_processed - last_offset < self.checkpoint_interval_bytes:
+                continue
+            last_offset = progress.bytes_processed
+            state.update(
+                offset=last_offset,
+                records_processed=progress.records_processed,
+                records_skipped=progress.records_skipped,
+            )
+            with metrics.stage("checkpoint"):
+                self.checkpoint_store.save_state(key, state, debtors_partial, entities_partial)
 
 
-    async def import_data_from_file(self, file_path: str) -> dict:
+    async def _save_checkpointed(
+            self, repository: AbstractRepository, debtors_data: list, entities_data: list, summary: dict,
+            metrics: ImportMetrics, key: str, meta: dict
+    ):
+        """
+        Escribe deudores y entidades en lotes de WRITE_BATCH_SIZE registros, con a lo sumo WRITE_MAX_IN_FLIGHT
+        lotes en vuelo por colección, y anota en los metadatos del checkpoint cada lote confirmado
+        (`written_batches`: offset de inicio de cada lote) y el total escrito. Al reanudar se saltean los lotes
+        confirmados, de modo que un lote solo se reescribe si no terminó de escribirse.
+        Los metadatos se guardan en un hilo cada CHECKPOINT_META_INTERVAL_BATCHES lotes o
+        CHECKPOINT_META_INTERVAL_SECONDS segundos, y al terminar (también si falla): lo escrito desde el último
+        guardado se vuelve a escribir al reanudar.
+        Si un lote falla no se empiezan más, pero se espera a los que están en vuelo para anotarlos antes de fallar.
+        """
+        done_batches: Dict[str, set] = {}
+        for kind, records in (("debtors", debtors_data), ("entities", entities_data)):
+            if kind in meta.setdefault("written_batches", {}):
+                done_batches[kind] = set(meta["written_batches"][kind])
+            else:
+                # Checkpoints anteriores solo guardaban el prefijo escrito.
+                done_batches[kind] = set(range(0, min(meta["written"][kind], len(records)), WRITE_BATCH_SIZE))
+        failed = False
+        unsaved = 0
+        last_saved = time.monotonic()
+        save_lock = asyncio.Lock()
+
+        async def save_meta(force: bool = False):
+            nonlocal unsaved, last_saved
+            if not force and (
+                    unsaved < CHECKPOINT_META_INTERVAL_BATCHES
+                    and time.monotonic() - last_saved < CHECKPOINT_META_INTERVAL_SECONDS
+            ):
+                return
+            async with save_lock:
+                if unsaved == 0 and not force:
+                    # Otro lote ya lo guardó mientras se esperaba.
+                    return
+                unsaved = 0
+                last_saved = time.monotonic()
+                # Copia tomada en el loop: los lotes en vuelo siguen actualizando `meta` mientras se guarda.
+                meta["written_batches"] = {kind: sorted(done) for kind, done in done_batches.items()}
+                snapshot = {**meta, "written": dict(meta["written"])}
+                with metrics.stage("checkpoint"):
+                    await asyncio.to_thread(self.checkpoint_store.save_meta, key, snapshot)
+
+        async def write(kind: str, records: list):
+            done = done_batches[kind]
+            semaphore = asyncio.Semaphore(WRITE_MAX_IN_FLIGHT)
+
+            async def write_batch(start: int):
+                nonlocal failed, unsaved
+                async with semaphore:
+                    if failed:
+                        return
+                    batch = records[start:start + WRITE_BATCH_SIZE]
+                    try:
+                        await self._write(repository, kind, batch, summary)
+                    except BaseException:
+                        failed = True
+                        raise
+                    done.add(start)
+                    meta["written"][kind] += len(batch)
+                    unsaved += 1
+                    await save_meta()
+
+            return await asyncio.gather(*(
+                write_batch(start) for start in range(0, len(records), WRITE_BATCH_SIZE) if start not in done
+            ), return_exceptions=True)
+
+        with metrics.stage("write"):
+            results = await asyncio.gather(write("debtors", debtors_data), write("entities", entities_data))
+        await save_meta(force=True)
+        for result in (*results[0], *results[1]):
+            if isinstance(result, BaseException):
+                raise result
+
+
+    async def _import_checkpointed(
+            self, file_path: str, key: str, resume: bool, summary: dict, progress: ImportProgress,
+            metrics: ImportMetrics, rejects: RejectSink
+    ) -> bool:
+        """
+        Importa con checkpoints: agrega con el parser por bytes en un solo hilo guardando periódicamente el offset
+        y los agregados parciales, y escribe registrando los lotes ya escritos. Con `resume` continúa desde el
+        último checkpoint de `key` si corresponde al mismo archivo sin modificar.
+        Los archivos comprimidos no se pueden retomar a mitad del parseo, solo durante la escritura.
+        Al reanudar, los rechazos cuentan solo lo parseado desde el checkpoint, con números de línea relativos a él.
+        :return: True si se generaron datos.
+        """
+        if not os.path.exists(file_path):
+            raise FileParsingError(f"Archivo no encontrado: {file_path}")
+        store = self.checkpoint_store
+        identity = await asyncio.to_thread(file_identity, file_path)
+        meta = store.load_meta(key) or {}
+        saved = await asyncio.to_thread(store.load_state, key) if resume else None
+        if saved is not None and meta.get("file") != identity:
+            logger.warning(f"El checkpoint '{key}' corresponde a otra versión de {file_path}; se empieza de cero.")
+            saved = None
+        if saved is None:
+            if meta.get("load_id"):
+                await self._discard_load(meta["load_id"])
+            state = {"offset": 0, "records_processed": 0, "records_skipped": 0}
+            debtors_partial, entities_partial = {}, {}
+            meta.update(written={"debtors": 0, "entities": 0}, written_batches={}, load_id=None)
+        else:
+            state, debtors_partial, entities_partial = saved
+            meta.setdefault("written", {"debtors": 0, "entities": 0})
+            summary["resumed_from"] = {"offset": state["offset"], **{
+                f"{kind}_written": count for kind, count in meta["written"].items()
+            }}
+            logger.info(f"Reanudando {file_path} desde el offset {state['offset']} ({meta['written']} ya escritos).")
+        meta["file"] = identity
+        store.save_meta(key, meta)
+        progress.bytes_processed = state["offset"]
+        progress.records_processed = state["records_processed"]
+        progress.records_skipped = state["records_skipped"]
+
+        if state["offset"] < identity["size"]:
+            compressed = self.parser.detect_compression(file_path) is not None
+            record_batches = metrics.timed(self.parser.iter_record_batches(
+                file_path, PARSE_BATCH_SIZE, start=state["offset"], progress=progress, rejects=rejects
+            ), "parse")
+            if not compressed and self.checkpoint_interval_bytes > 0:
+                record_batches = self._checkpointed_batches(
+                    record_batches, key, state, debtors_partial, entities_partial, progress, metrics
+                )
+            with metrics.stage("aggregate", excluding=("parse", "checkpoint")):
+                await asyncio.to_thread(
+                    self.processor.accumulate_record_batches, record_batches, debtors_partial, entities_partial
+                )
+            # Agregación completa: si falla la escritura, se retoma sin volver a parsear.
+            state.update(
+                offset=identity["size"],
+                records_processed=progress.records_processed,
+                records_skipped=progress.records_skipped,
+            )
+            with metrics.stage("checkpoint"):
+                await asyncio.to_thread(store.save_state, key, state, debtors_partial, entities_partial)
+        progress.bytes_processed = identity["size"]
+
+        with metrics.stage("aggregate"):
+            debtors_data, entities_data = await asyncio.to_thread(
+                self.processor.build_results, debtors_partial, entities_partial
+            )
+        del debtors_partial, entities_partial
+        if not debtors_data and not entities_data:
+            return False
+        async with self._load(summary, metrics, load_id=meta.get("load_id"), keep_on_error=True) as repository:
+            if meta.get("load_id") != repository.load_id:
+                meta["load_id"] = repository.load_id
+                store.save_meta(key, meta)
+            await self._save_checkpointed(repository, debtors_data, entities_data, summary, metrics, key, meta)
+        return True
+
+
+    async def import_data_from_file(
+            self, file_path: str, workers: int | None = None, progress: ImportProgress | None = None,
+            checkpoint_key: str | None = None, resume: bool = False
+    ) -> dict:
         """
         Importa datos desde un archivo y los guarda en la base de datos.
+        :param workers: Procesos para parseo/agregación; None usa el valor configurado.
+        :param progress: Contadores opcionales de bytes y registros procesados (por ejemplo, de un job).
+        :param checkpoint_key: Si se indica (y hay un checkpoint_store), la importación guarda checkpoints con esa
+            clave y los elimina al terminar bien. Agrega en un solo hilo con el parser por bytes, sin usar
+            workers, INPUT_SORTED_BY ni AGGREGATION_MEMORY_LIMIT_MB.
+        :param resume: Continuar desde el último checkpoint de `checkpoint_key`, si existe.
         """
         summary = {"file_path": file_path, "debtors_saved": 0, "entities_saved": 0, "status": "failed"}
-        try:
-            logger.info(f"Iniciando importación desde el archivo: {file_path}")
+        metrics = ImportMetrics()
+        progress = progress or ImportProgress()
+        rejects = self._reject_sink(file_path)
+        content_hash = None
+        with track_import(metrics):
+            try:
+                logger.info(f"Iniciando importación desde el archivo: {file_path}")
+                workers = workers or self.workers
+                if os.path.exists(file_path):
+                    progress.total_bytes = os.path.getsize(file_path)
+
+                if self.duplicate_imports != "allow":
+                    content_hash = await self._hash_file(file_path, metrics)
+                    summary["content_hash"] = content_hash
+                    if await self._is_duplicate(content_hash, summary):
+                        return summary
 
-            raw_records_stream = self.parser.stream_raw_records(file_path)
-            debtors_data, entities_data = await self.processor.aggregate_data(raw_records_stream)
+                if checkpoint_key is not None and self.checkpoint_store is not None:
+                    has_data = await self._import_checkpointed(
+                        file_path, checkpoint_key, resume, summary, progress, metrics, rejects
+                    )
+                    self.checkpoint_store.delete(checkpoint_key)
+                    if not has_data:
+                        logger.info("No se generaron datos procesados para guardar.")
+                        summary["status"] = "completed_no_data"
+                        return summary
+                    summary["status"] = "completed_successfully"
+                    logger.info(f"Importación completada exitosamente para {file_path}.")
+                    return summary
 
-            if not debtors_data and not entities_data:
-                logger.info("No se generaron datos procesados para guardar.")
-                summary["status"] = "completed_no_data"
+                cached = await self._load_cached(content_hash, progress, summary, metrics, rejects)
+                sorted_by = None
+                if cached is None and workers == 1 and self.executor is None:
+                    sorted_by = await self._resolve_sorted_by(file_path)
+                if sorted_by:
+                    async with self._load(summary, metrics) as repository:
+                        has_data = await self._import_sorted(
+                            repository, file_path, sorted_by, summary, progress, metrics, rejects
+                        )
+                    if not has_data:
+                        logger.info("No se generaron datos procesados para guardar.")
+                        summary["status"] = "completed_no_data"
+                        return summary
+                    summary["status"] = "completed_successfully"
+                    logger.info(f"Importación completada exitosamente para {file_path}.")
+                    return summary
+
+                with ExitStack() as resources:
+                    if cached is not None:
+                        debtors_data, entities_data = cached
+                    else:
+                        debtors_data, entities_data = await self._aggregate_file(
+                            file_path, workers, resources, progress, metrics, rejects
+                        )
+                        await self._cache_results(content_hash, debtors_data, entities_data, progress, metrics, rejects)
+
+                    if not debtors_data and not entities_data:
+                        logger.info("No se generaron datos procesados para guardar.")
+                        summary["status"] = "completed_no_data"
+                        return summary
+
+                    async with self._load(summary, metrics) as repository:
+                        await self._save(repository, debtors_data, entities_data, summary, metrics)
+                summary["status"] = "completed_successfully"
+                logger.info(f"Importación completada exitosamente para {file_path}.")
                 return summary
+            except DataImporterError as e:
+                logger.error(f"Error durante la importación de {file_path}: {e}")
+                summary["error_message"] = str(e)
+                raise
+            except Exception as e:
+                logger.critical(f"Error crítico inesperado durante la importación de {file_path}: {e}", exc_info=True)
+                summary["error_message"] = "Error crítico inesperado."
+                raise DataImporterError(f"Error crítico inesperado: {e}")
+            finally:
+                self._report_rejects(summary, rejects)
+                self._record_metrics(summary, metrics, progress)
+                await self._record_history(summary, content_hash)
+
+    async def _accumulate_file(
+            self, file_path: str, workers: int, progress: ImportProgress, rejects: RejectSink
+    ) -> Tuple[DebtorsPartial, EntitiesPartial]:
+        """
+        Agrega un archivo en agregados parciales (sin construir los documentos) con el parser por bytes,
+        en el pool de procesos si hay uno o si se piden varios workers.
+        """
+        if os.path.exists(file_path):
+            progress.total_bytes = os.path.getsize(file_path)
+        if workers > 1 or self.executor is not None:
+            partials = await aggregate_file_parallel(
+                self.parser, self.processor, file_path, workers, PARSE_BATCH_SIZE, self.executor, progress, rejects
+            )
+            progress.bytes_processed = progress.total_bytes or 0
+            return partials
+        record_batches = self.parser.iter_record_batches(
+            file_path, PARSE_BATCH_SIZE, progress=progress, rejects=rejects
+        )
+        return await asyncio.to_thread(self.processor.accumulate_record_batches, record_batches)
 
-            debtors_saved_count = await self.repository.save_debtors(debtors_data)
-            entities_saved_count = await self.repository.save_entities(entities_data)
 
-            summary["debtors_saved"] = debtors_saved_count
-            summary["entities_saved"] = entities_saved_count
-            summary["status"] = "completed_successfully"
-            logger.info(f"Importación completada exitosamente para {file_path}.")
+    async def _import_files_merged(
+            self, file_paths: Sequence[str], concurrency: int, workers: int, summary: dict
+    ):
+        """
+        Agrega los archivos de a `concurrency` a la vez, combina los agregados en el orden de `file_paths`
+        (la entidad de un deudor es la del primer archivo en que aparece) y los guarda en una sola escritura.
+        """
+        metrics = ImportMetrics()
+        progress = ImportProgress()
+        file_progress = [ImportProgress() for _ in file_paths]
+        file_rejects = [self._reject_sink(file_path) for file_path in file_paths]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def accumulate(file_path: str, counts: ImportProgress, rejects: RejectSink):
+            async with semaphore:
+                logger.info(f"Agregando {file_path}")
+                return await self._accumulate_file(file_path, workers, counts, rejects)
+
+        with track_import(metrics):
+            try:
+                with metrics.stage("parse_aggregate"):
+                    partials = await asyncio.gather(*(
+                        accumulate(file_path, counts, rejects)
+                        for file_path, counts, rejects in zip(file_paths, file_progress, file_rejects)
+                    ))
+                for file_path, counts, rejects in zip(file_paths, file_progress, file_rejects):
+                    file_summary = {
+                        "file_path": file_path,
+                        "records_processed": counts.records_processed,
+                        "records_skipped": counts.records_skipped,
+                    }
+                    self._report_rejects(file_summary, rejects)
+                    summary["files"].append(file_summary)
+                    progress.records_processed += counts.records_processed
+                    progress.records_skipped += counts.records_skipped
+                    for reason, count in rejects.counts.items():
+                        summary["records_rejected"][reason] = summary["records_rejected"].get(reason, 0) + count
+                with metrics.stage("aggregate"):
+                    debtors_data, entities_data = await asyncio.to_thread(
+                        lambda: self.processor.build_results(*self.processor.merge_partials(partials))
+                    )
+                del partials
+                if not debtors_data and not entities_data:
+                    logger.info("No se generaron datos procesados para guardar.")
+                    summary["status"] = "completed_no_data"
+                    return
+                async with self._load(summary, metrics) as repository:
+                    await self._save(repository, debtors_data, entities_data, summary, metrics)
+                summary["status"] = "completed_successfully"
+            finally:
+                for rejects in file_rejects:
+                    rejects.close()
+                self._record_metrics(summary, metrics, progress)
+
+
+    async def export_snapshot(
+            self, file_path: str, snapshot_path: str, workers: Optional[int] = None,
+            progress: ImportProgress | None = None
+    ) -> dict:
+        """
+        Parsea y agrega el archivo como una importación, pero escribe los agregados en un snapshot columnar
+        (ver core/snapshot.py) en lugar de guardarlos en el repositorio.
+        :param file_path: Archivo de entrada (puede estar comprimido).
+        :param snapshot_path: Ruta del snapshot; se reemplaza de forma atómica si ya existe.
+        :param workers: Procesos para parsear y agregar en paralelo (por defecto, los del servicio).
+        :param progress: Contadores opcionales de bytes y registros procesados.
+        """
+        summary = {"file_path": file_path, "snapshot_path": snapshot_path, "debtors": 0, "entities": 0, "status": "failed"}
+        metrics = ImportMetrics()
+        progress = progress or ImportProgress()
+        rejects = self._reject_sink(file_path)
+        with track_import(metrics):
+            try:
+                logger.info(f"Exportando snapshot de {file_path} a {snapshot_path}")
+                if not os.path.exists(file_path):
+                    raise FileParsingError(f"Archivo no encontrado: {file_path}")
+                progress.total_bytes = os.path.getsize(file_path)
+                with ExitStack() as resources:
+                    debtors_data, entities_data = await self._aggregate_file(
+                        file_path, workers or self.workers, resources, progress, metrics, rejects
+                    )
+                    with metrics.stage("snapshot"):
+                        header = await asyncio.to_thread(
+                            write_snapshot, snapshot_path, debtors_data, entities_data,
+                            {"source": os.path.basename(file_path)}
+                        )
+                summary["debtors"], summary["entities"] = header["debtors"], header["entities"]
+                summary["status"] = "completed_successfully"
+                logger.info(f"Snapshot {snapshot_path} escrito: {header['debtors']} deudores, {header['entities']} entidades.")
+                return summary
+            except DataImporterError as e:
+                logger.error(f"Error exportando el snapshot de {file_path}: {e}")
+                summary["error_message"] = str(e)
+                raise
+            except Exception as e:
+                logger.critical(f"Error crítico inesperado exportando el snapshot de {file_path}: {e}", exc_info=True)
+                summary["error_message"] = "Error crítico inesperado."
+                raise DataImporterError(f"Error crítico inesperado: {e}")
+            finally:
+                self._report_rejects(summary, rejects)
+                summary["metrics"] = metrics.to_dict(progress)
+
+
+    async def import_data_from_files(
+            self, file_paths: Sequence[str], concurrency: int, merge: bool = False, workers: int | None = None
+    ) -> dict:
+        """
+        Importa varios archivos procesando a lo sumo `concurrency` a la vez sobre el mismo repositorio.
+        :param file_paths: Archivos a importar; con `merge` su orden define la entidad de los deudores repetidos.
+        :param concurrency: Archivos procesados en simultáneo.
+        :param merge: Si es True, un deudor que aparece en varios archivos se guarda una sola vez con la situación
+            máxima y la suma de préstamos de todos ellos; si no, cada archivo se importa por separado.
+        :param workers: Procesos para parseo/agregación de cada archivo; None usa el valor configurado.
+        :return: Un resumen con el estado general y, en "files", el resumen de cada archivo.
+        """
+        summary = {
+            "file_paths": list(file_paths), "files": [], "merged": merge,
+            "debtors_saved": 0, "entities_saved": 0, "records_rejected": {}, "status": "failed",
+        }
+        workers = workers or self.workers
+        concurrency = max(1, concurrency)
+        logger.info(f"Iniciando importación de {len(file_paths)} archivos ({concurrency} en simultáneo).")
+        if merge:
+            try:
+                await self._import_files_merged(file_paths, concurrency, workers, summary)
+            except DataImporterError as e:
+                logger.error(f"Error durante la importación combinada: {e}")
+                summary["error_message"] = str(e)
+                raise
+            except Exception as e:
+                logger.critical(f"Error crítico inesperado durante la importación combinada: {e}", exc_info=True)
+                summary["error_message"] = "Error crítico inesperado."
+                raise DataImporterError(f"Error crítico inesperado: {e}")
             return summary
-        except DataImporterError as e:
-            logger.error(f"Error durante la importación de {file_path}: {e}")
-            summary["error_message"] = str(e)
-            raise
-        except Exception as e:
-            logger.critical(f"Error crítico inesperado durante la importación de {file_path}: {e}", exc_info=True)
-            summary["error_message"] = "Error crítico inesperado."
-            raise DataImporterError(f"Error crítico inesperado: {e}")
\ No newline at end of file
+
+        if self.load_mode == "staging":
+            raise DataImporterError(
+                "Con LOAD_MODE='staging' cada importación reemplaza las colecciones; "
+                "use la importación combinada para cargar varios archivos."
+            )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def import_one(file_path: str) -> dict:
+            async with semaphore:
+                try:
+                    return await self.import_data_from_file(file_path, workers=workers)
+                except DataImporterError as e:
+                    return {"file_path": file_path, "status": "failed", "error_message": str(e)}
+
+        summary["files"] = await asyncio.gather(*(import_one(file_path) for file_path in file_paths))
+        failed = 0
+        for file_summary in summary["files"]:
+            summary["debtors_saved"] += file_summary.get("debtors_saved", 0)
+            summary["entities_saved"] += file_summary.get("entities_saved", 0)
+            for reason, count in file_summary.get("records_rejected", {}).items():
+                summary["records_rejected"][reason] = summary["records_rejected"].get(reason, 0) + count
+            failed += file_summary["status"] == "failed"
+        if failed == len(file_paths):
+            summary["status"] = "failed"
+        elif failed:
+            summary["status"] = "completed_with_errors"
+        else:
+            summary["status"] = "completed_successfully"
+        logger.info(f"Importación de {len(file_paths)} archivos terminada: {failed} con errores.")
+        return summary
+
+    async def import_data_from_stream(
+            self, chunks: AsyncIterable[bytes], source_name: str, progress: ImportProgress | None = None
+    ) -> dict:
+        """
+        Importa datos desde un flujo de bytes (por ejemplo, una subida HTTP) parseándolo a medida que llega,
+        sin escribirlo antes a disco. Usa siempre el parser por bytes, en el pool de procesos si hay uno.
+        Los flujos .gz y .zip se detectan y se descomprimen bloque a bloque.
+        :param chunks: Bloques de bytes del archivo en orden.
+        :param source_name: Nombre del origen para el resumen y los logs.
+        :param progress: Contadores opcionales de bytes y registros procesados.
+        """
+        summary = {"file_path": source_name, "debtors_saved": 0, "entities_saved": 0, "status": "failed"}
+        metrics = ImportMetrics()
+        progress = progress or ImportProgress()
+        rejects = self._reject_sink(source_name)
+        content_hash = None
+        digest = hashlib.sha256() if self.duplicate_imports != "allow" else None
+        with track_import(metrics):
+            try:
+                logger.info(f"Iniciando importación desde el flujo: {source_name}")
+                if digest is not None:
+                    chunks = _hashing_stream(chunks, digest)
+                chunks = decompress_stream(chunks, source_name)
+                if self.executor is not None:
+                    with metrics.stage("parse_aggregate"):
+                        partials = await aggregate_stream_parallel(
+                            self.processor, chunks, self.executor, STREAM_BLOCK_BYTES, 2 * self.workers,
+                            PARSE_BATCH_SIZE, progress, rejects
+                        )
+                    with metrics.stage("aggregate"):
+                        debtors_data, entities_data = await asyncio.to_thread(self.processor.build_results, *partials)
+                else:
+                    # El parseo de un flujo incluye la espera de los datos (la subida y su descompresión).
+                    record_batches = metrics.timed_async(
+                        self.parser.stream_record_batches(chunks, PARSE_BATCH_SIZE, progress, rejects), "parse"
+                    )
+                    with metrics.stage("aggregate", excluding="parse"):
+                        debtors_data, entities_data = await self.processor.aggregate_record_batch_stream(record_batches)
+
+                if digest is not None:
+                    # El hash se conoce recién al terminar de leer el flujo, así que un repetido ya pagó el parseo.
+                    content_hash = digest.hexdigest()
+                    summary["content_hash"] = content_hash
+                    if await self._is_duplicate(content_hash, summary):
+                        return summary
+                    await self._cache_results(content_hash, debtors_data, entities_data, progress, metrics, rejects)
+
+                if not debtors_data and not entities_data:
+                    logger.info("No se generaron datos procesados para guardar.")
+                    summary["status"] = "completed_no_data"
+                    return summary
+
+                async with self._load(summary, metrics) as repository:
+                    await self._save(repository, debtors_data, entities_data, summary, metrics)
+                summary["status"] = "completed_successfully"
+                logger.info(f"Importación completada exitosamente para {source_name}.")
+                return summary
+            except DataImporterError as e:
+                logger.error(f"Error durante la importación de {source_name}: {e}")
+                summary["error_message"] = str(e)
+                raise
+            except Exception as e:
+                logger.critical(f"Error crítico inesperado durante la importación de {source_name}: {e}", exc_info=True)
+                summary["error_message"] = "Error crítico inesperado."
+                raise DataImporterError(f"Error crítico inesperado: {e}")
+            finally:
+                self._report_rejects(summary, rejects)
+                self._record_metrics(summary, metrics, progress)
+                await self._record_history(summary, content_hash)
+
+
+class LookupService:
+    """
+    Consultas de deudores y entidades, con un cache TTL+LRU delante del repositorio.
+    Los "no encontrado" también se guardan en el cache.
+    """
+
+    def __init__(self, repository: AbstractRepository, cache: TTLCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        key = ("debtor", cuit_cuil)
+        debtor = self.cache.get(key)
+        if debtor is MISSING:
+            debtor = await self.repository.get_debtor(cuit_cuil)
+            self.cache.set(key, debtor)
+        return debtor
+
+    async def get_debtors(self, cuit_cuils: Iterable[int]) -> Dict[int, Optional[DebtorData]]:
+        """
+        Resuelve desde el cache los CUIT/CUIL que pueda y consulta el resto en una sola búsqueda.
+        :return: Un dict con todos los CUIT/CUIL pedidos, en el orden pedido; los inexistentes tienen None.
+        """
+        result: Dict[int, Optional[DebtorData]] = {cuit_cuil: None for cuit_cuil in cuit_cuils}
+        missing = []
+        for cuit_cuil in result:
+            debtor = self.cache.get(("debtor", cuit_cuil))
+            if debtor is MISSING:
+                missing.append(cuit_cuil)
+            else:
+                result[cuit_cuil] = debtor
+        if missing:
+            found = await self.repository.get_debtors(missing)
+            for cuit_cuil in missing:
+                debtor = found.get(cuit_cuil)
+                self.cache.set(("debtor", cuit_cuil), debtor)
+                result[cuit_cuil] = debtor
+        return result
+
+    async def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        key = ("entity", entity_code)
+        entity = self.cache.get(key)
+        if entity is MISSING:
+            entity = await self.repository.get_entity(entity_code)
+            self.cache.set(key, entity)
+        return entity
@@ -0,0 +1,213 @@
+"""
+Snapshots columnares de los agregados de una importación, para consultarlos sin base de datos.
+
+Formato (little-endian, columnas alineadas a 8 bytes):
+
+- `IMPSNAP1`, largo del encabezado (`<I`) y encabezado JSON con la cantidad de deudores y de entidades.
+- Deudores ordenados por CUIT/CUIL, una columna por campo: `cuit_cuil` (`<q`), `situation` (`<d`),
+  `loans` (`<d`) y `entity_code` (`<q`).
+- `loans_order` (`<q`): posiciones de los deudores ordenadas por `loans`, para rangos y top-N.
+- Entidades ordenadas por código: `entity_code` (`<q`) y `loans` (`<d`).
+
+SnapshotReader mapea el archivo en memoria y lee las columnas a través de memoryviews, sin copiarlas.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional
+
+from core.exceptions import SnapshotError
+from core.models import DebtorData, EntityData
+
+_MAGIC = b"IMPSNAP1"
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+
+
+def _column(typecode: str, values=()) -> array:
+    column = array(typecode, values)
+    if sys.byteorder == "big":  # pragma: no cover - depende de la plataforma
+        column.byteswap()
+    return column
+
+
+def _data_offset(header_length: int) -> int:
+    end = len(_MAGIC) + _HEADER_LENGTH.size + header_length
+    return -(-end // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_snapshot(
+        path: str, debtors: Iterable[DebtorData | dict], entities: Iterable[EntityData | dict], header: Optional[dict] = None
+) -> dict:
+    """
+    Escribe de forma atómica el snapshot de los agregados de una importación.
+    :param debtors: Deudores agregados (modelos o documentos), en cualquier orden.
+    :param entities: Entidades agregadas (modelos o documentos), en cualquier orden.
+    :param header: Datos adicionales para el encabezado (por ejemplo, el archivo de origen); deben ser serializables a JSON.
+    :return: El encabezado escrito.
+    """
+    rows = sorted(
+        (debtor["cuit_cuil"], debtor["situation"], debtor["loans"], debtor["entity_code"]) if isinstance(debtor, dict)
+        else (debtor.cuit_cuil, debtor.situation, debtor.loans, debtor.entity_code)
+        for debtor in debtors
+    )
+    entity_rows = sorted(
+        (entity["entity_code"], entity["loans"]) if isinstance(entity, dict) else (entity.entity_code, entity.loans)
+        for entity in entities
+    )
+    loans = _column("d", (row[2] for row in rows))
+    columns = [
+        _column("q", (row[0] for row in rows)),
+        _column("d", (row[1] for row in rows)),
+        loans,
+        _column("q", (row[3] for row in rows)),
+        _column("q", sorted(range(len(rows)), key=loans.__getitem__)),
+        _column("q", (row[0] for row in entity_rows)),
+        _column("d", (row[1] for row in entity_rows)),
+    ]
+    header = {**(header or {}), "debtors": len(rows), "entities": len(entity_rows)}
+    header_bytes = json.dumps(header).encode("utf-8")
+    padding = _data_offset(len(header_bytes)) - len(_MAGIC) - _HEADER_LENGTH.size - len(header_bytes)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b"\0" * padding)
+            for column in columns:
+                column.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except OSError as e:
+        raise SnapshotError(f"No se pudo escribir el snapshot '{path}': {e}")
+    return header
+
+
+class SnapshotReader:
+    """
+    Consultas sobre un snapshot escrito por write_snapshot: búsqueda puntual por CUIT/CUIL o código de entidad
+    (búsqueda binaria) y rangos o top-N por monto de préstamos (sobre la columna `loans_order`).
+    Las columnas son vistas sobre el archivo mapeado en memoria; solo se materializan los resultados.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Ruta del snapshot.
+        :raises SnapshotError: si el archivo no existe o no tiene el formato esperado.
+        """
+        self.path = path
+        if sys.byteorder != "little":  # pragma: no cover - depende de la plataforma
+            raise SnapshotError("La lectura sin copias de snapshots requiere una plataforma little-endian.")
+        try:
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"No se pudo abrir el snapshot '{path}': {e}")
+        self._view = memoryview(self._mmap)
+        try:
+            self._map_columns()
+        except SnapshotError:
+            self.close()
+            raise
+        except (KeyError, ValueError, TypeError, struct.error) as e:
+            self.close()
+            raise SnapshotError(f"Snapshot inválido '{path}': {e}")
+
+    def _map_columns(self):
+        if bytes(self._view[:len(_MAGIC)]) != _MAGIC:
+            raise SnapshotError(f"'{self.path}' no es un snapshot.")
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._view, len(_MAGIC))
+        header_start = len(_MAGIC) + _HEADER_LENGTH.size
+        self.header = json.loads(bytes(self._view[header_start:header_start + header_length]))
+        debtors, entities = self.header["debtors"], self.header["entities"]
+
+        position = _data_offset(header_length)
+        layout = [
+            ("cuit_cuil", "q", debtors), ("situation", "d", debtors), ("loans", "d", debtors),
+            ("entity_code", "q", debtors), ("loans_order", "q", debtors),
+            ("entity_codes", "q", entities), ("entity_loans", "d", entities),
+        ]
+        if position + 8 * (5 * debtors + 2 * entities) != len(self._view):
+            raise SnapshotError(f"El tamaño de '{self.path}' no coincide con su encabezado.")
+        self._columns = []
+        for name, typecode, count in layout:
+            column = self._view[position:position + 8 * count].cast(typecode)
+            self._columns.append(column)
+            setattr(self, f"_{name}", column)
+            position += 8 * count
+
+    def __len__(self) -> int:
+        return len(self._cuit_cuil)
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Las vistas deben liberarse antes de cerrar el mapeo.
+        for column in getattr(self, "_columns", ()):
+            column.release()
+        self._columns = []
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        self._mmap.close()
+
+    def _debtor(self, index: int) -> DebtorData:
+        return DebtorData(
+            entity_code=self._entity_code[index], cuitCuil=self._cuit_cuil[index],
+            situation=self._situation[index], loans=self._loans[index]
+        )
+
+    def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        index = bisect_left(self._cuit_cuil, cuit_cuil)
+        if index < len(self._cuit_cuil) and self._cuit_cuil[index] == cuit_cuil:
+            return self._debtor(index)
+        return None
+
+    def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        index = bisect_left(self._entity_codes, entity_code)
+        if index < len(self._entity_codes) and self._entity_codes[index] == entity_code:
+            return EntityData(entity_code=entity_code, loans=self._entity_loans[index])
+        return None
+
+    def debtors_by_loans(
+            self, min_loans: Optional[float] = None, max_loans: Optional[float] = None, descending: bool = False
+    ) -> Iterator[DebtorData]:
+        """
+        Deudores con `min_loans <= loans <= max_loans` (cualquiera de los dos límites es opcional),
+        ordenados por monto de préstamos.
+        """
+        loans = self._loans.__getitem__
+        start = 0 if min_loans is None else bisect_left(self._loans_order, min_loans, key=loans)
+        end = len(self._loans_order) if max_loans is None else bisect_right(self._loans_order, max_loans, key=loans)
+        positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+        for position in positions:
+            yield self._debtor(self._loans_order[position])
+
+    def top_debtors(self, limit: int) -> List[DebtorData]:
+        """
+        Los `limit` deudores con mayor monto de préstamos, de mayor a menor.
+        """
+        top = []
+        for debtor in self.debtors_by_loans(descending=True):
+            if len(top) >= limit:
+                break
+            top.append(debtor)
+        return top
+
+    def entities(self) -> Iterator[EntityData]:
+        for index in range(len(self._entity_codes)):
+            yield EntityData(entity_code=self._entity_codes[index], loans=self._entity_loans[index])
@@ -0,0 +1,86 @@
+import logging
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.exceptions import DataProcessingError
+
+logger = logging.getLogger(__name__)
+
+# cuit_cuil, max_situation, sum_loans, entity_code
+_SPILL_RECORD = struct.Struct("<qddq")
+# Estimación del costo en memoria de una entrada del agregado parcial de deudores
+# (clave del dict + lista de 3 elementos + sus valores).
+BYTES_PER_DEBTOR_ENTRY = 256
+_READ_RECORDS = 65536
+
+
+class SpillStore:
+    """
+    Almacena en disco agregados parciales de deudores particionados por hash del CUIT,
+    para agregar archivos más grandes que la memoria disponible.
+
+    Cada volcado agrega registros de tamaño fijo al archivo de su partición; al final las
+    particiones se combinan una por una, de modo que en memoria solo vive una partición a la vez.
+    """
+
+    def __init__(self, partitions: int, temp_dir: Optional[str] = None):
+        self.partitions = partitions
+        self._dir = tempfile.mkdtemp(prefix="debtors_spill_", dir=temp_dir)
+        self._paths = [os.path.join(self._dir, f"partition_{i:04d}.bin") for i in range(partitions)]
+        self.spill_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def spilled(self) -> bool:
+        return self.spill_count > 0
+
+    def spill(self, debtors_partial: Dict[int, list]):
+        """
+        Vuelca el agregado parcial a las particiones. El llamador debe vaciar el dict después.
+        """
+        buffers: List[bytearray] = [bytearray() for _ in range(self.partitions)]
+        pack = _SPILL_RECORD.pack
+        for cuit, (situation, loans, entity_code) in debtors_partial.items():
+            buffers[cuit % self.partitions] += pack(cuit, situation, loans, entity_code)
+        try:
+            for path, buffer in zip(self._paths, buffers):
+                if buffer:
+                    with open(path, "ab") as f:
+                        f.write(buffer)
+        except OSError as e:
+            raise DataProcessingError(f"No se pudo volcar el agregado a disco en {self._dir}: {e}")
+        self.spill_count += 1
+        logger.info(f"Volcado #{self.spill_count}: {len(debtors_partial)} deudores a {self._dir}.")
+
+    def iter_merged(self) -> Iterator[Tuple[int, list]]:
+        """
+        Combina los volcados partición por partición, respetando el orden en que se escribieron
+        (la entidad de cada deudor es la de su primer volcado).
+        :return: Un generador de (cuit, [max_situation, sum_loans, entity_code]).
+        """
+        for path in self._paths:
+            if not os.path.exists(path):
+                continue
+            merged: Dict[int, list] = {}
+            with open(path, "rb") as f:
+                while data := f.read(_READ_RECORDS * _SPILL_RECORD.size):
+                    for cuit, situation, loans, entity_code in _SPILL_RECORD.iter_unpack(data):
+                        debtor = merged.get(cuit)
+                        if debtor is None:
+                            merged[cuit] = [situation, loans, entity_code]
+                        else:
+                            if situation > debtor[0]:
+                                debtor[0] = situation
+                            debtor[1] += loans
+            yield from merged.items()
+
+    def close(self):
+        shutil.rmtree(self._dir, ignore_errors=True)
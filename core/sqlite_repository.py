@@ -0,0 +1,524 @@
+"""
+Repositorio embebido en un archivo SQLite, para importar y consultar sin un servidor de MongoDB.
+
+Las filas se escriben con executemany en una sola transacción por llamada, con el journal en modo WAL:
+las lecturas (de otra conexión) no se bloquean mientras dura una importación y ven los datos recién al confirmarse.
+Los deudores y entidades se convierten a tuplas directamente desde los modelos o dicts, sin model_dump.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.config import (
+    DEBTORS_COLLECTION, ENTITIES_COLLECTION, IMPORT_HISTORY_COLLECTION, SQLITE_PATH, WRITE_BATCH_SIZE
+)
+from core.exceptions import RepositoryError
+from core.metrics import observe_write_batch
+from core.models import DebtorData, EntityData
+from core.repository import (
+    FINGERPRINT_FIELD, STAGING_SUFFIX, AbstractRepository, compute_fingerprint, empty_upsert_counts
+)
+
+logger = logging.getLogger(__name__)
+
+_DEBTOR_FIELDS = ("entity_code", "cuit_cuil", "situation", "loans")
+_ENTITY_FIELDS = ("entity_code", "loans")
+# Parámetros por consulta con IN: por debajo del límite de las versiones de SQLite más antiguas (999).
+_MAX_VARIABLES = 900
+
+
+def _debtor_fingerprint(row: tuple) -> int:
+    # Mismos valores y orden que core.repository.debtor_fingerprint.
+    return compute_fingerprint(row[2], row[3], row[0])
+
+
+def _entity_fingerprint(row: tuple) -> int:
+    return compute_fingerprint(row[1])
+
+
+class _Table:
+    """
+    Columnas y clave de una tabla de deudores o entidades, y cómo convertir sus registros a filas.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], key: str, fingerprint: Callable[[tuple], int], model):
+        self.fields = fields
+        self.key = key
+        self.key_index = fields.index(key)
+        self.fingerprint = fingerprint
+        self.model = model
+        self._from_dict = itemgetter(*fields)
+        self._from_model = attrgetter(*fields)
+
+    def rows(self, batch: list) -> List[tuple]:
+        # Los lotes son homogéneos: o todos dicts (camino rápido) o todos modelos.
+        return list(map(self._from_dict if isinstance(batch[0], dict) else self._from_model, batch))
+
+    def to_model(self, row: tuple):
+        return self.model(**dict(zip(self.fields, row)))
+
+
+_DEBTORS = _Table(_DEBTOR_FIELDS, "cuit_cuil", _debtor_fingerprint, DebtorData)
+_ENTITIES = _Table(_ENTITY_FIELDS, "entity_code", _entity_fingerprint, EntityData)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class SQLiteRepository(AbstractRepository):
+    """
+    Cumple el mismo contrato que MongoRepository sobre un archivo SQLite. Como en MongoDB, en modo "insert"
+    puede haber varias filas por clave y las consultas devuelven la última escrita.
+    """
+
+    def __init__(
+            self,
+            path: str = SQLITE_PATH,
+            batch_size: int = WRITE_BATCH_SIZE,
+            debtors_table: str = DEBTORS_COLLECTION,
+            entities_table: str = ENTITIES_COLLECTION
+    ):
+        """
+        :param path: Archivo de la base; ":memory:" para una base en memoria (una sola conexión).
+        :param batch_size: Filas por cada executemany.
+        :param debtors_table: Tabla de deudores.
+        :param entities_table: Tabla de entidades.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.debtors_table = debtors_table
+        self.entities_table = entities_table
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        # sqlite3 no admite usar una conexión desde dos hilos a la vez.
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        # En una carga con staging: tabla temporal -> tabla vigente que reemplaza.
+        self._staged: Dict[str, str] = {}
+
+    def _open(self) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones se abren y cierran explícitamente.
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _create_schema(self):
+        with self._write_lock:
+            self._create_tables(self.debtors_table, self.entities_table)
+            self._writer.execute(
+                f'CREATE TABLE IF NOT EXISTS "{IMPORT_HISTORY_COLLECTION}" '
+                f"(content_hash TEXT NOT NULL, status TEXT NOT NULL, entry TEXT NOT NULL)"
+            )
+
+    def _create_tables(self, debtors_table: str, entities_table: str):
+        self._writer.execute(
+            f'CREATE TABLE IF NOT EXISTS "{debtors_table}" (entity_code INTEGER NOT NULL, cuit_cuil INTEGER NOT NULL, '
+            f"situation REAL NOT NULL, loans REAL NOT NULL, {FINGERPRINT_FIELD} INTEGER)"
+        )
+        self._writer.execute(
+            f'CREATE TABLE IF NOT EXISTS "{entities_table}" (entity_code INTEGER NOT NULL, loans REAL NOT NULL, '
+            f"{FINGERPRINT_FIELD} INTEGER)"
+        )
+
+    async def connect(self):
+        if self._writer is not None:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            self._writer = self._open()
+            # Una base en memoria solo existe en su conexión; las lecturas comparten la de escritura.
+            if self.path == ":memory:":
+                self._reader, self._read_lock = self._writer, self._write_lock
+            else:
+                self._reader = self._open()
+            await asyncio.to_thread(self._create_schema)
+            logger.info(f"Conectado a SQLite: {self.path}")
+        except Exception as e:
+            logger.error(f"No se pudo abrir la base SQLite {self.path}: {e}")
+            await self.disconnect()
+            raise RepositoryError(f"Error de conexión a SQLite: {e}")
+        await self.ensure_indexes()
+
+    async def ensure_indexes(self):
+        """
+        Crea (si no existen) los índices de búsqueda por cuit_cuil, entity_code y content_hash. Un fallo no
+        impide usar el repositorio: las lecturas siguen funcionando, aunque más lentas.
+        """
+        def create():
+            with self._write_lock:
+                for table, column in (
+                        (self.debtors_table, "cuit_cuil"), (self.entities_table, "entity_code"),
+                        (IMPORT_HISTORY_COLLECTION, "content_hash"),
+                ):
+                    self._writer.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{column}" ON "{table}" ({column})')
+
+        try:
+            await asyncio.to_thread(create)
+        except Exception as e:
+            logger.warning(f"No se pudieron crear los índices de búsqueda: {e}")
+
+    async def disconnect(self):
+        if self._reader is not None and self._reader is not self._writer:
+            self._reader.close()
+        if self._writer is not None:
+            self._writer.close()
+            logger.info(f"Desconectado de SQLite: {self.path}")
+        self._writer = None
+        self._reader = None
+
+    def _check_connected(self):
+        if self._writer is None:
+            raise RepositoryError("La base de datos no está inicializada. Llama a 'connect' primero.")
+
+    def _write_transaction(self, work: Callable[[sqlite3.Connection], object]):
+        """
+        Ejecuta `work` en una transacción de la conexión de escritura; si falla, la revierte.
+        """
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._writer)
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+            return result
+
+    def _batches(self, table: str, records: Iterable) -> Iterable[list]:
+        iterator = iter(records)
+        while batch := list(islice(iterator, self.batch_size)):
+            # El lote se escribe mientras el generador está suspendido en el yield.
+            started = time.perf_counter()
+            yield batch
+            observe_write_batch(self._staged.get(table, table), time.perf_counter() - started)
+
+    def _insert(self, table: str, spec: _Table, records: Iterable) -> int:
+        statement = f'INSERT INTO "{table}" ({", ".join(spec.fields)}) VALUES ({", ".join("?" * len(spec.fields))})'
+
+        def work(connection: sqlite3.Connection) -> int:
+            count = 0
+            for batch in self._batches(table, records):
+                connection.executemany(statement, spec.rows(batch))
+                count += len(batch)
+            return count
+
+        return self._write_transaction(work)
+
+    def _stored_fingerprints(self, connection: sqlite3.Connection, table: str, key: str, keys: list) -> Dict[int, int]:
+        stored = {}
+        for start in range(0, len(keys), _MAX_VARIABLES):
+            chunk = keys[start:start + _MAX_VARIABLES]
+            stored.update(connection.execute(
+                f'SELECT {key}, {FINGERPRINT_FIELD} FROM "{table}" WHERE {key} IN ({", ".join("?" * len(chunk))})',
+                chunk
+            ))
+        return stored
+
+    def _upsert(self, table: str, spec: _Table, records: Iterable) -> Dict[str, int]:
+        """
+        Compara la huella de cada fila con la almacenada y escribe solo las nuevas o modificadas.
+        """
+        columns = (*spec.fields, FINGERPRINT_FIELD)
+        insert = f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+        update = (
+            f'UPDATE "{table}" SET {", ".join(f"{column} = ?" for column in columns)} WHERE {spec.key} = ?'
+        )
+
+        def work(connection: sqlite3.Connection) -> Dict[str, int]:
+            counts = empty_upsert_counts()
+            for batch in self._batches(table, records):
+                rows = [(*row, spec.fingerprint(row)) for row in spec.rows(batch)]
+                stored = self._stored_fingerprints(connection, table, spec.key, [row[spec.key_index] for row in rows])
+                new_rows, changed_rows = [], []
+                for row in rows:
+                    key = row[spec.key_index]
+                    if key not in stored:
+                        new_rows.append(row)
+                    elif stored[key] != row[-1]:
+                        changed_rows.append((*row, key))
+                connection.executemany(insert, new_rows)
+                connection.executemany(update, changed_rows)
+                counts["inserted"] += len(new_rows)
+                counts["updated"] += len(changed_rows)
+                counts["unchanged"] += len(rows) - len(new_rows) - len(changed_rows)
+            return counts
+
+        return self._write_transaction(work)
+
+    async def save_debtors(self, debtors: Iterable[DebtorData | dict]) -> int:
+        """
+        Save debtor records to the database.
+        :param debtors: Debtor records to save.
+        :return: Number of records saved.
+        """
+        if not debtors:
+            logger.info("No hay registros de deudores para guardar.")
+            return 0
+        self._check_connected()
+        try:
+            count = await asyncio.to_thread(self._insert, self.debtors_table, _DEBTORS, debtors)
+        except Exception as e:
+            logger.error(f"Error al insertar registros de deudores: {e}")
+            raise RepositoryError(f"Error al insertar deudores: {e}")
+        logger.info(f"Se insertaron {count} registros de deudores.")
+        return count
+
+    async def save_entities(self, entities: Iterable[EntityData | dict]) -> int:
+        """
+        Save entity records to the database.
+        :param entities: Entity records to save.
+        :return: Number of records saved.
+        """
+        if not entities:
+            logger.info("No hay registros de entidades para guardar.")
+            return 0
+        self._check_connected()
+        try:
+            count = await asyncio.to_thread(self._insert, self.entities_table, _ENTITIES, entities)
+        except Exception as e:
+            logger.error(f"Error al insertar registros de entidades: {e}")
+            raise RepositoryError(f"Error al insertar entidades: {e}")
+        logger.info(f"Se insertaron {count} registros de entidades.")
+        return count
+
+    async def upsert_debtors(self, debtors: Iterable[DebtorData | dict]) -> Dict[str, int]:
+        """
+        Insert or update debtor records keyed by cuit_cuil.
+        :param debtors: Debtor records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        if not debtors:
+            logger.info("No hay registros de deudores para guardar.")
+            return empty_upsert_counts()
+        self._check_connected()
+        try:
+            counts = await asyncio.to_thread(self._upsert, self.debtors_table, _DEBTORS, debtors)
+        except Exception as e:
+            logger.error(f"Error al actualizar registros de deudores: {e}")
+            raise RepositoryError(f"Error al actualizar deudores: {e}")
+        logger.info(
+            f"Deudores: {counts['inserted']} insertados, {counts['updated']} actualizados, "
+            f"{counts['unchanged']} sin cambios.")
+        return counts
+
+    async def upsert_entities(self, entities: Iterable[EntityData | dict]) -> Dict[str, int]:
+        """
+        Insert or update entity records keyed by entity_code.
+        :param entities: Entity records to upsert.
+        :return: Counts for "inserted", "updated" and "unchanged".
+        """
+        if not entities:
+            logger.info("No hay registros de entidades para guardar.")
+            return empty_upsert_counts()
+        self._check_connected()
+        try:
+            counts = await asyncio.to_thread(self._upsert, self.entities_table, _ENTITIES, entities)
+        except Exception as e:
+            logger.error(f"Error al actualizar registros de entidades: {e}")
+            raise RepositoryError(f"Error al actualizar entidades: {e}")
+        logger.info(
+            f"Entidades: {counts['inserted']} insertadas, {counts['updated']} actualizadas, "
+            f"{counts['unchanged']} sin cambios.")
+        return counts
+
+    def _read(self, query: str, parameters: Iterable) -> List[tuple]:
+        with self._read_lock:
+            return self._reader.execute(query, tuple(parameters)).fetchall()
+
+    async def _find_latest(self, table: str, spec: _Table, value: int):
+        # En modo "insert" puede haber varias filas por clave: se toma la última escrita.
+        self._check_connected()
+        rows = await asyncio.to_thread(
+            self._read,
+            f'SELECT {", ".join(spec.fields)} FROM "{table}" WHERE {spec.key} = ? ORDER BY rowid DESC LIMIT 1',
+            (value,)
+        )
+        return spec.to_model(rows[0]) if rows else None
+
+    async def get_debtor(self, cuit_cuil: int) -> Optional[DebtorData]:
+        """
+        Get the most recently written debtor with the given CUIT/CUIL.
+        :param cuit_cuil: The debtor's CUIT/CUIL.
+        :return: The debtor, or None if it does not exist.
+        """
+        try:
+            return await self._find_latest(self.debtors_table, _DEBTORS, cuit_cuil)
+        except sqlite3.Error as e:
+            logger.error(f"Error al buscar el deudor {cuit_cuil}: {e}")
+            raise RepositoryError(f"Error al buscar el deudor: {e}")
+
+    async def get_debtors(self, cuit_cuils: Iterable[int]) -> Dict[int, DebtorData]:
+        """
+        Get many debtors in a single query per chunk of keys.
+        :param cuit_cuils: The CUIT/CUILs to look up.
+        :return: The debtors found, keyed by CUIT/CUIL; missing ones are omitted.
+        """
+        keys = list(set(cuit_cuils))
+        if not keys:
+            return {}
+        self._check_connected()
+        debtors: Dict[int, DebtorData] = {}
+        try:
+            for start in range(0, len(keys), _MAX_VARIABLES):
+                chunk = keys[start:start + _MAX_VARIABLES]
+                rows = await asyncio.to_thread(
+                    self._read,
+                    f'SELECT {", ".join(_DEBTOR_FIELDS)} FROM "{self.debtors_table}" '
+                    f'WHERE cuit_cuil IN ({", ".join("?" * len(chunk))}) ORDER BY rowid',
+                    chunk
+                )
+                for row in rows:
+                    debtors[row[_DEBTORS.key_index]] = _DEBTORS.to_model(row)
+        except sqlite3.Error as e:
+            logger.error(f"Error al buscar {len(keys)} deudores: {e}")
+            raise RepositoryError(f"Error al buscar deudores: {e}")
+        return debtors
+
+    async def get_entity(self, entity_code: int) -> Optional[EntityData]:
+        """
+        Get the most recently written entity with the given code.
+        :param entity_code: The entity code.
+        :return: The entity, or None if it does not exist.
+        """
+        try:
+            return await self._find_latest(self.entities_table, _ENTITIES, entity_code)
+        except sqlite3.Error as e:
+            logger.error(f"Error al buscar la entidad {entity_code}: {e}")
+            raise RepositoryError(f"Error al buscar la entidad: {e}")
+
+    async def find_import(self, content_hash: str) -> Optional[dict]:
+        """
+        Get the most recent successful import of the content with the given hash from the import history.
+        :param content_hash: The SHA-256 hex digest of the imported input.
+        :return: The history entry, or None if that content was never imported successfully.
+        """
+        self._check_connected()
+        try:
+            rows = await asyncio.to_thread(
+                self._read,
+                f'SELECT entry FROM "{IMPORT_HISTORY_COLLECTION}" WHERE content_hash = ? AND status = ? '
+                f"ORDER BY rowid DESC LIMIT 1",
+                (content_hash, "completed_successfully")
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error al consultar el historial de importaciones: {e}")
+            raise RepositoryError(f"Error al consultar el historial de importaciones: {e}")
+        if not rows:
+            return None
+        entry = json.loads(rows[0][0])
+        if entry.get("finished_at"):
+            entry["finished_at"] = datetime.fromisoformat(entry["finished_at"])
+        return entry
+
+    async def record_import(self, entry: dict):
+        """
+        Append an entry (hash, status, counts and timings of an import) to the import history.
+        :param entry: The history entry.
+        """
+        self._check_connected()
+        statement = f'INSERT INTO "{IMPORT_HISTORY_COLLECTION}" (content_hash, status, entry) VALUES (?, ?, ?)'
+        row = (entry["content_hash"], entry["status"], json.dumps(entry, default=_json_default))
+        try:
+            await asyncio.to_thread(self._write_transaction, lambda connection: connection.execute(statement, row))
+        except Exception as e:
+            logger.error(f"Error al registrar la importación en el historial: {e}")
+            raise RepositoryError(f"Error al registrar la importación en el historial: {e}")
+
+    def _existing_tables(self, names: Iterable[str]) -> List[str]:
+        names = list(names)
+        return [name for (name,) in self._read(
+            f'SELECT name FROM sqlite_master WHERE type = \'table\' AND name IN ({", ".join("?" * len(names))})', names
+        )]
+
+    async def begin_load(self, load_id: Optional[str] = None) -> "SQLiteRepository":
+        """
+        Crea tablas de staging vacías y sin índices para una carga completa.
+        Las lecturas siguen viendo las tablas vigentes hasta commit_load.
+        :param load_id: Identificador de una carga sin terminar cuyas tablas de staging se retoman.
+        :return: Un repositorio que escribe en las tablas de staging (comparte las conexiones).
+        """
+        self._check_connected()
+        token = load_id or uuid.uuid4().hex[:12]
+        staging = SQLiteRepository(
+            self.path, self.batch_size,
+            debtors_table=f"{self.debtors_table}{STAGING_SUFFIX}{token}",
+            entities_table=f"{self.entities_table}{STAGING_SUFFIX}{token}",
+        )
+        staging._writer, staging._reader = self._writer, self._reader
+        staging._write_lock, staging._read_lock = self._write_lock, self._read_lock
+        staging.load_id = token
+        staging._staged = {
+            staging.debtors_table: self.debtors_table,
+            staging.entities_table: self.entities_table,
+        }
+        if load_id:
+            existing = await asyncio.to_thread(self._existing_tables, staging._staged)
+            if len(existing) != len(staging._staged):
+                raise RepositoryError(f"No existen las tablas de staging de la carga '{load_id}'.")
+            logger.info(f"Carga con staging retomada en {', '.join(staging._staged)}.")
+            return staging
+        try:
+            await asyncio.to_thread(
+                self._write_transaction,
+                lambda connection: staging._create_tables(staging.debtors_table, staging.entities_table)
+            )
+        except Exception as e:
+            await staging.abort_load()
+            logger.error(f"No se pudieron crear las tablas de staging: {e}")
+            raise RepositoryError(f"Error al iniciar la carga: {e}")
+        logger.info(f"Carga con staging iniciada en {', '.join(staging._staged)}.")
+        return staging
+
+    async def commit_load(self):
+        """
+        En una sola transacción, reemplaza las tablas vigentes por las de staging y crea sus índices.
+        A diferencia de MongoDB, las dos tablas se reemplazan a la vez.
+        """
+        if not self._staged:
+            return
+        keys = {self.debtors_table: "cuit_cuil", self.entities_table: "entity_code"}
+
+        def swap(connection: sqlite3.Connection):
+            for staging_name, live_name in self._staged.items():
+                connection.execute(f'DROP TABLE IF EXISTS "{live_name}"')
+                connection.execute(f'ALTER TABLE "{staging_name}" RENAME TO "{live_name}"')
+                key = keys[staging_name]
+                connection.execute(f'CREATE INDEX "ix_{live_name}_{key}" ON "{live_name}" ({key})')
+
+        try:
+            await asyncio.to_thread(self._write_transaction, swap)
+        except Exception as e:
+            logger.error(f"Error al reemplazar las tablas vigentes: {e}")
+            await self.abort_load()
+            raise RepositoryError(f"Error al confirmar la carga: {e}")
+        logger.info(f"Carga confirmada en {', '.join(self._staged.values())}.")
+        self._staged = {}
+
+    async def abort_load(self):
+        """
+        Elimina las tablas de staging que queden; las vigentes no se modifican.
+        """
+        for staging_name in self._staged:
+            try:
+                await asyncio.to_thread(
+                    self._write_transaction,
+                    lambda connection: connection.execute(f'DROP TABLE IF EXISTS "{staging_name}"')
+                )
+            except Exception as e:
+                logger.warning(f"No se pudo eliminar la tabla de staging '{staging_name}': {e}")
+        self._staged = {}
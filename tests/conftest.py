@@ -0,0 +1,86 @@
+"""
+Fixtures compartidas: un archivo sintético (con líneas inválidas) y sus agregados según el motor original
+(FileParser.stream_raw_records + DataProcessor.aggregate_data), contra los que se comparan los demás caminos.
+"""
+import asyncio
+from typing import Dict, Iterable, Tuple
+
+import pytest
+
+from benchmarks.generator import generate_file
+from core.config import CUIT_CUIL_SLICE, ENTITY_CODE_SLICE
+from core.data_processor import DataProcessor
+from core.file_parser import FileParser
+
+# cuit -> (entity_code, situation, loans) y entity_code -> loans
+Aggregates = Tuple[Dict[int, tuple], Dict[int, float]]
+
+
+def as_aggregates(debtors: Iterable, entities: Iterable) -> Aggregates:
+    """
+    Normaliza deudores y entidades (modelos o documentos) a dicts comparables.
+    """
+    debtor_rows = {}
+    for debtor in debtors:
+        if not isinstance(debtor, dict):
+            debtor = debtor.model_dump()
+        debtor_rows[debtor["cuit_cuil"]] = (debtor["entity_code"], debtor["situation"], debtor["loans"])
+    entity_rows = {}
+    for entity in entities:
+        if not isinstance(entity, dict):
+            entity = entity.model_dump()
+        entity_rows[entity["entity_code"]] = entity["loans"]
+    return debtor_rows, entity_rows
+
+
+def assert_same_aggregates(actual: Aggregates, expected: Aggregates):
+    """
+    Mismos deudores (entidad, situación máxima y suma de préstamos) y entidades; las sumas pueden diferir
+    en el redondeo según el orden en que se acumulan.
+    """
+    actual_debtors, actual_entities = actual
+    expected_debtors, expected_entities = expected
+    assert actual_debtors.keys() == expected_debtors.keys()
+    for cuit, (entity_code, situation, loans) in expected_debtors.items():
+        assert actual_debtors[cuit][:2] == (entity_code, situation)
+        assert actual_debtors[cuit][2] == pytest.approx(loans)
+    assert actual_entities == pytest.approx(expected_entities)
+
+
+@pytest.fixture
+def parser() -> FileParser:
+    return FileParser()
+
+
+@pytest.fixture
+def processor(parser) -> DataProcessor:
+    return DataProcessor(parser)
+
+
+@pytest.fixture(scope="session")
+def data_file(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("data") / "deudores.txt")
+    generate_file(path, rows=20_000, distinct_cuits=3_000, entities=40, bad_line_ratio=0.05, seed=7)
+    return path
+
+
+@pytest.fixture(scope="session")
+def expected(data_file) -> Aggregates:
+    parser = FileParser()
+    debtors, entities = asyncio.run(DataProcessor(parser).aggregate_data(parser.stream_raw_records(data_file)))
+    return as_aggregates(debtors, entities)
+
+
+def sorted_copy(source: str, target: str, by: str) -> str:
+    """
+    Copia el archivo con sus líneas ordenadas por CUIT/CUIL ("cuit") o agrupadas por entidad ("entity"),
+    sin las líneas inválidas (que no tienen clave).
+    """
+    field = CUIT_CUIL_SLICE if by == "cuit" else ENTITY_CODE_SLICE
+    with open(source, "rb") as f:
+        lines = [line for line in f.read().split(b"\n") if line[field].strip().isdigit()]
+    # sort estable: dentro de cada clave se conserva el orden original de las líneas.
+    lines.sort(key=lambda line: int(line[field]))
+    with open(target, "wb") as f:
+        f.write(b"\n".join(lines) + b"\n")
+    return target
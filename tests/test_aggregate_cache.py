@@ -0,0 +1,70 @@
+"""
+AggregateCache: agregados guardados por hash de contenido, con desalojo por tamaño, y su uso al repetir importaciones.
+"""
+import asyncio
+import os
+
+from benchmarks.memory_repository import InMemoryRepository
+from core.aggregate_cache import AggregateCache
+from core.services import DataImportService
+from tests.conftest import as_aggregates, assert_same_aggregates
+
+
+def test_aggregate_cache_round_trip(tmp_path):
+    cache = AggregateCache(str(tmp_path), max_bytes=1024 * 1024)
+    debtors = {20_000_000_001: [2.0, 10.5, 3]}
+    entities = {3: 10.5}
+    cache.store("hash", {"records_processed": 1}, debtors, entities)
+    assert cache.load("hash") == ({"records_processed": 1}, debtors, entities)
+    assert cache.load("otro") is None
+
+
+def test_aggregate_cache_evicts_oldest(tmp_path):
+    debtors = {cuit: [1.0, 1.0, 1] for cuit in range(100)}
+    one_entry = 32 * len(debtors)
+    cache = AggregateCache(str(tmp_path), max_bytes=int(2.5 * one_entry))
+    for index, content_hash in enumerate(("a", "b", "c")):
+        cache.store(content_hash, {}, debtors, {1: 100.0})
+        path = os.path.join(str(tmp_path), next(name for name in os.listdir(tmp_path) if name.startswith(content_hash)))
+        os.utime(path, (index, index))
+    assert cache.load("a") is None
+    assert cache.load("c") is not None
+
+
+def test_aggregate_cache_discards_corrupt_entries(tmp_path):
+    cache = AggregateCache(str(tmp_path), max_bytes=1024 * 1024)
+    cache.store("hash", {}, {1: [1.0, 1.0, 1]}, {1: 1.0})
+    (path,) = [os.path.join(str(tmp_path), name) for name in os.listdir(tmp_path)]
+    with open(path, "r+b") as f:
+        f.truncate(10)
+    assert cache.load("hash") is None
+    assert not os.path.exists(path)
+
+
+def test_replayed_import_matches_first_import(parser, processor, data_file, expected, tmp_path):
+    cache = AggregateCache(str(tmp_path / "cache"), max_bytes=64 * 1024 * 1024)
+
+    def import_into(repository):
+        service = DataImportService(parser, processor, repository, duplicate_imports="replay", aggregate_cache=cache)
+        return asyncio.run(service.import_data_from_file(data_file))
+
+    first = import_into(InMemoryRepository())
+    assert not first.get("from_cache")
+    replayed = InMemoryRepository()
+    second = import_into(replayed)
+    assert second["from_cache"]
+    assert second["content_hash"] == first["content_hash"]
+    assert_same_aggregates(as_aggregates(replayed.debtors, replayed.entities), expected)
+
+
+def test_rejected_duplicate_is_not_written(parser, processor, data_file, tmp_path):
+    repository = InMemoryRepository()
+    service = DataImportService(
+        parser, processor, repository, duplicate_imports="reject",
+        aggregate_cache=AggregateCache(str(tmp_path / "cache"), max_bytes=64 * 1024 * 1024)
+    )
+    asyncio.run(service.import_data_from_file(data_file))
+    written = len(repository.debtors)
+    summary = asyncio.run(service.import_data_from_file(data_file))
+    assert summary["status"] == "duplicate"
+    assert len(repository.debtors) == written
@@ -0,0 +1,44 @@
+"""
+TTLCache de las consultas de la API: vencimiento por tiempo y desalojo LRU.
+"""
+from core.cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("a", None)
+    clock.now = 4.9
+    assert cache.get("a") is None
+    clock.now = 5.0
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_ttl_disabled_and_clear():
+    disabled = TTLCache(max_size=0, ttl_seconds=60)
+    disabled.set("a", 1)
+    assert disabled.get("a") is MISSING
+    cache = TTLCache(max_size=5, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.clear()
+    assert cache.get("a") is MISSING
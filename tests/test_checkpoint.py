@@ -0,0 +1,159 @@
+"""
+Checkpoints: ida y vuelta del formato binario y reanudación de importaciones interrumpidas durante el
+parseo o la escritura, sin perder ni duplicar registros.
+"""
+import asyncio
+import shutil
+
+import pytest
+
+import core.services as services
+from benchmarks.memory_repository import InMemoryRepository
+from core.checkpoint import CheckpointStore
+from core.data_processor import DataProcessor
+from core.exceptions import DataImporterError, RepositoryError
+from core.services import DataImportService
+from tests.conftest import as_aggregates, assert_same_aggregates
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class FailingRepository(InMemoryRepository):
+    """
+    Falla al escribir deudores una vez que guardó `fail_after` (None: no falla).
+    """
+
+    def __init__(self, fail_after=None):
+        super().__init__()
+        self.fail_after = fail_after
+
+    async def save_debtors(self, debtors):
+        if self.fail_after is not None and len(self.debtors) >= self.fail_after:
+            raise RepositoryError("escritura interrumpida")
+        return await super().save_debtors(debtors)
+
+
+class FailingProcessor(DataProcessor):
+    """
+    Se interrumpe después de agregar `fail_after` lotes.
+    """
+
+    def __init__(self, parser, fail_after: int):
+        super().__init__(parser)
+        self.fail_after = fail_after
+
+    def accumulate_record_batches(self, record_batches, debtors_partial=None, entities_partial=None):
+        def limited():
+            for index, batch in enumerate(record_batches):
+                if index == self.fail_after:
+                    raise _Interrupted()
+                yield batch
+
+        return super().accumulate_record_batches(limited(), debtors_partial, entities_partial)
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(services, "PARSE_BATCH_SIZE", 1_000)
+    monkeypatch.setattr(services, "WRITE_BATCH_SIZE", 500)
+
+
+def test_state_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    state = {"offset": 1234, "records_processed": 10, "records_skipped": 2}
+    debtors = {20_000_000_001: [3.0, 150.5, 42], 27_123_456_789: [1.0, -0.25, 7]}
+    entities = {42: 150.5, 7: -0.25}
+    store.save_state("clave", state, debtors, entities)
+    store.save_meta("clave", {"written": {"debtors": 1, "entities": 0}})
+    assert store.load_state("clave") == (state, debtors, entities)
+    assert store.load_meta("clave") == {"written": {"debtors": 1, "entities": 0}}
+    assert store.keys() == ["clave"]
+    store.delete("clave")
+    assert store.load_state("clave") is None and store.load_meta("clave") is None
+
+
+def test_resume_after_write_failure(parser, processor, data_file, expected, tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    repository = FailingRepository(fail_after=1_000)
+    service = DataImportService(parser, processor, repository, checkpoint_store=store)
+    with pytest.raises(RepositoryError):
+        asyncio.run(service.import_data_from_file(data_file, checkpoint_key="k"))
+    written = len(repository.debtors)
+    assert 0 < written < len(expected[0])
+    assert store.load_meta("k")["written"]["debtors"] == written
+
+    repository.fail_after = None
+    summary = asyncio.run(service.import_data_from_file(data_file, checkpoint_key="k", resume=True))
+    assert summary["status"] == "completed_successfully"
+    assert summary["resumed_from"]["debtors_written"] == written
+    cuits = [debtor["cuit_cuil"] for debtor in repository.debtors]
+    assert len(cuits) == len(set(cuits))
+    assert_same_aggregates(as_aggregates(repository.debtors, repository.entities), expected)
+    assert store.keys() == []
+
+
+def test_resume_after_parse_interruption(parser, data_file, expected, tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    repository = InMemoryRepository()
+    interrupted = DataImportService(
+        parser, FailingProcessor(parser, fail_after=8), repository, checkpoint_store=store,
+        checkpoint_interval_bytes=100_000
+    )
+    with pytest.raises(DataImporterError):
+        asyncio.run(interrupted.import_data_from_file(data_file, checkpoint_key="k"))
+    assert repository.debtors == []
+    offset = store.load_state("k")[0]["offset"]
+    assert offset > 0
+
+    service = DataImportService(parser, DataProcessor(parser), repository, checkpoint_store=store)
+    summary = asyncio.run(service.import_data_from_file(data_file, checkpoint_key="k", resume=True))
+    assert summary["resumed_from"]["offset"] == offset
+    assert_same_aggregates(as_aggregates(repository.debtors, repository.entities), expected)
+
+
+def test_fresh_run_ignores_previous_checkpoint(parser, processor, data_file, expected, tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    repository = FailingRepository(fail_after=1_000)
+    service = DataImportService(parser, processor, repository, checkpoint_store=store)
+    with pytest.raises(RepositoryError):
+        asyncio.run(service.import_data_from_file(data_file, checkpoint_key="k"))
+
+    fresh = InMemoryRepository()
+    service = DataImportService(parser, processor, fresh, checkpoint_store=store)
+    summary = asyncio.run(service.import_data_from_file(data_file, checkpoint_key="k"))
+    assert "resumed_from" not in summary
+    assert_same_aggregates(as_aggregates(fresh.debtors, fresh.entities), expected)
+
+
+def test_job_manager_recovers_unfinished_jobs(parser, processor, data_file, expected, tmp_path):
+    from core.jobs import ImportJobManager
+
+    spooled = tmp_path / "spool.txt"
+    shutil.copyfile(data_file, spooled)
+    store = CheckpointStore(str(tmp_path / "checkpoints"))
+    store.save_meta("job1", {"job": {
+        "filename": "deudores.txt", "file_path": str(spooled), "created_at": "2025-01-01T00:00:00+00:00",
+    }})
+    repository = InMemoryRepository()
+
+    async def run():
+        manager = ImportJobManager(
+            lambda: DataImportService(parser, processor, repository, checkpoint_store=store),
+            workers=1, queue_size=4, history_limit=10, checkpoint_store=store
+        )
+        await manager.start()
+        try:
+            job = manager.get("job1")
+            assert job is not None and job.resumed
+            # El worker debe despertarse con el job encolado al iniciar.
+            await asyncio.wait_for(manager._queue.join(), timeout=30)
+            return job
+        finally:
+            await manager.stop()
+
+    job = asyncio.run(run())
+    assert job.status == "completed"
+    assert_same_aggregates(as_aggregates(repository.debtors, repository.entities), expected)
+    assert not spooled.exists()
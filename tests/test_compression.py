@@ -0,0 +1,102 @@
+"""
+Descompresión en streaming de .gz y .zip: flujos (subidas) y archivos, contra el contenido original.
+"""
+import asyncio
+import gzip
+import io
+import threading
+import zipfile
+
+import pytest
+
+from core.compression import decompress_stream, iter_in_thread
+from core.exceptions import FileParsingError
+from tests.conftest import as_aggregates, assert_same_aggregates
+
+CONTENT = b"".join(b"%05d linea de prueba\n" % i for i in range(20_000))
+
+
+def _zip(members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _decompress(blob: bytes, name: str, chunk_size: int = 4_096) -> bytes:
+    async def chunks():
+        for start in range(0, len(blob), chunk_size):
+            yield blob[start:start + chunk_size]
+
+    async def run():
+        return b"".join([chunk async for chunk in decompress_stream(chunks(), name)])
+
+    return asyncio.run(run())
+
+
+def test_plain_stream_passes_through():
+    assert _decompress(CONTENT, "datos.txt") == CONTENT
+
+
+def test_gzip_stream_with_concatenated_members():
+    assert _decompress(gzip.compress(CONTENT) + gzip.compress(b"ultima\n"), "datos.txt.gz") == CONTENT + b"ultima\n"
+
+
+@pytest.mark.parametrize("cut", [15, 0.5, -4])
+def test_truncated_gzip_stream_fails(cut):
+    blob = gzip.compress(CONTENT)
+    end = int(len(blob) * cut) if isinstance(cut, float) else cut
+    with pytest.raises(FileParsingError, match="truncado"):
+        _decompress(blob[:end], "datos.txt.gz")
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_zip_stream_joins_members_in_order(compression):
+    blob = _zip([("a.txt", CONTENT[:-1]), ("dir/", b""), ("b.txt", b"ultima\n")], compression)
+    assert _decompress(blob, "datos.zip") == CONTENT + b"ultima\n"
+
+
+def test_truncated_zip_stream_fails():
+    blob = _zip([("a.txt", CONTENT)])
+    with pytest.raises(FileParsingError, match="truncado"):
+        _decompress(blob[:len(blob) // 2], "datos.zip")
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zip"])
+def test_compressed_file_matches_plain_file(parser, processor, data_file, expected, tmp_path, suffix):
+    with open(data_file, "rb") as f:
+        content = f.read()
+    path = tmp_path / f"deudores.txt{suffix}"
+    path.write_bytes(gzip.compress(content) if suffix == ".gz" else _zip([("deudores.txt", content)]))
+    results = processor.aggregate_record_batches(parser.iter_record_batches(str(path), 1_000))
+    assert_same_aggregates(as_aggregates(*results), expected)
+
+
+def test_truncated_gzip_file_fails(parser, tmp_path):
+    blob = gzip.compress(CONTENT)
+    path = tmp_path / "deudores.txt.gz"
+    path.write_bytes(blob[:len(blob) // 2])
+    with pytest.raises(FileParsingError):
+        list(parser.iter_record_batches(str(path), 1_000))
+
+
+def test_iter_in_thread_stops_reader_when_closed_early():
+    def endless():
+        while True:
+            yield b"x"
+
+    items = iter_in_thread(endless(), max_pending=1)
+    assert next(items) == b"x"
+    # Con la cola llena, cerrar el generador debe detener el hilo lector en lugar de quedar esperándolo.
+    items.close()
+    assert not any(thread.name == "decompression-reader" for thread in threading.enumerate())
+
+
+def test_iter_in_thread_propagates_reader_errors():
+    def failing():
+        yield 1
+        raise ValueError("lectura")
+
+    with pytest.raises(ValueError, match="lectura"):
+        list(iter_in_thread(failing(), max_pending=1))
@@ -0,0 +1,96 @@
+"""
+Cada motor de parseo/agregación debe producir los mismos agregados que el motor original (aggregate_data).
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.memory_repository import InMemoryRepository
+from core.data_processor import DataProcessor
+from core.parallel import aggregate_file_parallel, aggregate_stream_parallel
+from core.services import DataImportService
+from core.spill import SpillStore
+from tests.conftest import as_aggregates, assert_same_aggregates, sorted_copy
+
+
+def test_mmap_batches(parser, processor, data_file, expected):
+    results = processor.aggregate_record_batches(parser.iter_record_batches(data_file, 1_000))
+    assert_same_aggregates(as_aggregates(*results), expected)
+
+
+def test_documents_fast_path(parser, data_file, expected):
+    processor = DataProcessor(parser, as_documents=True, validation_sample_rate=1.0)
+    debtors, entities = processor.aggregate_record_batches(parser.iter_record_batches(data_file, 1_000))
+    assert isinstance(debtors[0], dict)
+    assert_same_aggregates(as_aggregates(debtors, entities), expected)
+
+
+def test_numpy_columnar(parser, processor, data_file, expected):
+    pytest.importorskip("numpy")
+    # Bloques chicos para combinar varios bloques y líneas partidas entre ellos.
+    results = processor.aggregate_columnar_chunks(parser.iter_columnar_chunks(data_file, 64 * 1024))
+    assert_same_aggregates(as_aggregates(*results), expected)
+
+
+def test_parallel_shards(parser, processor, data_file, expected):
+    partials = asyncio.run(aggregate_file_parallel(parser, processor, data_file, 3, 1_000))
+    assert_same_aggregates(as_aggregates(*processor.build_results(*partials)), expected)
+
+
+def test_parallel_stream_blocks(processor, data_file, expected):
+    from concurrent.futures import ProcessPoolExecutor
+
+    async def chunks():
+        with open(data_file, "rb") as f:
+            while chunk := f.read(10_000):
+                yield chunk
+
+    async def run():
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            return await aggregate_stream_parallel(processor, chunks(), executor, 50_000, 2, 1_000)
+
+    assert_same_aggregates(as_aggregates(*processor.build_results(*asyncio.run(run()))), expected)
+
+
+def test_bounded_memory_spill(parser, processor, data_file, expected, tmp_path):
+    with SpillStore(8, str(tmp_path)) as spill_store:
+        debtors, entities = processor.aggregate_record_batches_bounded(
+            parser.iter_record_batches(data_file, 1_000), spill_store, max_debtor_entries=500
+        )
+        assert spill_store.spilled
+        aggregates = as_aggregates(list(debtors), entities)
+    assert_same_aggregates(aggregates, expected)
+
+
+@pytest.mark.parametrize("sorted_by", ["cuit", "entity"])
+def test_sorted_streaming(parser, processor, data_file, tmp_path, sorted_by):
+    path = sorted_copy(data_file, str(tmp_path / f"{sorted_by}.txt"), sorted_by)
+    assert parser.detect_sort_order(path, (sorted_by,)) == sorted_by
+    # Al reordenar cambia la primera aparición de cada deudor (y con ella su entidad): se compara con el
+    # motor original sobre el mismo archivo ordenado.
+    expected = as_aggregates(*asyncio.run(processor.aggregate_data(parser.stream_raw_records(path))))
+    debtors, entities = [], []
+    for done_debtors, done_entities in processor.iter_sorted_aggregates(
+            parser.iter_record_batches(path, 1_000), sorted_by
+    ):
+        debtors.extend(done_debtors)
+        entities.extend(done_entities)
+    assert_same_aggregates(as_aggregates(debtors, entities), expected)
+
+
+@pytest.mark.parametrize("options", [
+    {"engine": "stream"},
+    {"engine": "mmap"},
+    {"engine": "numpy"},
+    {"engine": "mmap", "workers": 2},
+    {"engine": "mmap", "memory_limit_mb": 1},
+])
+def test_service_import(parser, processor, data_file, expected, options):
+    if options["engine"] == "numpy":
+        pytest.importorskip("numpy")
+    repository = InMemoryRepository()
+    service = DataImportService(parser, processor, repository, sorted_by="", **options)
+    summary = asyncio.run(service.import_data_from_file(data_file))
+    assert summary["status"] == "completed_successfully"
+    assert summary["debtors_saved"] == len(expected[0])
+    assert_same_aggregates(as_aggregates(repository.debtors, repository.entities), expected)
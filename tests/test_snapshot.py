@@ -0,0 +1,85 @@
+"""
+Snapshots columnares: lo que escribe write_snapshot se lee igual con SnapshotReader.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.memory_repository import InMemoryRepository
+from core.exceptions import DataImporterError, SnapshotError
+from core.services import DataImportService
+from core.snapshot import SnapshotReader, write_snapshot
+from tests.conftest import as_aggregates, assert_same_aggregates
+
+
+@pytest.fixture
+def results(parser, processor, data_file):
+    return processor.aggregate_record_batches(parser.iter_record_batches(data_file, 1_000))
+
+
+def test_round_trip(results, expected, tmp_path):
+    debtors, entities = results
+    path = str(tmp_path / "datos.snap")
+    header = write_snapshot(path, debtors, entities, {"source": "deudores.txt"})
+    assert header["debtors"] == len(debtors) and header["source"] == "deudores.txt"
+    with SnapshotReader(path) as reader:
+        assert len(reader) == len(debtors)
+        assert reader.header["entities"] == len(entities)
+        read_debtors = [reader.get_debtor(cuit) for cuit in expected[0]]
+        assert_same_aggregates(as_aggregates(read_debtors, reader.entities()), expected)
+        assert reader.get_debtor(1) is None
+        assert reader.get_entity(-1) is None
+        entity_code, loans = next(iter(expected[1].items()))
+        assert reader.get_entity(entity_code).loans == pytest.approx(loans)
+
+
+def test_loans_queries(results, expected, tmp_path):
+    path = str(tmp_path / "datos.snap")
+    write_snapshot(path, *results)
+    by_loans = sorted(loans for _, _, loans in expected[0].values())
+    with SnapshotReader(path) as reader:
+        assert [debtor.loans for debtor in reader.top_debtors(5)] == pytest.approx(by_loans[::-1][:5])
+        low, high = by_loans[len(by_loans) // 4], by_loans[len(by_loans) // 2]
+        in_range = [debtor.loans for debtor in reader.debtors_by_loans(low, high)]
+        assert in_range == pytest.approx([loans for loans in by_loans if low <= loans <= high])
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "vacio.snap")
+    write_snapshot(path, [], [])
+    with SnapshotReader(path) as reader:
+        assert len(reader) == 0
+        assert reader.top_debtors(3) == []
+        assert list(reader.entities()) == []
+
+
+def test_invalid_files_raise_snapshot_error(results, tmp_path):
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(tmp_path / "no_existe.snap"))
+    path = tmp_path / "datos.snap"
+    write_snapshot(str(path), *results)
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(path))
+
+
+def test_service_export(parser, processor, data_file, expected, tmp_path):
+    service = DataImportService(parser, processor, InMemoryRepository())
+    path = str(tmp_path / "datos.snap")
+    summary = asyncio.run(service.export_snapshot(data_file, path))
+    assert summary["status"] == "completed_successfully"
+    with SnapshotReader(path) as reader:
+        read_debtors = [reader.get_debtor(cuit) for cuit in expected[0]]
+        assert_same_aggregates(as_aggregates(read_debtors, reader.entities()), expected)
+
+
+def test_service_export_wraps_unexpected_errors(parser, processor, data_file, tmp_path, monkeypatch):
+    import core.services as services
+
+    def fail(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(services, "write_snapshot", fail)
+    service = DataImportService(parser, processor, InMemoryRepository())
+    with pytest.raises(DataImporterError, match="disco lleno"):
+        asyncio.run(service.export_snapshot(data_file, str(tmp_path / "datos.snap")))
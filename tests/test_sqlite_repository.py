@@ -0,0 +1,152 @@
+"""
+Backend SQLite: mismo contrato que MongoRepository (escritura, upsert, consultas, historial y cargas con
+staging) y mismos agregados que el motor original al importar.
+"""
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+import core.services as services
+from core.exceptions import RepositoryError
+from core.models import DebtorData, EntityData
+from core.services import DataImportService
+from core.sqlite_repository import SQLiteRepository
+from tests.conftest import as_aggregates, assert_same_aggregates
+
+
+def _run(repository: SQLiteRepository, work):
+    async def run():
+        await repository.connect()
+        try:
+            return await work(repository)
+        finally:
+            await repository.disconnect()
+
+    return asyncio.run(run())
+
+
+def _tables(path: str) -> set:
+    with sqlite3.connect(path) as connection:
+        return {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _debtor(cuit: int, situation: float = 1.0, loans: float = 10.0, entity_code: int = 7) -> dict:
+    return {"entity_code": entity_code, "cuit_cuil": cuit, "situation": situation, "loans": loans}
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / "importer.db")
+
+
+def test_save_and_lookup(db_path):
+    async def work(repository):
+        assert await repository.save_debtors([_debtor(1), _debtor(2, loans=5.0)]) == 2
+        assert await repository.save_debtors([DebtorData(entity_code=8, cuitCuil=1, situation=3.0, loans=1.0)]) == 1
+        assert await repository.save_entities([EntityData(entity_code=7, loans=15.0)]) == 1
+        # Como en MongoDB, con varias filas por clave se devuelve la última escrita.
+        assert (await repository.get_debtor(1)).entity_code == 8
+        assert await repository.get_debtor(3) is None
+        assert set(await repository.get_debtors([1, 2, 3])) == {1, 2}
+        assert (await repository.get_entity(7)).loans == 15.0
+
+    _run(SQLiteRepository(db_path), work)
+
+
+def test_upsert_counts(db_path):
+    async def work(repository):
+        first = await repository.upsert_debtors([_debtor(1), _debtor(2)])
+        second = await repository.upsert_debtors([_debtor(1), _debtor(2, loans=99.0), _debtor(3)])
+        assert first == {"inserted": 2, "updated": 0, "unchanged": 0}
+        assert second == {"inserted": 1, "updated": 1, "unchanged": 1}
+        assert (await repository.get_debtor(2)).loans == 99.0
+
+    _run(SQLiteRepository(db_path), work)
+
+
+def test_import_history(db_path):
+    finished_at = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+    async def work(repository):
+        await repository.record_import({"content_hash": "h", "status": "failed"})
+        assert await repository.find_import("h") is None
+        await repository.record_import({"content_hash": "h", "status": "completed_successfully", "finished_at": finished_at})
+        return await repository.find_import("h")
+
+    assert _run(SQLiteRepository(db_path), work)["finished_at"] == finished_at
+
+
+def test_staging_commit_replaces_live_tables(db_path):
+    async def work(repository):
+        await repository.save_debtors([_debtor(1)])
+        staging = await repository.begin_load()
+        await staging.save_debtors([_debtor(2)])
+        assert await repository.get_debtor(2) is None
+        await staging.commit_load()
+        return await repository.get_debtor(1), await repository.get_debtor(2)
+
+    assert _run(SQLiteRepository(db_path), work)[0] is None
+    assert _tables(db_path) == {"debtors", "entities", "import_history"}
+
+
+def test_staging_abort_and_resume(db_path):
+    async def work(repository):
+        staging = await repository.begin_load()
+        await staging.save_debtors([_debtor(1)])
+        resumed = await repository.begin_load(staging.load_id)
+        await resumed.save_debtors([_debtor(2)])
+        assert set(await resumed.get_debtors([1, 2])) == {1, 2}
+        await resumed.abort_load()
+        with pytest.raises(RepositoryError):
+            await repository.begin_load(staging.load_id)
+
+    _run(SQLiteRepository(db_path), work)
+    assert _tables(db_path) == {"debtors", "entities", "import_history"}
+
+
+@pytest.mark.parametrize("options", [
+    {"write_mode": "insert"},
+    {"write_mode": "upsert"},
+    {"load_mode": "staging"},
+])
+def test_service_import(parser, processor, data_file, expected, db_path, options):
+    async def work(repository):
+        service = DataImportService(parser, processor, repository, engine="mmap", sorted_by="", **options)
+        summary = await service.import_data_from_file(data_file)
+        debtors = await repository.get_debtors(expected[0])
+        entities = [await repository.get_entity(entity_code) for entity_code in expected[1]]
+        return summary, debtors, entities
+
+    summary, debtors, entities = _run(SQLiteRepository(db_path), work)
+    assert summary["status"] == "completed_successfully"
+    assert_same_aggregates(as_aggregates(debtors.values(), entities), expected)
+
+
+def test_fresh_checkpointed_run_drops_previous_staging(parser, processor, data_file, expected, db_path, tmp_path,
+                                                       monkeypatch):
+    from core.checkpoint import CheckpointStore
+
+    monkeypatch.setattr(services, "WRITE_BATCH_SIZE", 500)
+    store = CheckpointStore(str(tmp_path / "checkpoints"))
+    original_save = SQLiteRepository.save_debtors
+    written = []
+
+    async def failing_save(self, debtors):
+        if written:
+            raise RepositoryError("escritura interrumpida")
+        written.append(True)
+        return await original_save(self, debtors)
+
+    async def work(repository):
+        service = DataImportService(parser, processor, repository, load_mode="staging", checkpoint_store=store)
+        monkeypatch.setattr(SQLiteRepository, "save_debtors", failing_save)
+        with pytest.raises(RepositoryError):
+            await service.import_data_from_file(data_file, checkpoint_key="k")
+        assert len(_tables(db_path)) == 5
+        monkeypatch.setattr(SQLiteRepository, "save_debtors", original_save)
+        return await service.import_data_from_file(data_file, checkpoint_key="k")
+
+    assert _run(SQLiteRepository(db_path), work)["status"] == "completed_successfully"
+    assert _tables(db_path) == {"debtors", "entities", "import_history"}
@@ -0,0 +1,29 @@
+"""
+Importar los puntos de entrada no debe cargar las dependencias pesadas: cada caso corre en un intérprete nuevo.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import _ROOT
+
+HEAVY_MODULES = ("motor", "pymongo", "bson", "numpy")
+
+
+def _loaded_after(statement: str) -> list:
+    script = (
+        f"import json, sys\n{statement}\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    completed = subprocess.run([sys.executable, "-c", script], cwd=_ROOT, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("statement", ["import cli", "import core.services", "import cli, core.services"])
+def test_import_does_not_load_heavy_modules(statement):
+    if "cli" in statement:
+        pytest.importorskip("typer")
+    assert _loaded_after(statement) == []